@@ -0,0 +1,457 @@
+# benchmark.py
+
+"""
+Suite de benchmarks de los caminos críticos del recomendador.
+
+Se ejecuta sin red sobre un corpus de fixtures de TMDB (ver
+recommendation/fixtures.py), guarda cada ejecución en un histórico
+JSON-lines y compara con la anterior para detectar regresiones.
+También comprueba que la afinidad de catálogos construidos con vectores
+float32 y con el bloque TF-IDF cuantizado en int8 no se aleja de la
+calculada en float64.
+
+Uso típico:
+    python benchmark.py --record            # graba el corpus (requiere API)
+    python benchmark.py                     # ejecuta offline y compara
+    python benchmark.py --synthetic         # corpus sintético, sin API
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+from recommendation.data_utils import load_movie_platforms, load_series_platforms, load_artifacts, CatalogStore
+from recommendation.config import REFERENCE_MOVIES, REFERENCE_SERIES, WEIGHTS
+from recommendation.fixtures import (
+    load_fixture_corpus, save_fixture_corpus, start_recording, stop_recording
+)
+from recommendation.tmdb_client import get_movie_details, search_movie_by_title
+from recommendation.series_client import get_series_details, search_series_by_title
+from recommendation.user_profile import build_user_profile, build_series_profile
+from recommendation.feature_engineering import (
+    build_feature_vector, cosine_similarity, feature_dtype, set_feature_dtype
+)
+from recommendation import catalog
+from recommendation.catalog import build_catalog, catalog_scores
+from recommendation.overview_svd import overview_svd, set_overview_svd
+from recommendation.recommendation_engine import (
+    calculate_affinity, calculate_series_affinity, calculate_mix_affinity
+)
+from recommendation.metrics import enable_metrics, export_json, export_prometheus
+
+DEFAULT_FIXTURES = os.path.join("DATA", "FIXTURES", "tmdb_fixtures.jsonl.gz")
+DEFAULT_HISTORY = "benchmark_history.jsonl"
+
+# Diferencia máxima tolerada en la afinidad de una plataforma frente a float64
+PRECISION_TOLERANCE = {"float32": 1e-5, "int8": 1e-3}
+# Modos de precisión: (precisión de los vectores, cuantización del TF-IDF del catálogo)
+PRECISION_MODES = {"float64": ("float64", "none"), "float32": ("float32", "none"),
+                   "int8": ("float32", "int8")}
+
+# -------------------------------------
+# Corpus de trabajo
+# -------------------------------------
+def subset_platforms(PLATFORMS, per_platform, max_platforms, seed=0):
+    """
+    Reduce cada catálogo a una muestra fija para que el corpus sea acotado.
+    """
+    rng = random.Random(seed)
+    names = sorted(PLATFORMS, key=lambda p: -len(PLATFORMS[p]))[:max_platforms]
+    return {p: sorted(rng.sample(PLATFORMS[p], min(per_platform, len(PLATFORMS[p]))))
+            for p in names}
+
+
+def synthetic_details(item_id, tv=False):
+    """
+    Detalles deterministas con la forma de una respuesta de TMDB, para
+    ejecutar la suite en máquinas sin acceso a la API.
+    """
+    rng = random.Random(f"{'tv' if tv else 'movie'}:{item_id}")
+    genres = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Drama",
+              "Family", "Fantasy", "Horror", "Romance", "Thriller"]
+    words = ["love", "war", "family", "murder", "detective", "space", "school",
+             "robot", "dragon", "city", "secret", "journey", "revenge", "friend"]
+    details = {
+        "id": item_id,
+        "genres": [{"name": g} for g in rng.sample(genres, rng.randint(1, 3))],
+        "overview": " ".join(rng.choice(words) for _ in range(30)),
+        "origin_country": [rng.choice(["US", "GB", "ES", "FR", "JP", "KR"])],
+        "production_companies": [{"name": f"Company {rng.randint(1, 40)}"}
+                                 for _ in range(rng.randint(1, 3))],
+        "popularity": rng.random() * 100,
+        "vote_average": rng.random() * 10,
+        "original_language": rng.choice(["en", "es", "fr", "ja", "ko"]),
+    }
+    if tv:
+        details.update({
+            "name": f"Series {item_id}",
+            "first_air_date": f"{rng.randint(1960, 2024)}-01-01",
+            "number_of_seasons": rng.randint(1, 12),
+            "number_of_episodes": rng.randint(6, 200),
+        })
+    else:
+        details.update({
+            "title": f"Movie {item_id}",
+            "release_date": f"{rng.randint(1930, 2024)}-01-01",
+            "revenue": rng.randint(0, 2_000_000_000),
+            "belongs_to_collection": {"id": 1} if rng.random() < 0.2 else None,
+        })
+    return details
+
+
+def prepare_corpus(args, movie_P, series_P):
+    """
+    Deja las cachés de los clientes listas según el modo elegido
+    (grabar, sintético o cargar el corpus existente).
+    """
+    movie_ids = set(REFERENCE_MOVIES).union(*movie_P.values())
+    series_ids = set(REFERENCE_SERIES).union(*series_P.values())
+    if args.record:
+        for mid in movie_ids:
+            get_movie_details(mid)
+        for sid in series_ids:
+            get_series_details(sid)
+        # Búsquedas de los títulos de referencia, para reproducirlas sin red
+        searches = [(search_movie_by_title, get_movie_details(mid), "title") for mid in REFERENCE_MOVIES]
+        searches += [(search_series_by_title, get_series_details(sid), "name") for sid in REFERENCE_SERIES]
+        start_recording()
+        try:
+            for search, det, key in searches:
+                if det and det.get(key):
+                    search(det[key])
+        finally:
+            stop_recording()
+        n = save_fixture_corpus(args.fixtures)
+        print(f"Corpus grabado: {n} registros en {args.fixtures}", file=sys.stderr)
+    elif args.synthetic:
+        from recommendation import tmdb_client, series_client
+        tmdb_client._movie_details_cache.update({m: synthetic_details(m) for m in movie_ids})
+        series_client._series_cache.update({s: synthetic_details(s, True) for s in series_ids})
+    else:
+        if not os.path.exists(args.fixtures):
+            sys.exit(f"No existe el corpus {args.fixtures}: usa --record o --synthetic")
+        load_fixture_corpus(args.fixtures)
+
+# -------------------------------------
+# Medición
+# -------------------------------------
+def measure(fn, repeat, number=1):
+    """
+    Ejecuta fn `number` veces por repetición y devuelve estadísticas en
+    segundos por llamada. Silencia los print del motor.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # calentamiento
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - t0) / number)
+    return {"median": float(np.median(times)), "min": float(np.min(times)),
+            "repeat": repeat, "number": number}
+
+
+@contextlib.contextmanager
+def precision_mode(mode):
+    """
+    Fija la precisión de los vectores y la cuantización del catálogo de un
+    modo de PRECISION_MODES mientras dura el bloque.
+    """
+    dtype, quantization = PRECISION_MODES[mode]
+    original = feature_dtype(), catalog.OVERVIEW_QUANTIZATION
+    set_feature_dtype(dtype)
+    catalog.OVERVIEW_QUANTIZATION = quantization
+    try:
+        yield
+    finally:
+        set_feature_dtype(original[0])
+        catalog.OVERVIEW_QUANTIZATION = original[1]
+
+
+def precision_scores(ratings, tfidf, PLATFORMS, directory, fixtures):
+    """
+    Afinidad por plataforma con el catálogo vectorizado (build_catalog y
+    catalog_scores) en cada modo de PRECISION_MODES, y la de referencia:
+    calculate_affinity en float64 sin catálogo.
+
+    Parámetros:
+    - directory: directorio donde se construye el catálogo de cada modo.
+    - fixtures: corpus que cargan los procesos de build_catalog.
+
+    Devuelve:
+    - (dict {"reference" | modo: {plataforma: afinidad}},
+       dict {modo: función que puntúa con el catálogo de ese modo}).
+    """
+    with precision_mode("float64"):
+        scores = {"reference": calculate_affinity(ratings, tfidf, PLATFORMS, use_cache=False,
+                                                  use_precomputed=False)[0]}
+    scorers = {}
+    for mode in PRECISION_MODES:
+        base_dir = os.path.join(directory, mode)
+
+        def score(mode=mode, base_dir=base_dir):
+            with precision_mode(mode):
+                parts = build_user_profile(ratings, tfidf, PLATFORMS)
+                return catalog_scores("movies", parts, tfidf, PLATFORMS, base_dir=base_dir)
+
+        with precision_mode(mode):
+            build_catalog("movies", PLATFORMS, tfidf, base_dir=base_dir, fixtures=fixtures)
+        scores[mode] = score()
+        scorers[mode] = score
+    return scores, scorers
+
+
+def rank_agreement(a, b):
+    """
+    Concordancia entre dos rankings de plataformas {plataforma: afinidad}:
+    fracción de pares ordenados igual (1 = mismo orden).
+    """
+    names = sorted(a)
+    pairs = [(p, q) for i, p in enumerate(names) for q in names[i + 1:]]
+    if not pairs:
+        return 1.0
+    same = sum(1 for p, q in pairs if np.sign(a[p] - a[q]) == np.sign(b[p] - b[q]))
+    return same / len(pairs)
+
+
+def run_suite(args):
+    """
+    Ejecuta todos los casos y devuelve {nombre_caso: estadísticas}.
+    """
+    results = {}
+    only = set(args.only or [])
+
+    def bench(name, fn, number=1, repeat=None):
+        if only and name not in only:
+            return
+        results[name] = measure(fn, repeat or args.repeat, number)
+        print(f"{name:<28} {results[name]['median'] * 1e3:10.3f} ms", file=sys.stderr)
+
+    # Carga de catálogos y artefactos
+    bench("load_movie_platforms", load_movie_platforms, repeat=min(args.repeat, 3))
+    bench("load_series_platforms", load_series_platforms, repeat=min(args.repeat, 3))
+    bench("load_artifacts", load_artifacts, repeat=min(args.repeat, 3))
+
+    movie_P = subset_platforms(load_movie_platforms(), args.per_platform, args.max_platforms)
+    series_P = subset_platforms(load_series_platforms(), args.per_platform, args.max_platforms)
+    common = set(movie_P) & set(series_P)
+    tfidf = load_artifacts()
+    tfidf_series = load_artifacts(content_type="series")
+    prepare_corpus(args, movie_P, series_P)
+
+    movie_ratings = {mid: float(i % 6) for i, mid in enumerate(REFERENCE_MOVIES)}
+    series_ratings = {sid: float(i % 6) for i, sid in enumerate(REFERENCE_SERIES)}
+
+    # Perfil de usuario
+    bench("build_user_profile", lambda: build_user_profile(movie_ratings, tfidf, movie_P))
+    bench("build_series_profile", lambda: build_series_profile(series_ratings, tfidf_series, series_P))
+
+    # Vectorización de un único título y similitud coseno
+    profile, g, c, co, l = build_user_profile(movie_ratings, tfidf, movie_P)
+    sample_id = next(iter(next(iter(movie_P.values()))))
+    det = get_movie_details(sample_id)
+    if det:
+        bench("build_feature_vector", lambda: build_feature_vector(det, g, c, co, l, tfidf, movie_P),
+              number=50)
+        vec = build_feature_vector(det, g, c, co, l, tfidf, movie_P)
+        bench("cosine_similarity", lambda: cosine_similarity(profile, vec), number=1000)
+
+    # Puntuación completa de plataformas
+    # (sin la caché de resultados: se mide el cálculo, no la consulta)
+    bench("calculate_affinity",
+          lambda: calculate_affinity(movie_ratings, tfidf, movie_P, use_cache=False))
+    bench("calculate_series_affinity",
+          lambda: calculate_series_affinity(series_ratings, tfidf_series, series_P, use_cache=False))
+    if common:
+        bench("calculate_mix_affinity",
+              lambda: calculate_mix_affinity(movie_ratings, series_ratings, tfidf,
+                                             {p: movie_P[p] for p in common},
+                                             {p: series_P[p] for p in common},
+                                             use_cache=False))
+    # Petición repetida servida por la caché de resultados (incluye el hash de la clave)
+    if not only or "calculate_affinity_cached" in only:
+        calculate_affinity(movie_ratings, tfidf, movie_P)
+    bench("calculate_affinity_cached",
+          lambda: calculate_affinity(movie_ratings, tfidf, movie_P), number=10)
+
+    # Catálogo compacto: construcción, filtrado y memoria por título
+    if not only or {"catalog_store_build", "catalog_store_filter"} & only:
+        bench("catalog_store_build", lambda: CatalogStore.from_details(movie_P, get_movie_details),
+              repeat=min(args.repeat, 3))
+        store = CatalogStore.from_details(movie_P, get_movie_details)
+        bench("catalog_store_filter",
+              lambda: store.filter(platforms=list(movie_P)[:2], min_vote=6.0, years=(1990, 2020)),
+              number=100)
+        if "catalog_store_build" in results and len(store):
+            results["catalog_store_build"]["bytes_per_title"] = store.nbytes / len(store)
+
+    # Precisión: catálogos float32 e int8 frente a float64 sin catálogo
+    # (diferencia máxima por plataforma)
+    if not only or "quantized_scoring" in only:
+        with tempfile.TemporaryDirectory() as directory:
+            fixtures = os.path.join(directory, "corpus.jsonl.gz")
+            save_fixture_corpus(fixtures)
+            scores, scorers = precision_scores(movie_ratings, tfidf, movie_P, directory, fixtures)
+            bench("quantized_scoring", scorers["int8"], number=10)
+        results["quantized_scoring"]["max_error"] = {
+            mode: max(abs(scores[mode][p] - scores["reference"][p]) for p in movie_P)
+            for mode in PRECISION_TOLERANCE
+        }
+
+    # Proyección LSA del overview frente al TF-IDF disperso: latencia,
+    # tamaño del vector y concordancia del ranking de plataformas
+    if (not only or {"calculate_affinity_sparse", "calculate_affinity_svd"} & only) \
+            and overview_svd(tfidf) is not None:
+        ranked = {}
+        for name, enabled in (("calculate_affinity_sparse", False), ("calculate_affinity_svd", True)):
+            set_overview_svd(enabled)
+            try:
+                bench(name, lambda: calculate_affinity(movie_ratings, tfidf, movie_P, use_cache=False,
+                                                       use_precomputed=False))
+                ranked[name], _ = calculate_affinity(movie_ratings, tfidf, movie_P, use_cache=False,
+                                                     use_precomputed=False)
+                if name in results:
+                    results[name]["vector_bytes"] = int(build_user_profile(movie_ratings, tfidf, movie_P)[0].nbytes)
+            finally:
+                set_overview_svd(True)
+        if "calculate_affinity_svd" in results:
+            results["calculate_affinity_svd"]["rank_agreement"] = rank_agreement(
+                ranked["calculate_affinity_sparse"], ranked["calculate_affinity_svd"])
+
+    # Rendimiento de la calibración: usuarios sintéticos por segundo
+    if not only or "calibration_task" in only:
+        from calibrate_weights import _simulate_task, plan_tasks, provider_samples
+        provider = max(movie_P, key=lambda p: len(movie_P[p]))
+        # Cada usuario sintético evalúa todos los vectores one-hot
+        one_hot = {b: {k: 1.0 if k == b else 0.0 for k in WEIGHTS} for b in WEIGHTS}
+        task = plan_tasks(movie_P, [provider], 5, max_task_users=10 ** 9)[0]
+        users = provider_samples(movie_P, [provider], 5, seed=0)[provider]
+        simulated = []
+        bench("calibration_task",
+              lambda: simulated.append(_simulate_task(task, users, movie_P, tfidf, one_hot)["total"]),
+              repeat=min(args.repeat, 3))
+        # plan_tasks sube a SMALL_CATALOG_USERS en catálogos pequeños
+        results["calibration_task"]["users_per_second"] = simulated[-1] / results["calibration_task"]["median"]
+    return results
+
+# -------------------------------------
+# Histórico y regresiones
+# -------------------------------------
+def git_revision():
+    """
+    Revisión actual de git, o None si no está disponible.
+    """
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_last_run(history_path, config):
+    """
+    Devuelve la última ejecución del histórico con la misma configuración.
+    """
+    if not os.path.exists(history_path):
+        return None
+    last = None
+    with open(history_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("config") == config:
+                last = record
+    return last
+
+
+def precision_failures(results):
+    """
+    Lista los modos de precisión cuya diferencia con float64 supera
+    PRECISION_TOLERANCE.
+    """
+    errors = results.get("quantized_scoring", {}).get("max_error", {})
+    return [(mode, err, PRECISION_TOLERANCE[mode]) for mode, err in errors.items()
+            if err > PRECISION_TOLERANCE[mode]]
+
+
+def compare(current, previous, tolerance):
+    """
+    Lista los casos cuya mediana empeora más de `tolerance` (fracción).
+    """
+    regressions = []
+    for name, stats in current.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        ratio = stats["median"] / old["median"] if old["median"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append((name, old["median"], stats["median"], ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks de los caminos críticos')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES,
+                        help='Corpus de fixtures de TMDB (.jsonl.gz)')
+    parser.add_argument('--record', action='store_true',
+                        help='Descargar de TMDB y grabar el corpus antes de medir')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='Usar detalles sintéticos deterministas (sin API)')
+    parser.add_argument('--per_platform', type=int, default=200,
+                        help='Títulos por plataforma en el corpus de trabajo')
+    parser.add_argument('--max_platforms', type=int, default=10,
+                        help='Plataformas (las más grandes) en el corpus de trabajo')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Repeticiones por caso')
+    parser.add_argument('--only', nargs='*', default=None,
+                        help='Ejecutar solo estos casos')
+    parser.add_argument('--history', default=DEFAULT_HISTORY,
+                        help='Histórico JSON-lines de ejecuciones')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Empeoramiento relativo tolerado antes de marcar regresión')
+    parser.add_argument('--fail_on_regression', action='store_true',
+                        help='Salir con código 1 si hay regresiones')
+    parser.add_argument('--metrics', default=None,
+                        help='Exportar métricas por etapa (.json o .prom); añade coste de medida')
+    args = parser.parse_args()
+    if args.metrics:
+        enable_metrics()
+
+    config = {"per_platform": args.per_platform, "max_platforms": args.max_platforms,
+              "synthetic": args.synthetic}
+    results = run_suite(args)
+    previous = load_last_run(args.history, config)
+    record = {"timestamp": datetime.now(timezone.utc).isoformat(),
+              "revision": git_revision(), "config": config, "results": results}
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+    print('Results saved to', args.history)
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            f.write(export_prometheus() if args.metrics.endswith('.prom') else export_json())
+        print('Metrics saved to', args.metrics)
+
+    failures = precision_failures(results)
+    for mode, err, limit in failures:
+        print(f"PRECISIÓN {mode}: diferencia {err:.2e} con float64 (máximo {limit:.0e})")
+    if failures and args.fail_on_regression:
+        sys.exit(1)
+
+    if previous:
+        regressions = compare(results, previous["results"], args.tolerance)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESIÓN {name}: {old * 1e3:.3f} ms -> {new * 1e3:.3f} ms (x{ratio:.2f})")
+        if not regressions:
+            print(f"Sin regresiones respecto a {previous.get('revision') or previous['timestamp']}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
@@ -0,0 +1,55 @@
+# build_collection_matrix.py
+
+"""
+Genera los artefactos de colecciones de DATA/MOVIES/COLLECTIONS
+(collection_matrix.npz, collection_binarizer.pkl, collection_movie_ids.pkl)
+a partir del campo belongs_to_collection de las películas del catálogo
+(ver recommendation/franchise.py).
+
+Los detalles se leen a través del cliente de TMDB, así que con --fixtures
+o con TMDB_BASE_URL apuntando al servidor stub no hace falta red. Hay que
+ejecutarlo antes de vectorize_catalog.py y precompute_reference_scores.py:
+al cambiar el índice cambian los vectores y los precálculos anteriores se
+ignoran.
+
+    python build_collection_matrix.py --fixtures DATA/FIXTURES/tmdb_fixtures.jsonl.gz
+"""
+
+import argparse
+import time
+
+from recommendation.data_utils import load_movie_platforms
+from recommendation.fixtures import load_fixture_corpus
+from recommendation.franchise import COLLECTION_DIR, build_collection_index, save_collection_index
+from recommendation.tmdb_client import get_movie_details
+
+
+def run(output_dir=COLLECTION_DIR, workers=16):
+    """
+    Recorre las películas del catálogo y guarda la matriz de colecciones.
+
+    Devuelve:
+    - (nº de películas con colección, nº de colecciones).
+    """
+    t0 = time.perf_counter()
+    movie_ids = {int(i) for ids in load_movie_platforms().values() for i in ids}
+    matrix, binarizer, with_collection = build_collection_index(movie_ids, get_movie_details, workers)
+    save_collection_index(matrix, binarizer, with_collection, output_dir)
+    print(f"{output_dir}: {len(with_collection)}/{len(movie_ids)} películas en "
+          f"{matrix.shape[1]} colecciones, {time.perf_counter() - t0:.1f}s")
+    return len(with_collection), matrix.shape[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Matriz de colecciones de películas')
+    parser.add_argument('--output_dir', default=COLLECTION_DIR,
+                        help='Directorio de salida')
+    parser.add_argument('--fixtures', default=None,
+                        help='Corpus de fixtures para trabajar sin red')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Hilos de descarga')
+    args = parser.parse_args()
+
+    if args.fixtures:
+        load_fixture_corpus(args.fixtures)
+    run(args.output_dir, args.workers)
@@ -1,78 +1,476 @@
 # calibrate_weights.py
 
-import random
+"""
+Calibración one-hot de WEIGHTS con usuarios sintéticos.
+
+Para cada usuario sintético se calculan una sola vez, frente a todo el
+catálogo, los productos escalares y las normas de cada bloque de
+características (matriz títulos × bloques, ver catalog.block_terms). Con
+ellos cualquier vector de pesos, one-hot o continuo, se evalúa con una
+reducción O(bloques) por título, sin volver a vectorizar nada. Si hay un
+catálogo vectorizado vigente (vectorize_catalog.py) los términos salen de
+su matriz; si no, cada título se vectoriza una vez por usuario.
+
+Los usuarios sintéticos se generan con un numpy.random.Generator por
+proveedor, derivado de --seed: la misma semilla reproduce la calibración
+en cualquier proceso o máquina.
+
+Los proveedores con más usuarios que MAX_TASK_USERS se reparten en lotes
+de tamaño fijo y se envían primero los lotes más grandes, para no dejar
+rezagadas al final; al terminar se informa del uso de cada proceso.
+
+Con --target_width la calibración es secuencial: cada proveedor deja de
+simular usuarios en cuanto el intervalo de confianza (Wilson, 95 %) de la
+exactitud de todos los candidatos es más estrecho que el objetivo. Los
+intervalos alcanzados se guardan en el JSON de resultados.
+
+Cada tarea terminada se añade a un diario (JSON lines) en
+DATA/CALIBRATION/<ejecución>/; al relanzar la misma configuración se
+saltan las tareas ya hechas. Varias máquinas pueden repartirse las tareas
+con --shard k/n sobre un directorio compartido (cada proceso escribe su
+propio diario) y --merge combina los diarios en el JSON de resultados.
+
+    python calibrate_weights.py --type movies --users 100
+    python calibrate_weights.py --journal_dir /mnt/shared/calibration --shard 0/4
+    python calibrate_weights.py --journal_dir /mnt/shared/calibration --merge
+"""
+
+import glob
+import hashlib
 import json
 import argparse
+import os
+import socket
 import sys
 import time
 import threading
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
+import numpy as np
 
 # Importamos catálogos y recomendación
 from recommendation.data_utils import load_movie_platforms, load_series_platforms, load_artifacts
-from recommendation.recommendation_engine import calculate_affinity
+from recommendation.tmdb_client import get_movie_details
+from recommendation.series_client import get_series_details
+from recommendation.user_profile import build_user_profile, build_series_profile
+from recommendation.feature_engineering import build_feature_vector
+from recommendation.franchise import load_collection_index
+from recommendation.overview_svd import overview_dim
+from recommendation.catalog import (BLOCKS, UNIT_WEIGHTS, block_layout, block_of_columns,
+                                    block_terms, block_weights, platform_row_index)
+from recommendation.result_cache import artifact_version, catalog_version
+from recommendation.recommendation_engine import CONFIDENCE_Z
 from recommendation.config import WEIGHTS
 
+# Directorio por defecto de los diarios de calibración
+CALIBRATION_DIR = os.path.join("DATA", "CALIBRATION")
+
 # Parámetros para catálogos pequeños
 SMALL_CATALOG_THRESHOLD = 100
 SMALL_CATALOG_USERS = 50
 
+# Usuarios máximos por tarea: los proveedores con más se reparten en lotes
+MAX_TASK_USERS = 25
+
+# Modo secuencial: usuarios mínimos antes de comprobar los intervalos
+SEQUENTIAL_MIN_USERS = 10
+
+# Candidato con los pesos actuales de config.WEIGHTS
+CURRENT = '__current__'
+
 # -------------------------------------
 # Generación de usuarios sintéticos
 # -------------------------------------
-def generate_synthetic_user(platform_name, PLATFORMS,
-                            liked_n=10, noise_k=1,
-                            like_rating=5.0, noise_rating=1.0):
+def task_rng(seed, provider):
+    """
+    Generador de un proveedor, derivado de la semilla global (estable entre
+    procesos, a diferencia de hash()).
+    """
+    digest = hashlib.sha1(f"{seed}:{provider}".encode("utf-8")).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+
+def sampling_index(PLATFORMS):
+    """
+    IDs de todas las plataformas concatenados (con repetidos) y el rango de
+    cada una; se calcula una vez por catálogo. El resto del catálogo de una
+    plataforma son los dos tramos fuera de su rango, así que no hace falta
+    construir esa lista para cada usuario.
+
+    Devuelve:
+    - dict con "ids" (int64), "ptr" (rangos) y "position" ({plataforma: k}).
+    """
+    names = list(PLATFORMS)
+    sizes = np.array([len(PLATFORMS[p]) for p in names], dtype=np.int64)
+    ids = np.array([int(i) for p in names for i in PLATFORMS[p]], dtype=np.int64)
+    return {"ids": ids, "ptr": np.concatenate([[0], np.cumsum(sizes)]),
+            "position": {p: k for k, p in enumerate(names)}}
+
+
+def _sample_distinct(rng, n_users, population, k):
     """
-    Construye un perfil sintético:
+    k posiciones distintas de [0, population) para cada usuario (n_users × k).
+    Con k mucho menor que population se sortea con reemplazo y se repiten las
+    filas con duplicados (uniforme sobre los subconjuntos); si no, se
+    ordena una matriz aleatoria.
+    """
+    k = min(k, population)
+    if k == 0:
+        return np.zeros((n_users, 0), dtype=np.int64)
+    if population <= 4 * k:
+        return np.argsort(rng.random((n_users, population)), axis=1)[:, :k]
+    draws = rng.integers(0, population, size=(n_users, k))
+    while True:
+        ordered = np.sort(draws, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            return draws
+        draws[repeated] = rng.integers(0, population, size=(int(repeated.sum()), k))
+
+
+def sample_synthetic_users(platform_name, index, n_users, rng,
+                           liked_n=10, noise_k=1,
+                           like_rating=5.0, noise_rating=1.0):
+    """
+    Genera n_users perfiles sintéticos de una vez:
       - liked_n ítems de la plataforma con valoración alta.
       - noise_k ítems de otras plataformas con valoración baja.
+
+    Parámetros:
+    - platform_name: plataforma de los usuarios.
+    - index: salida de sampling_index.
+    - n_users: usuarios a generar.
+    - rng: numpy.random.Generator (ver task_rng).
+
+    Devuelve:
+    - list de dicts {id: valoración}.
     """
-    available = PLATFORMS[platform_name]
-    n_liked = min(liked_n, len(available))
-    liked = random.sample(available, n_liked)
-    ratings = {mid: like_rating for mid in liked}
+    ids, ptr = index["ids"], index["ptr"]
+    k = index["position"][platform_name]
+    start, size = int(ptr[k]), int(ptr[k + 1] - ptr[k])
+    liked = ids[start + _sample_distinct(rng, n_users, size, liked_n)]
+    # Posiciones fuera del rango de la plataforma: [0, start) y [start + size, total)
+    noise = _sample_distinct(rng, n_users, len(ids) - size, noise_k)
+    noise = ids[np.where(noise < start, noise, noise + size)]
+    users = []
+    for liked_row, noise_row in zip(liked.tolist(), noise.tolist()):
+        ratings = dict.fromkeys(liked_row, like_rating)
+        ratings.update(dict.fromkeys(noise_row, noise_rating))
+        users.append(ratings)
+    return users
 
-    other = [mid for p, ids in PLATFORMS.items() if p != platform_name for mid in ids]
-    n_noise = min(noise_k, len(other))
-    if n_noise > 0:
-        noise = random.sample(other, n_noise)
-        for mid in noise:
-            ratings[mid] = noise_rating
-    return ratings
+# -------------------------------------
+# Términos por bloque de un usuario
+# -------------------------------------
+def user_block_terms(ratings, tfidf, PLATFORMS, content_type='movies'):
+    """
+    Productos escalares y normas al cuadrado por bloque de un usuario
+    frente a todo el catálogo (ver catalog.block_terms), con el perfil sin
+    ponderar. Se usa la matriz del catálogo si está vigente; si no, cada
+    título se vectoriza una vez con pesos unitarios.
+
+    Devuelve:
+    - dict de catalog.block_terms ("dots", "items", "profile", "platforms",
+      "platform_ptr", "platform_rows").
+    """
+    if content_type == 'series':
+        profile_fn, details_fn = build_series_profile, get_series_details
+    else:
+        profile_fn, details_fn = build_user_profile, get_movie_details
+    parts = profile_fn(ratings, tfidf, PLATFORMS, UNIT_WEIGHTS)
+    terms = block_terms('series' if content_type == 'series' else 'movies', parts, tfidf,
+                        PLATFORMS, profile_weights=UNIT_WEIGHTS)
+    if terms is not None:
+        return terms
+
+    profile, genres, countries, companies, languages = parts
+    vocab = {"genre": genres, "availability": list(PLATFORMS),
+             "franchise": load_collection_index()["classes"], "country": countries,
+             "company": companies, "orig_lang": languages}
+    layout, dim = block_layout(vocab, overview_dim(tfidf))
+    owner = block_of_columns(layout, dim)
+    profile = profile.astype(np.float64)
+    ids = sorted({int(i) for v in PLATFORMS.values() for i in v})
+    found, dots, items = [], [], []
+    for item_id in ids:
+        det = details_fn(item_id)
+        if not det:
+            continue  # como en el motor: sin detalles no cuenta en la media
+        vec = build_feature_vector(det, genres, countries, companies, languages,
+                                   tfidf, PLATFORMS, UNIT_WEIGHTS).astype(np.float64)
+        found.append(item_id)
+        dots.append(np.bincount(owner, weights=profile * vec, minlength=len(BLOCKS)))
+        items.append(np.bincount(owner, weights=vec * vec, minlength=len(BLOCKS)))
+    ptr, rows = platform_row_index(np.array(found, dtype=np.int64), PLATFORMS)
+    shape = (len(found), len(BLOCKS))
+    return {"dots": np.array(dots).reshape(shape), "items": np.array(items).reshape(shape),
+            "profile": np.bincount(owner, weights=profile * profile, minlength=len(BLOCKS)),
+            "platforms": list(PLATFORMS), "platform_ptr": ptr, "platform_rows": rows}
+
+
+def best_platforms(terms, PLATFORMS, candidates):
+    """
+    Plataforma con mayor afinidad para cada vector de pesos candidato,
+    como reducción sobre los términos de user_block_terms.
+
+    Parámetros:
+    - terms: salida de user_block_terms.
+    - PLATFORMS: catálogo {plataforma: [ids]} (orden de desempate).
+    - candidates: dict {nombre: pesos por bloque}.
+
+    Devuelve:
+    - dict {nombre: plataforma}.
+    """
+    names = list(candidates)
+    w2 = np.array([block_weights(candidates[n]) for n in names]).T ** 2  # bloques × candidatos
+    dots = terms["dots"] @ w2
+    norms = np.sqrt(terms["items"] @ w2) * np.sqrt(terms["profile"] @ w2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sims = np.where(norms > 0, dots / norms, 0.0)
+    # Media por plataforma (plataformas × candidatos) con el índice de filas
+    ptr = terms["platform_ptr"]
+    totals = np.vstack([np.zeros((1, len(names))), np.cumsum(sims[terms["platform_rows"]], axis=0)])
+    counts = np.diff(ptr)[:, None]
+    means = np.where(counts > 0, (totals[ptr[1:]] - totals[ptr[:-1]]) / np.maximum(counts, 1), 0.0)
+    row_of = {str(name): k for k, name in enumerate(terms["platforms"])}
+    order = [p for p in PLATFORMS if str(p) in row_of]
+    if not order:
+        return dict.fromkeys(names)
+    table = means[[row_of[str(p)] for p in order]]
+    return {n: order[int(np.argmax(table[:, j]))] for j, n in enumerate(names)}
+
+# -------------------------------------
+# Planificación de tareas
+# -------------------------------------
+def provider_users(PLATFORMS, provider, base_n):
+    """
+    Usuarios sintéticos de un proveedor (SMALL_CATALOG_USERS en catálogos pequeños).
+    """
+    size = len(PLATFORMS[provider])
+    return base_n if size >= SMALL_CATALOG_THRESHOLD else SMALL_CATALOG_USERS
+
+
+def plan_tasks(PLATFORMS, providers, base_n, max_task_users=MAX_TASK_USERS):
+    """
+    Reparte los usuarios de cada proveedor en tareas de como mucho
+    max_task_users y las ordena de mayor a menor número de usuarios (las
+    primeras en enviarse al pool). El plan solo depende de los parámetros,
+    no de los procesos, así que todas las máquinas de una ejecución
+    repartida calculan el mismo.
+
+    El coste por usuario es el mismo en todas las tareas: cada usuario
+    puntúa el catálogo entero (no solo el de su proveedor) y todas usan la
+    misma vía (matriz del catálogo o vectorización por título, según haya
+    un catálogo vigente). El muestreo, lo único que depende del tamaño del
+    proveedor, es despreciable; el coste de una tarea es su número de usuarios.
+
+    Devuelve:
+    - list de dicts {"task", "provider", "start", "stop"}: la tarea simula
+      los usuarios [start, stop) del proveedor.
+    """
+    plan = []
+    for provider in providers:
+        n_u = provider_users(PLATFORMS, provider, base_n)
+        for start in range(0, n_u, max_task_users):
+            stop = min(n_u, start + max_task_users)
+            plan.append({"task": f"{provider}:{start}-{stop}", "provider": provider,
+                         "start": start, "stop": stop})
+    plan.sort(key=lambda t: t["start"] - t["stop"])
+    return plan
+
+
+def worker_usage(records, wall):
+    """
+    Tareas, segundos ocupados y uso (ocupado / duración de la ejecución)
+    de cada proceso.
+    """
+    usage = {}
+    for record in records:
+        stats = usage.setdefault(record["worker"], {"tasks": 0, "busy_seconds": 0.0})
+        stats["tasks"] += 1
+        stats["busy_seconds"] += record["seconds"]
+    for stats in usage.values():
+        stats["utilisation"] = stats["busy_seconds"] / wall if wall else 0.0
+    return usage
+
+def wilson_interval(correct, total, z=CONFIDENCE_Z):
+    """
+    Intervalo de Wilson de una proporción (aciertos / total); admite arrays.
+
+    Devuelve:
+    - (límite inferior, límite superior); (0, 1) sin observaciones.
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    if total == 0:
+        return np.zeros_like(correct), np.ones_like(correct)
+    p = correct / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    half = z * np.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return np.maximum(center - half, 0.0), np.minimum(center + half, 1.0)
+
+
+def stratified_accuracy(correct, totals, planned, z=CONFIDENCE_Z):
+    """
+    Exactitud global como media de las exactitudes de cada proveedor,
+    ponderadas por sus usuarios previstos (provider_users), no por los
+    simulados: en modo secuencial los proveedores que convergen despacio
+    simulan más usuarios y no deben pesar más.
+
+    El error estándar de cada proveedor sale de su intervalo de Wilson
+    (semiamplitud / z, que no se anula con 0 o todos los aciertos) y el
+    global es sqrt(Σ w² · ee²).
+
+    Parámetros:
+    - correct: aciertos, proveedores × candidatos.
+    - totals: usuarios simulados de cada proveedor.
+    - planned: usuarios previstos de cada proveedor.
+
+    Devuelve:
+    - (exactitud, límite inferior, límite superior), arrays por candidato.
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    w = np.asarray(planned, dtype=np.float64)
+    w = w / w.sum()
+    accuracy = np.zeros(correct.shape[1])
+    variance = np.zeros(correct.shape[1])
+    for k, total in enumerate(totals):
+        if total:
+            accuracy += w[k] * correct[k] / total
+        low, high = wilson_interval(correct[k], total, z)
+        variance += (w[k] * (high - low) / (2 * z)) ** 2
+    half = z * np.sqrt(variance)
+    return accuracy, np.maximum(accuracy - half, 0.0), np.minimum(accuracy + half, 1.0)
 
 # -------------------------------------
 # Tarea de simulación individual
 # -------------------------------------
-def _simulate_task(block, provider, PLATFORMS, tfidf, base_n):
+def provider_samples(PLATFORMS, providers, base_n, seed):
     """
-    Simula base_n usuarios sintéticos para (bloque, proveedor).
-    Devuelve: bloque, aciertos, total
+    Usuarios sintéticos de cada proveedor, generados de una vez con su
+    generador (task_rng) sobre un único sampling_index; así los lotes de
+    plan_tasks no dependen de cómo se reparta el proveedor.
+
+    Devuelve:
+    - dict {proveedor: list de dicts {id: valoración}}.
     """
-    # One-hot para este bloque
-    orig = WEIGHTS.copy()
-    for k in WEIGHTS:
-        WEIGHTS[k] = 1.0 if k == block else 0.0
+    index = sampling_index(PLATFORMS)
+    return {p: sample_synthetic_users(p, index, provider_users(PLATFORMS, p, base_n), task_rng(seed, p))
+            for p in providers}
+
+
+def _simulate_task(task, users, PLATFORMS, tfidf, candidates, content_type='movies',
+                   target_width=None):
+    """
+    Simula los usuarios [start, stop) de una tarea de plan_tasks (users, ya
+    generados por provider_samples) y evalúa con cada uno todos los vectores
+    de pesos candidatos (los términos por bloque se calculan una vez por
+    usuario).
+
+    Con target_width, a partir de SEQUENTIAL_MIN_USERS usuarios se deja de
+    simular cuando el intervalo de Wilson de todos los candidatos es más
+    estrecho que target_width.
+    Devuelve: registro del diario (tarea, proveedor, aciertos {candidato: n},
+    total, si paró antes, proceso y segundos)
+    """
+    t0 = time.perf_counter()
+    provider = task["provider"]
+    correct = {name: 0 for name in candidates}
+    total, stopped = 0, False
+    for ratings in users:
+        terms = user_block_terms(ratings, tfidf, PLATFORMS, content_type)
+        for name, best in best_platforms(terms, PLATFORMS, candidates).items():
+            if best == provider:
+                correct[name] += 1
+        total += 1
+        if target_width and SEQUENTIAL_MIN_USERS <= total < len(users):
+            low, high = wilson_interval(list(correct.values()), total)
+            if (high - low).max() < target_width:
+                stopped = True
+                break
+    return {"task": task["task"], "provider": provider, "users": [task["start"], task["stop"]],
+            "correct": correct, "total": total, "stopped_early": stopped,
+            "worker": f"{socket.gethostname()}-{os.getpid()}", "seconds": time.perf_counter() - t0}
+
+# -------------------------------------
+# Diario de tareas
+# -------------------------------------
+def run_key(content_type, PLATFORMS, tfidf, base_n, providers, candidates, seed, target_width=None):
+    """
+    Hash de todo lo que determina los resultados de una calibración: dos
+    ejecuciones con la misma clave producen las mismas tareas y resultados,
+    así que pueden compartir diario.
+    """
+    payload = json.dumps({
+        "content_type": content_type, "catalog": catalog_version(PLATFORMS),
+        "artifacts": artifact_version(tfidf), "base_n": base_n, "seed": seed,
+        "providers": [str(p) for p in providers], "candidates": candidates,
+        "small_catalog": [SMALL_CATALOG_THRESHOLD, SMALL_CATALOG_USERS],
+        "target_width": target_width, "sequential_min_users": SEQUENTIAL_MIN_USERS,
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-    # Determinamos número de usuarios según catálogo
-    size = len(PLATFORMS[provider])
-    n_u = base_n if size >= SMALL_CATALOG_THRESHOLD else SMALL_CATALOG_USERS
-    correct = 0
-    for _ in range(n_u):
-        ratings = generate_synthetic_user(provider, PLATFORMS)
-        _, best = calculate_affinity(ratings, tfidf, PLATFORMS)
-        if best == provider:
-            correct += 1
-    # Restauramos pesos originales
-    WEIGHTS.update(orig)
-    return block, correct, n_u
+
+def journal_path(journal_dir, content_type, key):
+    """
+    Diario propio de este proceso dentro del directorio de la ejecución
+    (uno por máquina y proceso, para no mezclar escrituras en un
+    directorio compartido).
+    """
+    return os.path.join(journal_dir, f"{content_type}_{key[:12]}",
+                        f"{socket.gethostname()}-{os.getpid()}.jsonl")
+
+
+def load_journals(directory):
+    """
+    Combina todos los diarios de una ejecución.
+
+    Las líneas incompletas (proceso interrumpido a mitad de escritura) se
+    ignoran; si una tarea aparece en varios diarios se queda la primera
+    (con la misma semilla los resultados son idénticos).
+
+    Devuelve:
+    - dict {tarea: registro}.
+    """
+    done = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                done.setdefault(record["task"], record)
+    return done
+
+
+def append_journal(path, record):
+    """
+    Añade un registro al diario y lo fuerza a disco.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def parse_shard(text):
+    """
+    '2/4' -> (2, 4): esta máquina hace las tareas i con i % 4 == 2.
+    """
+    k, n = (int(x) for x in text.split("/"))
+    if not 0 <= k < n:
+        raise ValueError(f"shard inválido: {text}")
+    return k, n
 
 # -------------------------------------
 # Función principal
 # -------------------------------------
 def run_one_hot(n_users=500, processes=None, content_type='movies',
-                use_gui=False, max_providers=None, fast=False):
+                use_gui=False, max_providers=None, fast=False, seed=0,
+                journal_dir=CALIBRATION_DIR, shard=None, merge_only=False,
+                max_task_users=MAX_TASK_USERS, target_width=None):
     """
     Ejecuta la calibración one-hot.
     --users: base de usuarios sintéticos
@@ -81,6 +479,12 @@ def run_one_hot(n_users=500, processes=None, content_type='movies',
     --max_providers: límite de proveedores
     --fast: modo rápido (n_users//5)
     --gui: mostrar GUI de progreso
+    --seed: semilla de los usuarios sintéticos y de los proveedores
+    --journal_dir: directorio de los diarios (None = sin diario)
+    --shard: (k, n), parte de las tareas que hace esta máquina
+    --merge: solo combinar los diarios y guardar los resultados
+    --max_task_users: usuarios máximos por tarea (ver plan_tasks)
+    --target_width: anchura objetivo del intervalo (modo secuencial)
     """
     # Cargamos catálogos según tipo
     if content_type == 'movies':
@@ -106,21 +510,52 @@ def run_one_hot(n_users=500, processes=None, content_type='movies',
     # Seleccionamos los proveedores
     providers = list(PLATFORMS.keys())
     if max_providers and max_providers < len(providers):
-        providers = random.sample(providers, max_providers)
+        rng = np.random.default_rng(seed)
+        providers = [providers[k] for k in rng.choice(len(providers), max_providers, replace=False)]
 
-    # Definimos bloques y tareas
+    # Definimos bloques y tareas: cada una evalúa todos los vectores one-hot
+    # (y los pesos actuales) con los mismos usuarios de un proveedor
     blocks = list(WEIGHTS.keys())
-    total_tasks = len(blocks) * len(providers)
+    candidates = {b: {k: 1.0 if k == b else 0.0 for k in blocks} for b in blocks}
+    candidates[CURRENT] = dict(WEIGHTS)
     num_procs = processes or multiprocessing.cpu_count()
 
-    # Acumuladores
-    sum_correct = {b: 0 for b in blocks}
-    sum_total = {b: 0 for b in blocks}
+    # Diario: tareas ya hechas (por esta u otras máquinas) y parte de este proceso
+    key = run_key(content_type, PLATFORMS, tfidf, base_n, providers, candidates, seed, target_width)
+    journal = journal_path(journal_dir, content_type, key) if journal_dir else None
+    records = load_journals(os.path.dirname(journal)) if journal else {}
+    # Plan ordenado por usuarios; el reparto k % n alterna lotes grandes y pequeños.
+    # En modo secuencial cada proveedor es una sola tarea: la regla de parada
+    # necesita ver sus usuarios en orden
+    if target_width:
+        max_task_users = max(base_n, SMALL_CATALOG_USERS)
+    plan = plan_tasks(PLATFORMS, providers, base_n, max_task_users)
+    pending = [t for k, t in enumerate(plan)
+               if t["task"] not in records and (shard is None or k % shard[1] == shard[0])]
+    if merge_only:
+        pending = []
+    done = sum(1 for t in plan if t["task"] in records)
+    if done:
+        print(f'{done}/{len(plan)} tasks already in {os.path.dirname(journal)}', file=sys.stderr)
+    # Usuarios generados una vez por ejecución; cada tarea recibe su lote
+    samples = provider_samples(PLATFORMS, list(dict.fromkeys(t["provider"] for t in pending)),
+                               base_n, seed)
+    tasks = [(t, samples[t["provider"]][t["start"]:t["stop"]], PLATFORMS, tfidf,
+              candidates, content_type, target_width)
+             for t in pending]
+    total_tasks = len(tasks)
     completed = 0
     start = time.time()
+    finished = []
+
+    def collect(record):
+        records[record["task"]] = record
+        finished.append(record)
+        if journal:
+            append_journal(journal, record)
 
     # GUI opcional
-    if use_gui:
+    if use_gui and tasks:
         import tkinter as tk
         from tkinter import ttk
         root = tk.Tk()
@@ -136,14 +571,10 @@ def run_one_hot(n_users=500, processes=None, content_type='movies',
 
         def worker():
             nonlocal completed
-            tasks = [(b, p, PLATFORMS, tfidf, base_n)
-                     for b in blocks for p in providers]
             with ProcessPoolExecutor(max_workers=num_procs) as exe:
                 futures = {exe.submit(_simulate_task, *t): t for t in tasks}
                 for fut in as_completed(futures):
-                    b, c, tot = fut.result()
-                    sum_correct[b] += c
-                    sum_total[b] += tot
+                    collect(fut.result())
                     completed += 1
                     elapsed = time.time() - start
                     eta = (elapsed / completed) * (total_tasks - completed)
@@ -152,25 +583,58 @@ def run_one_hot(n_users=500, processes=None, content_type='movies',
 
         threading.Thread(target=worker, daemon=True).start()
         root.mainloop()
-    else:
+    elif tasks:
         from tqdm import tqdm
-        tasks = [(b, p, PLATFORMS, tfidf, base_n)
-                 for b in blocks for p in providers]
         print(f'Executing {total_tasks} tasks with {num_procs} processes...', file=sys.stderr)
         with ProcessPoolExecutor(max_workers=num_procs) as exe:
             futures = {exe.submit(_simulate_task, *t): t for t in tasks}
             for fut in tqdm(as_completed(futures), total=total_tasks,
                              desc='Progress', file=sys.stderr):
-                b, c, tot = fut.result()
-                sum_correct[b] += c
-                sum_total[b] += tot
+                collect(fut.result())
+
+    # Uso de cada proceso en esta ejecución
+    if finished:
+        wall = time.time() - start
+        for worker, stats in sorted(worker_usage(finished, wall).items()):
+            print(f'{worker}: {stats["tasks"]} tasks, {stats["busy_seconds"]:.1f}s busy '
+                  f'({stats["utilisation"]:.0%} of {wall:.1f}s)', file=sys.stderr)
 
-    # Calculamos exactitudes y pesos finales
-    accuracies = {b: (sum_correct[b] / sum_total[b] if sum_total[b] else 0.0)
-                  for b in blocks}
+    missing = [t for t in plan if t["task"] not in records]
+    if missing:
+        print(f'{len(missing)} tasks still pending (other shards?); results not written. '
+              f'Journal: {os.path.dirname(journal) if journal else "-"}', file=sys.stderr)
+        return None
+    planned = [records[t["task"]] for t in plan]
+
+    # Aciertos por proveedor e intervalos alcanzados en cada uno
+    names = blocks + [CURRENT]
+    correct, totals = [], []
+    provider_intervals = {}
+    for p in providers:
+        mine = [r for r in planned if r["provider"] == p]
+        n = sum(r["total"] for r in mine)
+        row = [sum(r["correct"][name] for r in mine) for name in names]
+        low, high = wilson_interval(row[:len(blocks)], n)
+        correct.append(row)
+        totals.append(n)
+        provider_intervals[str(p)] = {
+            'users': n,
+            'stopped_early': any(r.get("stopped_early") for r in mine),
+            'intervals': {b: [float(low[k]), float(high[k])] for k, b in enumerate(blocks)},
+        }
+    sum_total = sum(totals)
+
+    # Calculamos exactitudes (por proveedor, ponderadas por los usuarios
+    # previstos) y pesos finales
+    acc, low, high = stratified_accuracy(
+        correct, totals, [provider_users(PLATFORMS, p, base_n) for p in providers])
+    accuracies = {b: float(acc[k]) for k, b in enumerate(blocks)}
     total_acc = sum(accuracies.values()) or 1.0
     final_weights = {b: accuracies[b] / total_acc for b in blocks}
-    one_hot_inputs = {b: {k: 1.0 if k == b else 0.0 for k in blocks} for b in blocks}
+    one_hot_inputs = {b: candidates[b] for b in blocks}
+    current_accuracy = float(acc[-1])
+    intervals = {b: [float(low[k]), float(high[k])] for k, b in enumerate(blocks)}
+    current_interval = [float(low[-1]), float(high[-1])]
 
     # Guardamos resultados
     out = {
@@ -178,16 +642,27 @@ def run_one_hot(n_users=500, processes=None, content_type='movies',
         'n_users': n_users,
         'max_providers': max_providers,
         'fast_mode': fast,
+        'seed': seed,
         'processes': num_procs,
         'one_hot_inputs': one_hot_inputs,
         'accuracies': accuracies,
         'final_weights': final_weights,
-        'processed_providers': providers
+        'current_weights_accuracy': current_accuracy,
+        'current_weights_interval': current_interval,
+        'target_width': target_width,
+        'users_simulated': sum_total,
+        'intervals': intervals,
+        'provider_intervals': provider_intervals,
+        'processed_providers': providers,
+        'tasks': len(plan),
+        'worker_seconds': {w: s["busy_seconds"] for w, s in worker_usage(planned, 0).items()},
+        'run_key': key
     }
     fn = f'one_hot_{content_type}_results.json'
     with open(fn, 'w') as f:
         json.dump(out, f, indent=2)
     print('Results saved to', fn)
+    return out
 
 # -------------------------------------
 # Entrada principal
@@ -206,11 +681,31 @@ if __name__ == '__main__':
                         help='Máximo proveedores a muestrear (reduce tareas)')
     parser.add_argument('--fast', action='store_true',
                         help='Modo rápido: reduce base de usuarios para acelerar')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Semilla de los usuarios sintéticos (reproducible entre procesos)')
+    parser.add_argument('--journal_dir', default=CALIBRATION_DIR,
+                        help='Directorio (compartible entre máquinas) de los diarios de tareas')
+    parser.add_argument('--no_journal', action='store_true',
+                        help='No guardar ni reanudar desde el diario')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='Parte k/n de las tareas que hace esta máquina (p. ej. 0/4)')
+    parser.add_argument('--merge', action='store_true',
+                        help='Solo combinar los diarios y guardar los resultados')
+    parser.add_argument('--max_task_users', type=int, default=MAX_TASK_USERS,
+                        help='Usuarios máximos por tarea (los proveedores grandes se reparten en lotes)')
+    parser.add_argument('--target_width', type=float, default=None,
+                        help='Modo secuencial: parar cada proveedor cuando el intervalo al 95 %% '
+                             'de todas las exactitudes sea más estrecho que este valor')
     args = parser.parse_args()
     run_one_hot(n_users=args.users,
                 processes=args.processes,
                 content_type=args.type,
                 use_gui=args.gui,
                 max_providers=args.max_providers,
-                fast=args.fast)
-
+                fast=args.fast,
+                seed=args.seed,
+                journal_dir=None if args.no_journal else args.journal_dir,
+                shard=args.shard,
+                merge_only=args.merge,
+                max_task_users=args.max_task_users,
+                target_width=args.target_width)
@@ -0,0 +1,52 @@
+# fit_overview_svd.py
+
+"""
+Ajusta la proyección LSA (TruncatedSVD) del TF-IDF de los overviews y la
+guarda junto al vectorizador (DATA/OVERVIEW/overview_svd.pkl y su
+equivalente de series). Ver recommendation/overview_svd.py.
+
+A partir de entonces los perfiles y el catálogo vectorizado usan el bloque
+de overview proyectado; los catálogos, los precálculos y la caché de
+resultados anteriores se ignoran (cambia artifact_version). Hay que volver
+a ejecutar vectorize_catalog.py y precompute_reference_scores.py.
+
+    python fit_overview_svd.py --type all --components 256
+"""
+
+import argparse
+import time
+
+from recommendation.data_utils import load_artifacts
+from recommendation.overview_svd import SVD_COMPONENTS, fit_overview_svd, svd_path
+
+
+def run(types, n_components=SVD_COMPONENTS, seed=0):
+    """
+    Ajusta y guarda la proyección de cada tipo.
+
+    Devuelve:
+    - dict {tipo: fracción de varianza explicada}.
+    """
+    explained = {}
+    for content_type in types:
+        t0 = time.perf_counter()
+        model = fit_overview_svd(content_type, load_artifacts(content_type=content_type),
+                                 n_components, seed)
+        explained[content_type] = model["explained_variance"]
+        print(f"{svd_path(content_type)}: {model['svd'].n_components} componentes, "
+              f"{model['explained_variance']:.1%} de la varianza, {time.perf_counter() - t0:.1f}s")
+    return explained
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Proyección LSA del TF-IDF de los overviews')
+    parser.add_argument('--type', choices=['movies', 'series', 'all'], default='all',
+                        help='Vectorizadores a proyectar')
+    parser.add_argument('--components', type=int, default=SVD_COMPONENTS,
+                        help='Dimensiones de la proyección')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Semilla del SVD aleatorizado')
+    args = parser.parse_args()
+
+    types = ['movies', 'series'] if args.type == 'all' else [args.type]
+    run(types, args.components, args.seed)
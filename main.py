@@ -3,10 +3,13 @@
 import tkinter as tk
 from tkinter import ttk
 from recommendation.flows import movies_flow, series_flow, mix_flow
+from recommendation.title_index import warm_title_indexes
 
 # Función principal para inicializar la GUI de recomendaciones
 
 def main():
+    # Índice local de títulos en segundo plano para las búsquedas
+    warm_title_indexes()
     window = tk.Tk()
     window.title("SISTEMA DE RECOMENDACIONES PARA SERVICIOS DE STREAMING")
     window.geometry("1920x1080")
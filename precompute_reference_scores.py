@@ -0,0 +1,83 @@
+# precompute_reference_scores.py
+
+"""
+Precalcula las contribuciones por plataforma de los títulos de referencia
+de la configuración rápida (ver recommendation/reference_scores.py).
+
+Genera los conjuntos que usan los flujos:
+- movies: los 10 de REFERENCE_MOVIES con el vectorizador de películas.
+- series: los 10 de REFERENCE_SERIES con el vectorizador de series.
+- mix: los 5 primeros de cada uno con el vectorizador de películas
+  (el flujo mixto puntúa las series con él).
+
+Hay que repetirlo al cambiar el catálogo, WEIGHTS o los artefactos; los
+precálculos desfasados se ignoran automáticamente.
+
+    python precompute_reference_scores.py --type all
+    python precompute_reference_scores.py --fixtures DATA/FIXTURES/tmdb_fixtures.jsonl.gz
+"""
+
+import argparse
+import time
+
+from recommendation.config import REFERENCE_MOVIES, REFERENCE_SERIES
+from recommendation.data_utils import load_movie_platforms, load_series_platforms, load_artifacts
+from recommendation.fixtures import load_fixture_corpus
+from recommendation.reference_scores import (
+    REFERENCE_DIR, build_reference_contributions, save_reference_contributions, reference_path
+)
+
+
+def reference_sets(types):
+    """
+    Conjuntos a precalcular: [(tipo, ids de referencia, content_type del vectorizador)].
+    """
+    sets = []
+    if "movies" in types:
+        sets.append(("movies", list(REFERENCE_MOVIES)[:10], "movies"))
+    if "series" in types:
+        sets.append(("series", list(REFERENCE_SERIES)[:10], "series"))
+    if "mix" in types:
+        sets.append(("movies", list(REFERENCE_MOVIES)[:5], "movies"))
+        sets.append(("series", list(REFERENCE_SERIES)[:5], "movies"))
+    return sets
+
+
+def run(types, output_dir=REFERENCE_DIR, workers=16):
+    """
+    Calcula y guarda los precálculos pedidos.
+
+    Devuelve:
+    - list de rutas escritas.
+    """
+    platforms = {"movies": load_movie_platforms(), "series": load_series_platforms()}
+    vectorizers = {"movies": load_artifacts(), "series": load_artifacts(content_type="series")}
+    written = []
+    for content_type, ref_ids, tfidf_type in reference_sets(types):
+        t0 = time.perf_counter()
+        data = build_reference_contributions(content_type, ref_ids, vectorizers[tfidf_type],
+                                             platforms[content_type], max_workers=workers)
+        path = reference_path(data, content_type, output_dir)
+        save_reference_contributions(data, path)
+        written.append(path)
+        print(f"{path}: {len(data['ids'])}/{len(ref_ids)} referencias, "
+              f"{int(data['counts'].sum())} títulos, {time.perf_counter() - t0:.1f}s")
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precálculo de los títulos de referencia')
+    parser.add_argument('--type', choices=['movies', 'series', 'mix', 'all'], default='all',
+                        help='Conjuntos a precalcular')
+    parser.add_argument('--output_dir', default=REFERENCE_DIR,
+                        help='Directorio de salida')
+    parser.add_argument('--fixtures', default=None,
+                        help='Corpus de fixtures para trabajar sin red')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Hilos de descarga y vectorización')
+    args = parser.parse_args()
+
+    if args.fixtures:
+        load_fixture_corpus(args.fixtures)
+    types = ['movies', 'series', 'mix'] if args.type == 'all' else [args.type]
+    run(types, args.output_dir, args.workers)
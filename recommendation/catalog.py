@@ -0,0 +1,799 @@
+# recommendation/catalog.py
+
+"""
+Matriz de características del catálogo, vectorizada fuera de línea.
+
+Cada fila es el vector de build_feature_vector de un título (con el bloque
+de overview en TF-IDF o en su proyección LSA, ver overview_svd), expresado en
+un vocabulario global (todos los géneros, países, compañías e idiomas del
+catálogo) y guardado como matriz CSR. Con ella el motor puntúa todas las
+plataformas con dos productos matriz-vector en lugar de descargar y
+vectorizar el catálogo en cada cálculo.
+
+Las filas se guardan sin ponderar (pesos unitarios) y WEIGHTS se aplica al
+puntuar: block_terms calcula, por título, el producto escalar y la norma
+al cuadrado de cada bloque, y weighted_scores combina esos términos para
+cualquier vector de pesos w,
+
+    coseno = Σ w_b²·dot_b / sqrt(Σ w_b²·‖a_b‖² · Σ w_b²·‖b_b‖²)
+
+así que cambiar los pesos (p. ej. con calibrate_weights.py) no obliga a
+reconstruir el catálogo.
+
+Equivalencia con el motor: build_user_profile limita el vocabulario a las
+categorías de los títulos valorados, así que en el cálculo normal las
+categorías de un título que no están en ese vocabulario no cuentan ni en
+el producto escalar ni en su norma. catalog_scores reproduce exactamente
+ese coseno proyectando el perfil en el vocabulario global y calculando la
+norma de cada fila solo sobre las columnas del vocabulario del usuario.
+
+La vectorización (build_catalog) reparte el catálogo en fragmentos entre
+un pool de procesos: cada proceso construye un trozo CSR con su propio
+vocabulario y el proceso principal los fusiona remapeando columnas. Las
+ejecuciones incrementales solo vectorizan títulos nuevos, cambiados o
+que fallaron antes. Los títulos sin géneros en TMDB reciben en la fusión
+los inferidos por lotes a partir de su fila TF-IDF (ver genre_inference).
+
+La matriz se guarda con la precisión de config.FEATURE_DTYPE. Con
+config.OVERVIEW_QUANTIZATION = "int8" el bloque TF-IDF, el más grande, se
+guarda aparte cuantizado por fila (int8 más una escala float32) y los
+productos escalares se calculan sobre los enteros y se reescalan.
+
+Cada catálogo se guarda como un directorio de .npy (componentes CSR,
+índice de plataformas) que load_catalog mapea en memoria en solo lectura:
+los procesos que sirven recomendaciones comparten una única copia en la
+caché de páginas y arrancan sin leer la matriz.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from recommendation.config import WEIGHTS, OVERVIEW_QUANTIZATION
+from recommendation.feature_engineering import feature_dtype
+from recommendation.result_cache import catalog_version, tfidf_version
+from recommendation.franchise import collection_rows, load_collection_index
+from recommendation.genre_inference import load_predicted_genres, predict_genres, save_predicted_genres
+from recommendation.metrics import incr, timed
+from recommendation.nlp_utils import clean_overview
+from recommendation.overview_svd import overview_dim, overview_svd, overview_version, project_overview
+from recommendation.data_utils import (
+    CATALOG_STORE_NUMERIC, CatalogStore, load_arrays, remove_arrays, save_arrays, save_release_years
+)
+
+CATALOG_DIR = os.path.join("DATA", "CATALOG")
+
+# Bloques de build_feature_vector, en su orden
+BLOCKS = ("genre", "overview", "availability", "year", "collection", "franchise", "country",
+          "company", "popularity", "vote_avg", "revenue", "orig_lang", "seasons", "episodes")
+# Bloques cuyo tamaño depende de un vocabulario
+CATEGORICAL = ("genre", "availability", "franchise", "country", "company", "orig_lang")
+# Bloques globales (plataformas, colecciones): se reconstruyen al fusionar
+# desde el catálogo y el índice de colecciones, no en los procesos del pool
+GLOBAL = ("availability", "franchise")
+
+# Pesos con los que se vectorizan las filas del catálogo (uno por bloque)
+UNIT_WEIGHTS = {block: 1.0 for block in BLOCKS}
+
+# Modos de almacenamiento del bloque TF-IDF
+QUANTIZATIONS = ("none", "int8")
+# Formato de las filas (forma parte de catalog_artifact_version)
+CATALOG_FORMAT = "unweighted"
+
+# Estado de cada proceso del pool (tipo de contenido y vectorizador)
+_worker = {}
+
+# Catálogos cargados: {directorio: catálogo o None}
+_loaded = {}
+_lock = threading.Lock()
+
+
+def block_layout(vocab: dict, n_terms: int) -> tuple:
+    """
+    Posición de cada bloque en un vector con el vocabulario dado.
+
+    Devuelve:
+    - (dict {bloque: (inicio, fin)}, dimensión total)
+    """
+    layout, start = {}, 0
+    for block in BLOCKS:
+        if block in CATEGORICAL:
+            size = len(vocab[block])
+        else:
+            size = n_terms if block == "overview" else 1
+        layout[block] = (start, start + size)
+        start += size
+    return layout, start
+
+
+def block_weights(weights: dict = None) -> np.ndarray:
+    """
+    Vector de pesos en el orden de BLOCKS (por defecto WEIGHTS); los bloques
+    sin peso, como temporadas y episodios en películas, valen 0.
+    """
+    weights = WEIGHTS if weights is None else weights
+    return np.array([float(weights.get(block, 0.0)) for block in BLOCKS])
+
+
+def block_of_columns(layout: dict, dim: int) -> np.ndarray:
+    """
+    Índice (en BLOCKS) del bloque al que pertenece cada columna.
+    """
+    owner = np.zeros(dim, dtype=np.int64)
+    for b, block in enumerate(BLOCKS):
+        b0, b1 = layout[block]
+        owner[b0:b1] = b
+    return owner
+
+
+def _column_map(src_vocab: dict, dst_vocab: dict, n_terms: int, skip=()) -> np.ndarray:
+    """
+    Columna de destino de cada columna de origen (-1 si la categoría no
+    existe en el destino o el bloque está en `skip`).
+    """
+    src_layout, src_dim = block_layout(src_vocab, n_terms)
+    dst_layout, _ = block_layout(dst_vocab, n_terms)
+    mapping = np.full(src_dim, -1, dtype=np.int64)
+    for block in BLOCKS:
+        if block in skip:
+            continue
+        s0, s1 = src_layout[block]
+        d0, _ = dst_layout[block]
+        if block in CATEGORICAL:
+            index = {name: k for k, name in enumerate(dst_vocab[block])}
+            for k, name in enumerate(src_vocab[block]):
+                if name in index:
+                    mapping[s0 + k] = d0 + index[name]
+        else:
+            mapping[s0:s1] = np.arange(d0, d0 + (s1 - s0))
+    return mapping
+
+
+def _remap(matrix, mapping: np.ndarray, dim: int):
+    """
+    Reordena las columnas de una matriz CSR según _column_map.
+    """
+    coo = matrix.tocoo()
+    cols = mapping[coo.col]
+    keep = cols >= 0
+    return sp.csr_matrix((coo.data[keep], (coo.row[keep], cols[keep])), shape=(matrix.shape[0], dim))
+
+
+def _init_worker(content_type: str, tfidf_type: str, fixtures=None) -> None:
+    """
+    Inicializa un proceso del pool: carga el vectorizador y, si se indica,
+    el corpus de fixtures en las cachés de los clientes.
+    """
+    from recommendation.data_utils import load_artifacts
+    from recommendation.fixtures import load_fixture_corpus
+    if fixtures:
+        load_fixture_corpus(fixtures)
+    _worker["content_type"] = content_type
+    _worker["tfidf"] = load_artifacts(content_type=tfidf_type)
+
+
+def vectorize_shard(ids: list) -> dict:
+    """
+    Vectoriza un fragmento del catálogo en un proceso del pool.
+
+    Las filas son las de build_feature_vector sin ponderar (UNIT_WEIGHTS),
+    calculadas por bloques sobre un data_utils.CatalogStore del fragmento:
+    los bloques numéricos y categóricos salen de sus arrays y el TF-IDF de
+    una sola transformación por lotes. La disponibilidad y la franquicia se
+    dejan vacías (se reconstruyen al fusionar a partir del catálogo y del
+    índice de colecciones); las categorías usan el vocabulario del
+    fragmento, solo con los géneros de TMDB (los inferidos se añaden al
+    fusionar).
+
+    Devuelve:
+    - dict con "ids" (filas), "missing" (sin detalles), "no_genre" (sin
+      géneros en TMDB), "no_genre_tfidf" (sus filas TF-IDF sin ponderar,
+      para el clasificador de géneros), "years" ({id: año} de los que
+      tienen fecha), "vocab", "matrix" (CSR), "rows", "seconds" y
+      "worker" (pid).
+    """
+    from recommendation.tmdb_client import get_movie_details
+    from recommendation.series_client import get_series_details
+    details_fn = get_series_details if _worker["content_type"] == "series" else get_movie_details
+    tfidf = _worker["tfidf"]
+    dtype = feature_dtype()
+    start = time.perf_counter()
+
+    found, missing = [], []
+    for item_id in ids:
+        det = details_fn(item_id)
+        if det:
+            found.append((int(item_id), det))
+        else:
+            missing.append(int(item_id))
+    store = CatalogStore.from_items(found)
+    done = [int(i) for i in store.records["id"]]
+    overviews = {}
+    for item_id, det in found:
+        overviews.setdefault(item_id, det.get('overview', ''))
+    texts = [clean_overview(overviews[i]) for i in done]
+    tfidf_rows = tfidf.transform(texts) if done else sp.csr_matrix((0, len(tfidf.vocabulary_)))
+
+    vocab = {"genre": store.vocab["genre"], "country": store.vocab["country"],
+             "company": store.vocab["company"], "orig_lang": store.vocab["orig_lang"],
+             "availability": [], "franchise": []}
+    blocks = {block: store.categorical_block(block, vocab[block])
+              for block in ("genre", "country", "company", "orig_lang")}
+    svd = overview_svd(tfidf)
+    blocks["overview"] = (tfidf_rows.astype(dtype) if svd is None
+                          else sp.csr_matrix(project_overview(svd, tfidf_rows).astype(dtype)))
+    numeric = store.numeric_block(weights=UNIT_WEIGHTS)
+    for k, block in enumerate(CATALOG_STORE_NUMERIC):
+        blocks[block] = sp.csr_matrix(numeric[:, k:k + 1])
+    for block in GLOBAL:
+        blocks[block] = sp.csr_matrix((len(done), 0))
+    matrix = sp.hstack([blocks[block] for block in BLOCKS], format="csr").astype(dtype)
+    matrix.eliminate_zeros()
+
+    no_genre_rows = np.flatnonzero(np.diff(store.codes["genre"][0]) == 0)
+    years = store.records["year"]
+    return {"ids": done, "missing": missing, "no_genre": [done[r] for r in no_genre_rows],
+            "no_genre_tfidf": tfidf_rows[no_genre_rows],
+            "years": {i: int(y) for i, y in zip(done, years.tolist()) if not np.isnan(y)},
+            "vocab": vocab, "matrix": matrix, "rows": len(done),
+            "seconds": time.perf_counter() - start, "worker": os.getpid()}
+
+
+def _availability_block(ids: np.ndarray, platforms: dict) -> sp.csr_matrix:
+    """
+    Bloque de disponibilidad (sin ponderar) de las filas a partir del catálogo.
+    """
+    row_of = {int(i): r for r, i in enumerate(ids)}
+    rows, cols = [], []
+    for k, p in enumerate(platforms):
+        for item_id in set(int(i) for i in platforms[p]):
+            r = row_of.get(item_id)
+            if r is not None:
+                rows.append(r)
+                cols.append(k)
+    data = np.ones(len(rows))
+    return sp.csr_matrix((data, (rows, cols)), shape=(len(ids), len(platforms)))
+
+
+def _infer_missing_genres(content_type: str, tfidf_type: str, chunks: list) -> dict:
+    """
+    Géneros de las filas nuevas que TMDB devuelve sin géneros.
+
+    Con el vectorizador del propio tipo (el del clasificador) se infieren en
+    lote desde las filas TF-IDF de esos títulos y se guardan (ver
+    genre_inference); con otro (series del flujo mixto) se reutilizan los
+    ya guardados.
+
+    Devuelve:
+    - dict {id: [nombres]}.
+    """
+    stored = load_predicted_genres(content_type)["genres"]
+    targets, rows = [], []
+    for chunk in chunks:
+        if chunk["no_genre"]:
+            targets.extend(chunk["no_genre"])
+            rows.append(chunk["no_genre_tfidf"])
+    if not targets:
+        return {}
+    if tfidf_type == content_type:
+        predicted = predict_genres(content_type, sp.vstack(rows))
+        if predicted:
+            inferred = dict(zip(targets, predicted))
+            save_predicted_genres(content_type, {**stored, **inferred})
+            return inferred
+    return {i: stored[i] for i in targets if i in stored}
+
+
+def quantize_rows(matrix) -> tuple:
+    """
+    Cuantiza una matriz dispersa a int8 con una escala por fila
+    (simétrica: el mayor valor absoluto de la fila pasa a ser ±127).
+
+    Devuelve:
+    - (CSR int8, escalas float32): fila ≈ escala · fila_int8.
+    """
+    matrix = sp.csr_matrix(matrix)
+    peak = abs(matrix).max(axis=1).toarray().ravel() if matrix.nnz else np.zeros(matrix.shape[0])
+    scale = (peak / 127.0).astype(np.float32)
+    row_scale = np.repeat(scale, np.diff(matrix.indptr)).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        data = np.where(row_scale > 0, matrix.data / row_scale, 0.0)
+    q = sp.csr_matrix((np.rint(data).astype(np.int8), matrix.indices.copy(), matrix.indptr.copy()),
+                      shape=matrix.shape)
+    q.eliminate_zeros()
+    return q, scale
+
+
+def dequantize_rows(q, scale: np.ndarray, dtype=None) -> sp.csr_matrix:
+    """
+    Inversa aproximada de quantize_rows.
+    """
+    dtype = dtype or feature_dtype()
+    data = q.data.astype(dtype) * np.repeat(scale, np.diff(q.indptr)).astype(dtype)
+    return sp.csr_matrix((data, q.indices, q.indptr), shape=q.shape)
+
+
+def _split_overview(matrix, layout: dict) -> tuple:
+    """
+    Separa el bloque TF-IDF de la matriz y lo cuantiza.
+
+    Devuelve:
+    - (matriz sin el bloque, CSR int8 filas × términos, escalas por fila).
+    """
+    o0, o1 = layout["overview"]
+    coo = matrix.tocoo()
+    inside = (coo.col >= o0) & (coo.col < o1)
+    rest = sp.csr_matrix((coo.data[~inside], (coo.row[~inside], coo.col[~inside])), shape=matrix.shape)
+    block = sp.csr_matrix((coo.data[inside], (coo.row[inside], coo.col[inside] - o0)),
+                          shape=(matrix.shape[0], o1 - o0))
+    q, scale = quantize_rows(block)
+    return rest, q, scale
+
+
+def _full_matrix(catalog: dict):
+    """
+    Matriz completa de un catálogo cargado (con el bloque TF-IDF
+    descuantizado si se guardó en int8).
+    """
+    if "overview_q" not in catalog:
+        return catalog["matrix"]
+    layout, _ = block_layout(catalog["vocab"], catalog["n_terms"])
+    o0, _ = layout["overview"]
+    block = dequantize_rows(catalog["overview_q"], catalog["overview_scale"], catalog["matrix"].dtype).tocoo()
+    return (catalog["matrix"] + sp.csr_matrix((block.data, (block.row, block.col + o0)),
+                                              shape=catalog["matrix"].shape)).tocsr()
+
+
+def catalog_artifact_version(content_type: str, tfidf) -> str:
+    """
+    Versión de los artefactos que afectan a las filas de un tipo: el
+    vectorizador, su proyección LSA, los géneros inferidos del tipo y, en
+    películas, el índice de colecciones, además de la precisión, la
+    cuantización y el formato de las filas. No incluye WEIGHTS: las filas
+    no están ponderadas. (Más estrecha que result_cache.artifact_version, para que
+    reconstruir un catálogo no invalide los de otro tipo.)
+    """
+    extra = load_predicted_genres(content_type)["version"]
+    extra += f"|{overview_version(tfidf)}|{feature_dtype().name}|{OVERVIEW_QUANTIZATION}|{CATALOG_FORMAT}"
+    if content_type != "series":
+        extra += "|" + load_collection_index()["version"]
+    return hashlib.sha1(f"{tfidf_version(tfidf)}|{extra}".encode("ascii")).hexdigest()
+
+
+def catalog_path(content_type: str, tfidf, base_dir: str = CATALOG_DIR) -> str:
+    """
+    Directorio del catálogo de un tipo con un vectorizador concreto
+    (el flujo mixto puntúa las series con el vectorizador de películas).
+    """
+    return os.path.join(base_dir, f"{content_type}_{catalog_artifact_version(content_type, tfidf)[:10]}")
+
+
+# Arrays de un catálogo guardado, cada uno en su .npy (ver data_utils.save_arrays)
+_ARRAYS = ("data", "indices", "indptr", "squared", "ids", "platform_ptr", "platform_rows")
+_QUANTIZED_ARRAYS = ("overview_q_data", "overview_q_indices", "overview_q_indptr",
+                     "overview_scale", "overview_squared")
+# Claves de un catálogo que no van a meta.json
+_NOT_META = ("matrix", "ids", "squared", "platform_ptr", "platform_rows",
+             "overview_q", "overview_scale", "overview_squared")
+
+
+def platform_row_index(ids: np.ndarray, platforms: dict) -> tuple:
+    """
+    Filas de cada plataforma como rangos de un único array (tipo CSR):
+    las de la plataforma k son rows[ptr[k]:ptr[k + 1]]. Se conservan los
+    IDs repetidos, como en la media del motor.
+    """
+    ptr, rows = [0], []
+    for members in platforms.values():
+        members = np.array([int(i) for i in members], dtype=np.int64)
+        found = np.searchsorted(ids, members)
+        found = found[(found < len(ids)) & (ids[np.minimum(found, len(ids) - 1)] == members)] \
+            if len(ids) else found[:0]
+        rows.append(found)
+        ptr.append(ptr[-1] + len(found))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    return np.array(ptr, dtype=np.int64), rows.astype(np.int64)
+
+
+def save_catalog(catalog: dict, path: str) -> None:
+    """
+    Guarda el catálogo en un directorio de .npy que se pueden mapear en
+    memoria: componentes CSR de la matriz (data, indices, indptr), sus
+    valores al cuadrado (squared), los IDs de fila, el índice de
+    plataformas (platform_ptr, platform_rows), el bloque TF-IDF cuantizado
+    si lo hay y los metadatos (meta.json). Todo se publica a la vez como
+    una generación de data_utils.save_arrays.
+    """
+    matrix = catalog["matrix"]
+    arrays = {"data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr,
+              "squared": matrix.data * matrix.data, "ids": catalog["ids"],
+              "platform_ptr": catalog["platform_ptr"], "platform_rows": catalog["platform_rows"]}
+    if "overview_q" in catalog:
+        q, scale = catalog["overview_q"], catalog["overview_scale"]
+        q_sq = q.astype(np.int32).multiply(q.astype(np.int32)).sum(axis=1).A1
+        arrays.update({"overview_q_data": q.data, "overview_q_indices": q.indices,
+                       "overview_q_indptr": q.indptr, "overview_scale": scale,
+                       "overview_squared": (q_sq * scale.astype(np.float64) ** 2).astype(matrix.dtype)})
+    meta = {k: v for k, v in catalog.items() if k not in _NOT_META}
+    meta["shape"] = list(matrix.shape)
+    save_arrays(path, arrays, meta)
+    with _lock:
+        _loaded.pop(path, None)
+
+
+def load_catalog(path: str, mmap: bool = True):
+    """
+    Carga un catálogo guardado (memorizado por ruta). Con mmap=True los
+    arrays se mapean en solo lectura, así que varios procesos comparten una
+    única copia en memoria y la carga es inmediata sea cual sea el tamaño.
+
+    Devuelve:
+    - dict con "ids", "matrix", "vocab", "n_terms", "missing", "versions",
+      más "squared" (matriz al cuadrado), "platforms", "platform_ptr" y
+      "platform_rows" para puntuar; con el bloque TF-IDF cuantizado,
+      también "overview_q", "overview_scale" y "overview_squared" (su norma
+      al cuadrado por fila). None si no existe.
+    """
+    with _lock:
+        if path in _loaded:
+            return _loaded[path]
+    catalog = None
+    # Metadatos y arrays de la misma generación (ver data_utils.save_arrays)
+    arrays = load_arrays(path, _ARRAYS, mmap, optional=_QUANTIZED_ARRAYS)
+    if arrays is not None and "meta" in arrays:
+        catalog = arrays["meta"]
+        shape = tuple(catalog.pop("shape"))
+        indices, indptr = arrays["indices"], arrays["indptr"]
+        catalog["matrix"] = sp.csr_matrix((arrays["data"], indices, indptr), shape=shape, copy=False)
+        catalog["squared"] = sp.csr_matrix((arrays["squared"], indices, indptr), shape=shape, copy=False)
+        for name in ("ids", "platform_ptr", "platform_rows"):
+            catalog[name] = arrays[name]
+        if all(name in arrays for name in _QUANTIZED_ARRAYS):
+            catalog["overview_q"] = sp.csr_matrix(
+                (arrays["overview_q_data"], arrays["overview_q_indices"], arrays["overview_q_indptr"]),
+                shape=(shape[0], catalog["n_terms"]), copy=False)
+            catalog["overview_scale"] = arrays["overview_scale"]
+            catalog["overview_squared"] = arrays["overview_squared"]
+    with _lock:
+        _loaded[path] = catalog
+    return catalog
+
+
+def build_catalog(content_type: str, PLATFORMS: dict, tfidf, tfidf_type: str = None,
+                  base_dir: str = CATALOG_DIR, workers: int = None, shard_size: int = 500,
+                  incremental: bool = True, changed_ids=(), fixtures: str = None,
+                  progress=None) -> tuple:
+    """
+    Vectoriza el catálogo en paralelo y guarda la matriz fusionada.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - PLATFORMS: catálogo {plataforma: [ids]}.
+    - tfidf: vectorizador (se recarga en cada proceso a partir de tfidf_type).
+    - tfidf_type: 'movies' o 'series' (por defecto, content_type).
+    - base_dir: directorio raíz de los catálogos.
+    - workers: procesos del pool (None = CPUs).
+    - shard_size: títulos por fragmento.
+    - incremental: reutilizar las filas de un catálogo previo compatible.
+    - changed_ids: IDs a volver a vectorizar aunque ya estén en la matriz.
+    - fixtures: corpus de fixtures que cargará cada proceso.
+    - progress: callback opcional (fragmentos hechos, total, resultado del fragmento).
+
+    Devuelve:
+    - (ruta, estadísticas): "vectorized", "reused", "removed", "missing",
+      "genres_inferred", "seconds" y "workers" {pid: {"rows", "seconds",
+      "rows_per_second"}}.
+    """
+    if OVERVIEW_QUANTIZATION not in QUANTIZATIONS:
+        raise ValueError(f"OVERVIEW_QUANTIZATION debe ser uno de {QUANTIZATIONS}")
+    start = time.perf_counter()
+    path = catalog_path(content_type, tfidf, base_dir)
+    n_terms = overview_dim(tfidf)
+    platform_names = list(PLATFORMS)
+    wanted = sorted({int(i) for ids in PLATFORMS.values() for i in ids})
+
+    base = load_catalog(path) if incremental else None
+    if base is not None and base["versions"]["artifact"] != catalog_artifact_version(content_type, tfidf):
+        base = None  # vectorizador u otros artefactos distintos: reconstrucción completa
+    if base is not None:
+        wanted_set = set(wanted)
+        retry = {int(i) for i in changed_ids} | set(base["missing"])
+        keep_rows = [r for r, i in enumerate(base["ids"])
+                     if int(i) in wanted_set and int(i) not in retry]
+        base_ids = {int(i) for i in base["ids"]}
+        todo = [i for i in wanted if i not in base_ids or i in retry]
+        removed = sum(1 for i in base["ids"] if int(i) not in wanted_set)
+    else:
+        keep_rows, todo, removed = [], wanted, 0
+
+    shards = [todo[k:k + shard_size] for k in range(0, len(todo), shard_size)]
+    chunks, per_worker = [], {}
+    if shards:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(content_type, tfidf_type or content_type, fixtures)) as exe:
+            futures = [exe.submit(vectorize_shard, shard) for shard in shards]
+            for n, fut in enumerate(as_completed(futures), 1):
+                chunk = fut.result()
+                chunks.append(chunk)
+                stats = per_worker.setdefault(chunk["worker"], {"rows": 0, "seconds": 0.0})
+                stats["rows"] += chunk["rows"]
+                stats["seconds"] += chunk["seconds"]
+                if progress:
+                    progress(n, len(shards), chunk)
+    inferred = _infer_missing_genres(content_type, tfidf_type or content_type, chunks)
+    years = {i: y for chunk in chunks for i, y in chunk["years"].items()}
+    if years:
+        save_release_years(content_type, years, base_dir)  # para el índice local de títulos
+
+    # Vocabulario global: el previo más las categorías nuevas (ordenadas)
+    vocab = {block: list(base["vocab"][block]) if base else [] for block in CATEGORICAL}
+    vocab["availability"] = platform_names
+    vocab["franchise"] = load_collection_index()["classes"]
+    for block in CATEGORICAL:
+        if block in GLOBAL:
+            continue
+        known = set(vocab[block])
+        new = {name for chunk in chunks for name in chunk["vocab"][block] if name not in known}
+        vocab[block].extend(sorted(new, key=str))
+    known = set(vocab["genre"])
+    vocab["genre"].extend(sorted({n for names in inferred.values() for n in names if n not in known}))
+    layout, dim = block_layout(vocab, n_terms)
+
+    with timed("catalog.merge"):
+        parts, ids = [], []
+        if keep_rows:
+            mapping = _column_map(base["vocab"], vocab, n_terms, skip=GLOBAL)
+            parts.append(_remap(_full_matrix(base)[keep_rows], mapping, dim))
+            ids.extend(int(base["ids"][r]) for r in keep_rows)
+        for chunk in chunks:
+            if chunk["rows"]:
+                mapping = _column_map(chunk["vocab"], vocab, n_terms, skip=GLOBAL)
+                parts.append(_remap(chunk["matrix"], mapping, dim))
+                ids.extend(chunk["ids"])
+        ids = np.array(ids, dtype=np.int64)
+        matrix = sp.vstack(parts).tocsr() if parts else sp.csr_matrix((0, dim))
+        order = np.argsort(ids, kind="stable")
+        ids, matrix = ids[order], matrix[order]
+        # Bloques globales reconstruidos para todas las filas: disponibilidad
+        # desde el catálogo actual y franquicia (solo películas) desde collection_matrix
+        globals_ = {"availability": _availability_block(ids, PLATFORMS)}
+        if content_type != "series":
+            globals_["franchise"] = collection_rows(ids)
+        for block, values in globals_.items():
+            b0, _ = layout[block]
+            values = values.tocoo()
+            matrix = matrix + sp.csr_matrix((values.data, (values.row, values.col + b0)),
+                                            shape=matrix.shape)
+        # Géneros inferidos de las filas nuevas sin géneros en TMDB
+        g0, _ = layout["genre"]
+        column = {name: k for k, name in enumerate(vocab["genre"])}
+        row_of = {int(i): r for r, i in enumerate(ids)}
+        cells = [(row_of[i], g0 + column[name]) for i, names in inferred.items()
+                 for name in dict.fromkeys(names)]
+        if cells:
+            g_rows, g_cols = zip(*cells)
+            matrix = matrix + sp.csr_matrix((np.ones(len(cells)), (g_rows, g_cols)),
+                                            shape=matrix.shape)
+        matrix = matrix.tocsr().astype(feature_dtype())
+        quantized = {}
+        if OVERVIEW_QUANTIZATION == "int8":
+            matrix, quantized["overview_q"], quantized["overview_scale"] = _split_overview(matrix, layout)
+
+    missing = sorted({i for chunk in chunks for i in chunk["missing"]}
+                     | ({i for i in base["missing"] if i not in set(todo)} if base else set()))
+    for stats in per_worker.values():
+        stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    summary = {
+        "vectorized": sum(c["rows"] for c in chunks),
+        "reused": len(keep_rows),
+        "removed": removed,
+        "missing": len(missing),
+        "genres_inferred": len(inferred),
+        "seconds": time.perf_counter() - start,
+        "workers": {str(pid): s for pid, s in per_worker.items()},
+    }
+    # Los géneros inferidos nuevos cambian la versión de los artefactos
+    final_path = catalog_path(content_type, tfidf, base_dir)
+    platform_ptr, platform_rows = platform_row_index(ids, PLATFORMS)
+    save_catalog({
+        "content_type": content_type,
+        "ids": ids,
+        "matrix": matrix,
+        "platform_ptr": platform_ptr,
+        "platform_rows": platform_rows,
+        "vocab": vocab,
+        "n_terms": n_terms,
+        "missing": missing,
+        "versions": {"catalog": catalog_version(PLATFORMS),
+                     "artifact": catalog_artifact_version(content_type, tfidf)},
+        "quantization": OVERVIEW_QUANTIZATION,
+        "platforms": platform_names,
+        "stats": summary,
+        **quantized,
+    }, final_path)
+    if final_path != path and os.path.lexists(path):
+        remove_arrays(path)  # versión anterior del mismo catálogo
+        with _lock:
+            _loaded.pop(path, None)
+    return final_path, summary
+
+
+def block_terms(content_type: str, profile_parts: tuple, tfidf, PLATFORMS: dict,
+                base_dir: str = CATALOG_DIR, profile_weights: dict = None):
+    """
+    Términos por bloque del coseno entre un perfil y cada título del
+    catálogo, sin ponderar; weighted_scores los combina con cualquier
+    vector de pesos.
+
+    Se deshace la ponderación del perfil dividiendo cada bloque por el peso
+    con que se construyó (profile_weights, por defecto WEIGHTS). Un bloque
+    construido con peso 0 es nulo y sigue siéndolo con cualquier peso: para
+    evaluar varios vectores de pesos, el perfil debe construirse con
+    UNIT_WEIGHTS (y profile_weights=UNIT_WEIGHTS).
+
+    Como en el motor, la norma de cada título solo cuenta los bloques fijos
+    y las categorías del vocabulario del usuario.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - profile_parts: salida de build_user_profile / build_series_profile
+      (perfil, géneros, países, compañías, idiomas).
+    - tfidf, PLATFORMS: los mismos que recibiría el motor.
+    - profile_weights: pesos con los que se construyó el perfil.
+
+    Devuelve:
+    - dict con "dots" (títulos × bloques, productos escalares), "items"
+      (títulos × bloques, normas al cuadrado de los títulos), "profile"
+      (bloques, normas al cuadrado del perfil), "platforms", "platform_ptr"
+      y "platform_rows" (índice de plataformas del catálogo); o None si no
+      hay un catálogo vigente (distinto catálogo o vectorizador).
+    """
+    catalog = load_catalog(catalog_path(content_type, tfidf, base_dir))
+    if catalog is None:
+        return None
+    if catalog["versions"]["catalog"] != catalog_version(PLATFORMS):
+        incr("catalog.stale")
+        return None
+    incr("catalog.hit")
+
+    profile, genres, countries, companies, languages = profile_parts
+    user_vocab = {"genre": genres, "availability": list(PLATFORMS),
+                  "franchise": load_collection_index()["classes"], "country": countries,
+                  "company": companies, "orig_lang": languages}
+    with timed("catalog.block_terms"):
+        n_terms = catalog["n_terms"]
+        dtype = catalog["matrix"].dtype
+        # Perfil sin ponderar, bloque a bloque
+        user_layout, user_dim = block_layout(user_vocab, n_terms)
+        user_owner = block_of_columns(user_layout, user_dim)
+        w = block_weights(profile_weights)
+        inverse = np.divide(1.0, w, out=np.zeros_like(w), where=w != 0)
+        unweighted = (profile * inverse[user_owner]).astype(dtype)
+        profile_sq = np.bincount(user_owner, weights=unweighted.astype(np.float64) ** 2,
+                                 minlength=len(BLOCKS))
+
+        layout, dim = block_layout(catalog["vocab"], n_terms)
+        owner = block_of_columns(layout, dim)
+        mapping = _column_map(user_vocab, catalog["vocab"], n_terms)
+        mapped = mapping >= 0
+        projected = np.zeros(dim, dtype=dtype)
+        projected[mapping[mapped]] = unweighted[mapped]
+        # Columnas que cuentan en la norma: bloques fijos y vocabulario del usuario
+        mask = np.zeros(dim, dtype=dtype)
+        for block in BLOCKS:
+            if block not in CATEGORICAL:
+                b0, b1 = layout[block]
+                mask[b0:b1] = 1.0
+        mask[mapping[mapped]] = 1.0
+
+        # Indicadora columna → bloque, con el perfil o la máscara dentro
+        indicator = np.zeros((dim, len(BLOCKS)), dtype=dtype)
+        columns = np.arange(dim)
+        indicator[columns, owner] = projected
+        dots = np.asarray(catalog["matrix"] @ indicator, dtype=np.float64)
+        indicator[columns, owner] = mask
+        items_sq = np.asarray(catalog["squared"] @ indicator, dtype=np.float64)
+        if "overview_q" in catalog:
+            # Bloque TF-IDF en int8: producto sobre los enteros y reescalado por fila
+            o0, o1 = layout["overview"]
+            k = BLOCKS.index("overview")
+            dots[:, k] += catalog["overview_scale"] * (catalog["overview_q"] @ projected[o0:o1])
+            items_sq[:, k] += catalog["overview_squared"]
+    return {"dots": dots, "items": items_sq, "profile": profile_sq,
+            "platforms": catalog["platforms"], "platform_ptr": catalog["platform_ptr"],
+            "platform_rows": catalog["platform_rows"]}
+
+
+def weighted_similarities(terms: dict, weights: dict = None) -> np.ndarray:
+    """
+    Coseno de cada título con los pesos dados (por defecto WEIGHTS), a
+    partir de los términos de block_terms: O(bloques) por título.
+    """
+    w2 = block_weights(weights) ** 2
+    dots = terms["dots"] @ w2
+    norms = np.sqrt(terms["items"] @ w2)
+    norm_p = np.sqrt(terms["profile"] @ w2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((norms > 0) & (norm_p > 0), dots / (norm_p * norms), 0.0)
+
+
+def platform_means(terms: dict, sims: np.ndarray) -> dict:
+    """
+    Media de las similitudes de cada plataforma con el índice del catálogo
+    (se conservan los IDs repetidos, como en el motor).
+    """
+    ptr = terms["platform_ptr"]
+    totals = np.concatenate([[0.0], np.cumsum(sims[terms["platform_rows"]], dtype=np.float64)])
+    counts = np.diff(ptr)
+    means = np.where(counts > 0, (totals[ptr[1:]] - totals[ptr[:-1]]) / np.maximum(counts, 1), 0.0)
+    return {name: float(means[k]) for k, name in enumerate(terms["platforms"])}
+
+
+def weighted_scores(terms: dict, PLATFORMS: dict, weights: dict = None) -> dict:
+    """
+    Afinidad por plataforma con los pesos dados (por defecto WEIGHTS).
+    """
+    with timed("catalog.score"):
+        by_name = platform_means(terms, weighted_similarities(terms, weights))
+    return {p: by_name.get(str(p), 0.0) for p in PLATFORMS}
+
+
+def catalog_scores(content_type: str, profile_parts: tuple, tfidf, PLATFORMS: dict,
+                   base_dir: str = CATALOG_DIR, weights: dict = None):
+    """
+    Afinidad exacta por plataforma usando la matriz del catálogo.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - profile_parts: salida de build_user_profile / build_series_profile
+      (perfil, géneros, países, compañías, idiomas) construida con `weights`.
+    - tfidf, PLATFORMS: los mismos que recibiría el motor.
+    - weights: pesos por bloque (por defecto WEIGHTS).
+
+    Devuelve:
+    - dict {platform: score}, o None si no hay un catálogo vigente
+      (distinto catálogo o vectorizador).
+    """
+    terms = block_terms(content_type, profile_parts, tfidf, PLATFORMS, base_dir, weights)
+    if terms is None:
+        return None
+    return weighted_scores(terms, PLATFORMS, weights)
+
+
+def update_catalog(content_type: str, diff: dict, PLATFORMS: dict, tfidf, tfidf_type: str = None,
+                   base_dir: str = CATALOG_DIR, workers: int = None, shard_size: int = 500,
+                   fixtures: str = None, progress=None) -> tuple:
+    """
+    Aplica a la matriz del catálogo el diff entre dos exports diarios de
+    IDs (ver data_utils.diff_id_exports) sin reconstruirla.
+
+    - removed: títulos que ya no existen en TMDB; se quitan del índice de
+      plataformas y de la matriz.
+    - changed: se vuelven a descargar y vectorizar (filas y TF-IDF nuevos).
+
+    Los títulos nuevos no vienen en el diff: build_catalog vectoriza los que
+    figuran en el índice y aún no están en la matriz.
+
+    Parámetros:
+    - content_type, tfidf, tfidf_type, base_dir, workers, shard_size,
+      fixtures, progress: ver build_catalog.
+    - diff: dict {"changed", "removed"}.
+    - PLATFORMS: índice {plataforma: [ids]} actual.
+
+    Devuelve:
+    - (índice parcheado, ruta, estadísticas de build_catalog con
+      "index_removed" y "changed" añadidos).
+    """
+    removed = {int(i) for i in diff["removed"]}
+    patched = {p: [i for i in ids if int(i) not in removed] for p, ids in PLATFORMS.items()}
+    listed = {int(i) for ids in patched.values() for i in ids}
+    changed = [int(i) for i in diff["changed"] if int(i) in listed]
+    path, stats = build_catalog(content_type, patched, tfidf, tfidf_type, base_dir=base_dir,
+                                workers=workers, shard_size=shard_size, incremental=True,
+                                changed_ids=changed, fixtures=fixtures, progress=progress)
+    stats["index_removed"] = sum(len(PLATFORMS[p]) - len(patched[p]) for p in PLATFORMS)
+    stats["changed"] = len(changed)
+    return patched, path, stats
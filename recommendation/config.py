@@ -1,7 +1,36 @@
 # recommendation/config.py
 
+import os
+
 TMDB_API_KEY = "TU_CLAVE_AQUI"
 
+# URL base de la API; se puede apuntar a tmdb_stub_server.py con la variable
+# de entorno TMDB_BASE_URL (p. ej. http://127.0.0.1:8765/3)
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
+
+# Instrumentación por etapas (ver metrics.py); activable con RECSYS_METRICS=1
+METRICS_ENABLED = os.environ.get("RECSYS_METRICS", "0") == "1"
+
+# Directorio de la caché persistente de resultados del motor (ver result_cache.py);
+# sin definir, la caché es solo en memoria
+RESULT_CACHE_DIR = os.environ.get("RECSYS_RESULT_CACHE_DIR") or None
+
+# Precisión de los vectores de características ("float32" o "float64",
+# variable RECSYS_FEATURE_DTYPE; ver feature_engineering.py)
+FEATURE_DTYPE = os.environ.get("RECSYS_FEATURE_DTYPE", "float32")
+
+# Almacenamiento del bloque TF-IDF en el catálogo vectorizado: "none" o
+# "int8" (cuantizado por fila, variable RECSYS_OVERVIEW_QUANT; ver catalog.py)
+OVERVIEW_QUANTIZATION = os.environ.get("RECSYS_OVERVIEW_QUANT", "none")
+
+# Proyección LSA del overview, si existe overview_svd.pkl para el vectorizador
+# (ver overview_svd.py); RECSYS_OVERVIEW_SVD=0 la desactiva
+OVERVIEW_SVD = os.environ.get("RECSYS_OVERVIEW_SVD", "1") == "1"
+
+# Directorio del índice de plataformas parcheado por update_catalog.py
+# (variable RECSYS_PLATFORM_INDEX_DIR; ver data_utils.load_movie_platforms)
+PLATFORM_INDEX_DIR = os.environ.get("RECSYS_PLATFORM_INDEX_DIR", os.path.join("DATA", "CATALOG"))
+
 # Pesos para cada tipo de feature
 WEIGHTS = {
     "genre": 0.11004030138426493,
@@ -9,6 +38,7 @@ WEIGHTS = {
     "availability": 0.3194322761520939,
     "year": 0.010513404590853339,
     "collection": 0.016996670755212898,
+    "franchise": 0.016996670755212898,
     "country": 0.05484492728228492,
     "company": 0.18801471876642722,
     "popularity": 0.007008936393902225,
@@ -19,6 +49,17 @@ WEIGHTS = {
     "episodes": 0.01086385141054845
 }
 
+# Normalización de los bloques numéricos: valor = clip((x - origen) / escala, 0, 1)
+# (la comparten build_feature_vector y data_utils.CatalogStore)
+NUMERIC_SCALES = {
+    "year": (1900.0, 2025.0 - 1900.0),
+    "popularity": (0.0, 100.0),
+    "vote_avg": (0.0, 10.0),
+    "revenue": (0.0, 1e9),
+    "seasons": (0.0, 10.0),
+    "episodes": (0.0, 100.0),
+}
+
 REFERENCE_MOVIES = {
     278:    "The Shawshank Redemption",       
     496243: "Parasite",
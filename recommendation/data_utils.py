@@ -5,9 +5,53 @@ Utilidades para cargar datos y artefactos del proyecto de recomendación.
 Incluye funciones para leer proveedores desde Excel y cargar modelos preentrenados.
 """
 
+import glob
+import gzip
+import json
 import os
+import re
+import shutil
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import joblib
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from recommendation.config import WEIGHTS, NUMERIC_SCALES, PLATFORM_INDEX_DIR
+
+# Exports diarios de IDs de TMDB ({prefijo}_MM_DD_YYYY.json.gz)
+EXPORT_DIR = os.path.join("DATA", "ORIGINAL FILES")
+EXPORT_PREFIXES = {"movies": "movie_ids", "series": "tv_series_ids"}
+_EXPORT_DATE_RE = re.compile(r"_(\d{2})_(\d{2})_(\d{4})\.json\.gz$")
+
+# Tablas compactas de IDs generadas a partir de los exports (ver load_id_table);
+# fingerprint es la huella del registro sin la popularidad (ver diff_id_exports)
+ID_TABLE_DIR = os.path.join("DATA", "ID_TABLES")
+ID_TABLE_DTYPE = np.dtype([("id", np.int64), ("popularity", np.float32),
+                           ("adult", np.bool_), ("video", np.bool_),
+                           ("fingerprint", np.uint32)])
+
+# Años de estreno por ID para el índice local de títulos ({tipo}_release_years.npz
+# en el directorio del catálogo): los catálogos de títulos no traen fechas,
+# así que catalog.build_catalog guarda los de los detalles que descarga
+RELEASE_YEARS_FILE = "{}_release_years.npz"
+
+# Registro por título de CatalogStore (year = NaN si no hay fecha,
+# orig_lang = -1 si no hay idioma original). Los valores numéricos van en
+# float64, como en build_feature_vector
+CATALOG_STORE_DTYPE = np.dtype([("id", np.int32), ("popularity", np.float64),
+                                ("vote_avg", np.float64), ("revenue", np.float64),
+                                ("year", np.float64), ("collection", np.bool_),
+                                ("orig_lang", np.int16), ("seasons", np.int16),
+                                ("episodes", np.int32)])
+# Campos multivaluados de CatalogStore (con los nombres de los bloques del
+# catálogo vectorizado), guardados como CSR de códigos
+CATALOG_STORE_CODES = ("genre", "country", "company")
+# Columnas de CatalogStore.numeric_block (claves de WEIGHTS)
+CATALOG_STORE_NUMERIC = ("year", "collection", "popularity", "vote_avg", "revenue",
+                         "seasons", "episodes")
 
 def load_platforms_from_excel(filepath):
     """
@@ -45,26 +89,715 @@ def load_artifacts(base_dir="DATA", content_type="movies"):
     tfidf = joblib.load(tfidf_path)
     return tfidf
 
-def load_movie_platforms():
+def platform_index_path(content_type, base_dir=PLATFORM_INDEX_DIR):
+    """
+    Ruta del índice de plataformas parcheado de un tipo ('movies' o 'series').
+    """
+    return os.path.join(base_dir, f"{content_type}_platforms.json")
+
+# Excel de proveedores de cada tipo
+PLATFORM_SPREADSHEETS = {
+    "movies": os.path.join("DATA", "MOVIES", "PROVEEDORES", "resultado_proveedoresBINARI.xlsx"),
+    "series": os.path.join("DATA", "SERIES", "PROVEEDORES", "tv_series_PROVEEDORES_BINARI.xlsx"),
+}
+
+def save_platform_index(platforms, content_type, base_dir=PLATFORM_INDEX_DIR):
+    """
+    Guarda un índice {proveedor: [ids]} parcheado; a partir de entonces
+    load_movie_platforms / load_series_platforms (con index_dir = base_dir)
+    lo usan en lugar del Excel, mientras este no se actualice.
     """
-    Carga el diccionario de plataformas de películas desde el Excel.
+    path = platform_index_path(content_type, base_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({p: [int(i) for i in ids] for p, ids in platforms.items()}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _load_platforms(content_type, index_dir):
+    """
+    Índice parcheado de index_dir si existe y es más reciente que el Excel
+    (un Excel nuevo sustituye a los parches hechos sobre el anterior); si
+    no, el Excel.
+    """
+    path = platform_index_path(content_type, index_dir)
+    spreadsheet = PLATFORM_SPREADSHEETS[content_type]
+    if os.path.exists(path) and (not os.path.exists(spreadsheet)
+                                 or os.path.getmtime(path) >= os.path.getmtime(spreadsheet)):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return load_platforms_from_excel(spreadsheet)
+
+def load_movie_platforms(index_dir=PLATFORM_INDEX_DIR):
+    """
+    Carga el diccionario de plataformas de películas desde el Excel
+    (o desde el índice parcheado por update_catalog.py en index_dir, si es
+    más reciente).
 
     Devuelve:
     - dict: mapea proveedor a lista de movie_id.
     """
-    filepath = os.path.join(
-        "DATA", "MOVIES", "PROVEEDORES", "resultado_proveedoresBINARI.xlsx"
-    )
-    return load_platforms_from_excel(filepath)
+    return _load_platforms("movies", index_dir)
 
-def load_series_platforms():
+def load_series_platforms(index_dir=PLATFORM_INDEX_DIR):
     """
-    Carga el diccionario de plataformas de series desde el Excel.
+    Carga el diccionario de plataformas de series desde el Excel
+    (o desde el índice parcheado por update_catalog.py en index_dir, si es
+    más reciente).
 
     Devuelve:
     - dict: mapea proveedor a lista de series_id.
     """
-    filepath = os.path.join(
-        "DATA", "SERIES", "PROVEEDORES", "tv_series_PROVEEDORES_BINARI.xlsx"
+    return _load_platforms("series", index_dir)
+
+def load_release_years(content_type, base_dir=PLATFORM_INDEX_DIR):
+    """
+    Carga la tabla de años de estreno de un tipo de contenido.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - base_dir: directorio del catálogo.
+
+    Devuelve:
+    - dict: {id: año}; vacío si aún no se ha generado.
+    """
+    filepath = os.path.join(base_dir, RELEASE_YEARS_FILE.format(content_type))
+    if not os.path.exists(filepath):
+        return {}
+    with np.load(filepath, allow_pickle=False) as f:
+        return dict(zip(f["ids"].tolist(), f["years"].tolist()))
+
+def save_release_years(content_type, years, base_dir=PLATFORM_INDEX_DIR):
+    """
+    Añade años de estreno a la tabla (los IDs ya presentes se actualizan).
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - years: dict {id: año}.
+    - base_dir: directorio del catálogo.
+    """
+    filepath = os.path.join(base_dir, RELEASE_YEARS_FILE.format(content_type))
+    table = load_release_years(content_type, base_dir)
+    table.update({int(i): int(y) for i, y in years.items()})
+    ids = np.array(sorted(table), dtype=np.int64)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp = filepath + ".tmp.npz"
+    np.savez_compressed(tmp, ids=ids, years=np.array([table[i] for i in ids.tolist()], dtype=np.int16))
+    os.replace(tmp, filepath)
+
+def _with_years(records, years):
+    return [(i, t, p, years.get(i)) for i, t, p in records]
+
+def load_movie_titles(filepath=None, years_dir=PLATFORM_INDEX_DIR):
+    """
+    Carga los títulos del catálogo limpio de películas para el índice local
+    de búsqueda, con su año de estreno cuando se conoce (columna
+    release_date del Excel o tabla de load_release_years).
+
+    Parámetros:
+    - filepath: ruta al Excel (por defecto DATA/MOVIES/peliculeasCLEAN.xlsx).
+    - years_dir: directorio de la tabla de años (el del catálogo).
+
+    Devuelve:
+    - list: [(movie_id, title, popularity, year o None), ...]
+    """
+    filepath = filepath or os.path.join("DATA", "MOVIES", "peliculeasCLEAN.xlsx")
+    df = pd.read_excel(filepath, usecols=lambda c: c in ("id", "original_title", "popularity", "release_date"))
+    df = df.dropna(subset=["original_title"])
+    years = load_release_years("movies", years_dir)
+    if "release_date" in df:
+        dates = pd.to_datetime(df["release_date"], errors="coerce")
+        years.update({int(i): int(d.year) for i, d in zip(df["id"], dates) if not pd.isna(d)})
+    return _with_years(zip(df["id"].astype(int).tolist(), df["original_title"].astype(str),
+                           df["popularity"].fillna(0.0).astype(float)), years)
+
+def load_series_titles(filepath=None, min_popularity=0.5, years_dir=PLATFORM_INDEX_DIR):
+    """
+    Carga los títulos de series del export diario de TMDB para el índice
+    local de búsqueda, descartando las de popularidad residual. El export
+    se recorre en streaming (ver iter_id_export) y no trae fechas: el año
+    sale de la tabla de load_release_years.
+
+    Parámetros:
+    - filepath: ruta al .json.gz (por defecto el export de series en DATA/ORIGINAL FILES).
+    - min_popularity: popularidad mínima para incluir la serie.
+    - years_dir: directorio de la tabla de años (el del catálogo).
+
+    Devuelve:
+    - list: [(series_id, name, popularity, year o None), ...]
+    """
+    filepath = filepath or os.path.join(
+        "DATA", "ORIGINAL FILES", "tv_series_ids_03_19_2025.json.gz"
     )
-    return load_platforms_from_excel(filepath)
+    return _with_years([(int(r["id"]), str(r["original_name"]), float(r.get("popularity") or 0.0))
+                        for r in iter_id_export(filepath, min_popularity=min_popularity)
+                        if r.get("original_name") is not None], load_release_years("series", years_dir))
+
+def iter_id_export(filepath, min_popularity=None, adult=None, video=None):
+    """
+    Recorre un export diario de IDs de TMDB (JSON-lines comprimido con gzip)
+    descomprimiendo y parseando línea a línea, sin cargarlo entero.
+    Las líneas vacías o corruptas se ignoran.
+
+    Parámetros:
+    - filepath: ruta al .json.gz.
+    - min_popularity: popularidad mínima (None = sin filtro).
+    - adult: True / False para quedarse solo con títulos adultos / no adultos
+      (None = sin filtro). Los exports adult_* no traen siempre el campo:
+      en ellos se asume adult=True.
+    - video: igual que adult, para el indicador "video" de las películas.
+
+    Produce:
+    - dict por registro (p. ej. {"id", "original_title", "popularity", "adult", "video"}).
+    """
+    default_adult = os.path.basename(filepath).startswith("adult_")
+    with gzip.open(filepath, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "id" not in record:
+                continue
+            if min_popularity is not None and (record.get("popularity") or 0.0) < min_popularity:
+                continue
+            if adult is not None and bool(record.get("adult", default_adult)) != adult:
+                continue
+            if video is not None and bool(record.get("video", False)) != video:
+                continue
+            yield record
+
+def _fingerprint(record):
+    """
+    Huella de un registro sin la popularidad (que cambia a diario).
+    """
+    rest = {k: v for k, v in record.items() if k != "popularity"}
+    return zlib.crc32(json.dumps(rest, sort_keys=True).encode("utf-8"))
+
+def id_table_path(filepath, cache_dir=ID_TABLE_DIR):
+    """
+    Ruta de la tabla de IDs (.npy) correspondiente a un export.
+    """
+    name = os.path.basename(filepath)
+    for ext in (".gz", ".json"):
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+    return os.path.join(cache_dir, f"{name}.npy")
+
+def load_id_table(filepath, min_popularity=None, adult=None, video=None, cache_dir=ID_TABLE_DIR):
+    """
+    Tabla compacta de un export diario: array estructurado de numpy
+    (ID_TABLE_DTYPE: id, popularity, adult, video, fingerprint; 18 bytes
+    por título) ordenado por id y sin IDs repetidos (se queda el primero),
+    apto para np.searchsorted / np.isin.
+
+    La primera vez se construye recorriendo el export en streaming y se
+    guarda completa (sin filtros) en cache_dir; después se lee del .npy
+    mientras sea más reciente que el export.
+
+    Parámetros:
+    - filepath: ruta al .json.gz.
+    - min_popularity, adult, video: filtros (ver iter_id_export).
+    - cache_dir: directorio de las tablas (None = no guardar).
+
+    Devuelve:
+    - numpy.ndarray estructurado.
+    """
+    cached = id_table_path(filepath, cache_dir) if cache_dir else None
+    table = None
+    if cached and os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(filepath):
+        table = np.load(cached)
+        if table.dtype != ID_TABLE_DTYPE:
+            table = None  # tabla de una versión anterior del formato
+    if table is None:
+        default_adult = os.path.basename(filepath).startswith("adult_")
+        table = np.fromiter(
+            ((r["id"], r.get("popularity") or 0.0, r.get("adult", default_adult), r.get("video", False),
+              _fingerprint(r))
+             for r in iter_id_export(filepath)),
+            dtype=ID_TABLE_DTYPE,
+        )
+        _, first = np.unique(table["id"], return_index=True)
+        table = table[first]
+        if cached:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = cached + ".tmp.npy"
+            np.save(tmp, table)
+            os.replace(tmp, cached)
+    keep = np.ones(len(table), dtype=bool)
+    if min_popularity is not None:
+        keep &= table["popularity"] >= min_popularity
+    if adult is not None:
+        keep &= table["adult"] == adult
+    if video is not None:
+        keep &= table["video"] == video
+    return table if keep.all() else table[keep]
+
+# Intentos de load_arrays cuando se borra la generación que se estaba leyendo
+LOAD_ATTEMPTS = 5
+
+# Fichero de cada ruta de save_arrays con el nombre de la generación vigente
+CURRENT_FILE = "CURRENT"
+# Intentos de publicar CURRENT si un lector lo tiene abierto (Windows no
+# permite sustituir un fichero abierto)
+PUBLISH_ATTEMPTS = 20
+
+def _array_generations(directory):
+    """
+    Generaciones (<directory>/<uuid>) escritas por save_arrays.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in os.listdir(directory)
+            if re.fullmatch(r"[0-9a-f]{32}", name) and os.path.isdir(os.path.join(directory, name))]
+
+def current_generation(directory):
+    """
+    Directorio de la generación vigente de una ruta de save_arrays, según
+    su fichero CURRENT (None si no hay ninguna publicada).
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="ascii") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, name) if re.fullmatch(r"[0-9a-f]{32}", name) else None
+
+def _publish_current(directory, name):
+    """
+    Sustituye CURRENT de una vez (fichero temporal + os.replace).
+    """
+    tmp = os.path.join(directory, f"{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w", encoding="ascii") as f:
+        f.write(name)
+    for attempt in range(PUBLISH_ATTEMPTS):
+        try:
+            os.replace(tmp, os.path.join(directory, CURRENT_FILE))
+            return
+        except PermissionError:
+            if attempt == PUBLISH_ATTEMPTS - 1:
+                os.remove(tmp)
+                raise
+            time.sleep(0.01)
+
+def save_arrays(directory, arrays, meta=None):
+    """
+    Guarda cada array en su propio .npy, para poder abrirlos después con
+    load_arrays en modo memmap. Cada guardado es una generación completa en
+    un subdirectorio nuevo (<directory>/<uuid>) que se publica de una vez
+    escribiendo su nombre en <directory>/CURRENT (fichero temporal y
+    os.replace, sin enlaces simbólicos, que en Windows exigen permisos de
+    administrador): un lector ve la generación anterior o la nueva entera,
+    nunca una mezcla. Se conserva la generación anterior (los lectores en
+    curso pueden seguir abriendo ficheros de ella) y se borran las más
+    antiguas.
+
+    Parámetros:
+    - directory: ruta publicada (directorio con CURRENT y las generaciones).
+    - arrays: dict {nombre: array}.
+    - meta: dict opcional que se guarda como meta.json en la generación.
+    """
+    if os.path.islink(directory):
+        remove_arrays(directory)  # formato anterior: enlace a <directory>.<uuid>
+    elif os.path.isdir(directory) and not os.path.exists(os.path.join(directory, CURRENT_FILE)):
+        shutil.rmtree(directory)  # directorio de una versión sin generaciones
+    name = uuid.uuid4().hex
+    generation = os.path.join(directory, name)
+    os.makedirs(generation)
+    for key, array in arrays.items():
+        np.save(os.path.join(generation, f"{key}.npy"), np.ascontiguousarray(array))
+    if meta is not None:
+        with open(os.path.join(generation, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+    previous = current_generation(directory)
+    _publish_current(directory, name)
+    for old in _array_generations(directory):
+        if old not in (generation, previous):
+            shutil.rmtree(old, ignore_errors=True)  # en Windows, las mapeadas se borran más tarde
+
+def remove_arrays(directory):
+    """
+    Borra una ruta de save_arrays con todas sus generaciones (también las
+    del formato anterior, <directory>.<uuid> con un enlace simbólico).
+    """
+    if os.path.islink(directory):
+        os.remove(directory)
+    elif os.path.isdir(directory):
+        shutil.rmtree(directory)
+    for old in glob.glob(glob.escape(directory) + ".*"):
+        if re.fullmatch(r"[0-9a-f]{32}", old[len(directory) + 1:]) and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+
+def _load_generation(generation, names, mmap, optional):
+    arrays = {}
+    for name in (*names, *optional):
+        path = os.path.join(generation, f"{name}.npy")
+        if name in optional and not os.path.exists(path):
+            continue
+        arrays[name] = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    meta_path = os.path.join(generation, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            arrays["meta"] = json.load(f)
+    return arrays
+
+def load_arrays(directory, names, mmap=True, optional=()):
+    """
+    Abre los .npy guardados con save_arrays. Con mmap=True se mapean en
+    solo lectura: todos los procesos comparten la copia de la caché de
+    páginas del sistema y la carga no depende del tamaño.
+
+    Todo se lee de la generación que indica CURRENT (o del propio
+    directorio, si se guardó con una versión anterior). Si otro proceso
+    publica dos generaciones durante la lectura y la que se estaba leyendo
+    se borra, se vuelve a leer la vigente.
+
+    Parámetros:
+    - names: arrays obligatorios.
+    - optional: arrays que se cargan solo si existen.
+
+    Devuelve:
+    - dict {nombre: array}, más "meta" si se guardó meta.json, o None si
+      la ruta no existe o falta algún array obligatorio.
+    """
+    for _ in range(LOAD_ATTEMPTS):
+        generation = current_generation(directory)
+        if generation is None:
+            if not os.path.isdir(directory):
+                return None
+            generation = os.path.realpath(directory)  # formatos anteriores, sin CURRENT
+        try:
+            arrays = _load_generation(generation, names, mmap, optional)
+        except FileNotFoundError:
+            arrays = None
+        if os.path.isdir(generation):
+            return arrays  # la generación sigue ahí: lo que falte, falta de verdad
+    return None
+
+def dated_exports(content_type, directory=EXPORT_DIR):
+    """
+    Exports diarios de un tipo ('movies' o 'series') ordenados por fecha.
+
+    Devuelve:
+    - list: rutas, de la más antigua a la más reciente.
+    """
+    prefix = EXPORT_PREFIXES.get(content_type, content_type)
+    found = []
+    for path in glob.glob(os.path.join(directory, f"{prefix}_*.json.gz")):
+        m = _EXPORT_DATE_RE.search(path)
+        if m:
+            month, day, year = m.groups()
+            found.append((f"{year}{month}{day}", path))
+    return [path for _, path in sorted(found)]
+
+def diff_id_exports(old_path, new_path, popularity_delta=None, cache_dir=ID_TABLE_DIR):
+    """
+    Compara dos exports diarios a partir de sus tablas de IDs (ver
+    load_id_table): como ambas están ordenadas por id, el diff es una
+    búsqueda de los IDs de una en la otra y la comparación de las huellas
+    (CRC32 sin la popularidad), sin recorrer registros en Python. Las
+    tablas quedan en cache_dir, así que el export de hoy no se vuelve a
+    leer cuando mañana sea el anterior.
+
+    Parámetros:
+    - old_path, new_path: exports anterior y nuevo.
+    - popularity_delta: si se indica, un cambio de popularidad de al menos
+      este valor también cuenta como cambio (None = ignorar la popularidad).
+    - cache_dir: directorio de las tablas (None = no guardarlas).
+
+    Los IDs nuevos no hacen falta: se vectorizan cuando aparecen en el
+    índice de plataformas (los exports no incluyen proveedores).
+
+    Devuelve:
+    - dict: {"changed": [ids], "removed": [ids]} (ordenados).
+    """
+    old = load_id_table(old_path, cache_dir=cache_dir)
+    new = load_id_table(new_path, cache_dir=cache_dir)
+    pos = np.minimum(np.searchsorted(old["id"], new["id"]), max(len(old) - 1, 0))
+    kept = (old["id"][pos] == new["id"]) if len(old) else np.zeros(len(new), dtype=bool)
+    before, after = old[pos[kept]], new[kept]
+    changed = before["fingerprint"] != after["fingerprint"]
+    if popularity_delta is not None:
+        changed |= np.abs(after["popularity"].astype(np.float64)
+                          - before["popularity"].astype(np.float64)) >= popularity_delta
+    removed = old["id"][~np.isin(old["id"], new["id"], assume_unique=True)]
+    return {"changed": after["id"][changed].tolist(), "removed": removed.tolist()}
+
+class CatalogStore:
+    """
+    Catálogo compacto en memoria: un array estructurado por título
+    (CATALOG_STORE_DTYPE: 45 bytes), los géneros, países y compañías como
+    CSR de códigos sobre un vocabulario y las plataformas como rangos de
+    índices (platform_ptr / platform_index), en lugar de las listas de IDs
+    y los JSON completos de TMDB. Los filtros y los bloques de
+    características se calculan con operaciones sobre arrays y coinciden
+    con los de build_feature_vector (misma normalización, NUMERIC_SCALES).
+
+    Los géneros son los de TMDB: los inferidos (genre_inference) se añaden
+    aparte al fusionar el catálogo vectorizado. catalog.vectorize_shard
+    construye sus filas con este almacén.
+
+        store = CatalogStore.from_details(load_movie_platforms(), get_movie_details)
+        rows = store.filter(platforms=["Netflix"], min_vote=7, years=(2000, 2010))
+        store.categorical_block("genre", all_genres, rows)
+    """
+
+    __slots__ = ("records", "codes", "vocab", "platforms", "platform_ptr", "platform_index")
+
+    def __init__(self, records, codes, vocab, platforms, platform_ptr, platform_index):
+        self.records = records                # array CATALOG_STORE_DTYPE ordenado por id
+        self.codes = codes                    # {campo: (indptr int32, códigos int32)}
+        self.vocab = vocab                    # {campo: [nombres]} (también "orig_lang")
+        self.platforms = platforms            # [nombres de plataforma]
+        self.platform_ptr = platform_ptr      # int32, len(platforms) + 1
+        self.platform_index = platform_index  # int32, filas de cada plataforma
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_items(cls, items, platforms=None):
+        """
+        Construye el almacén a partir de pares (ID, detalles de TMDB).
+        Si un ID se repite, cuenta su primera aparición.
+
+        Parámetros:
+        - items: iterable de (id, dict de detalles).
+        - platforms: dict {proveedor: [ids]} opcional para los rangos de plataformas.
+
+        Devuelve:
+        - CatalogStore.
+        """
+        found = {}
+        for item_id, det in items:
+            found.setdefault(int(item_id), det)
+        found = sorted(found.items())
+        records = np.zeros(len(found), dtype=CATALOG_STORE_DTYPE)
+        names = {field: [] for field in CATALOG_STORE_CODES}
+        languages = []
+        for r, (item_id, det) in enumerate(found):
+            date = det.get('release_date') or det.get('first_air_date') or ''
+            try:
+                year = float(int(date[:4]))
+            except (TypeError, ValueError):
+                year = np.nan
+            records[r] = (item_id, det.get('popularity') or 0, det.get('vote_average') or 0,
+                          det.get('revenue') or 0, year, bool(det.get('belongs_to_collection')),
+                          -1, det.get('number_of_seasons') or 0, det.get('number_of_episodes') or 0)
+            names["genre"].append([g.get('name') for g in det.get('genres', [])])
+            names["country"].append(list(det.get('origin_country', [])))
+            names["company"].append([pc.get('name') for pc in det.get('production_companies', [])])
+            languages.append(det.get('original_language'))
+        codes, vocab = {}, {}
+        for field, per_row in names.items():
+            vocab[field] = sorted({n for row in per_row for n in row if n})
+            column = {n: k for k, n in enumerate(vocab[field])}
+            indptr = np.zeros(len(per_row) + 1, dtype=np.int32)
+            flat = []
+            for r, row in enumerate(per_row):
+                row_codes = sorted({column[n] for n in row if n})
+                flat.extend(row_codes)
+                indptr[r + 1] = indptr[r] + len(row_codes)
+            codes[field] = (indptr, np.array(flat, dtype=np.int32))
+        vocab["orig_lang"] = sorted({l for l in languages if l})
+        column = {l: k for k, l in enumerate(vocab["orig_lang"])}
+        records["orig_lang"] = [column.get(l, -1) for l in languages]
+
+        platforms = platforms or {}
+        store = cls(records, codes, vocab, list(platforms), None, None)
+        ptr, index = [0], []
+        for name in store.platforms:
+            rows = store.rows_of(platforms[name])
+            rows = np.unique(rows[rows >= 0])
+            index.append(rows)
+            ptr.append(ptr[-1] + len(rows))
+        store.platform_ptr = np.array(ptr, dtype=np.int32)
+        store.platform_index = (np.concatenate(index) if index else np.zeros(0)).astype(np.int32)
+        return store
+
+    @classmethod
+    def from_details(cls, platforms, details_fn, max_workers=16):
+        """
+        Construye el almacén a partir del índice de plataformas y de los
+        detalles de TMDB (los títulos sin detalles se omiten).
+
+        Parámetros:
+        - platforms: dict {proveedor: [ids]}.
+        - details_fn: función ID -> detalles (p. ej. get_movie_details).
+        - max_workers: hilos de descarga.
+
+        Devuelve:
+        - CatalogStore.
+        """
+        ids = sorted({int(i) for members in platforms.values() for i in members})
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            found = [(i, d) for i, d in zip(ids, executor.map(details_fn, ids)) if d]
+        return cls.from_items(found, platforms)
+
+    def save(self, path):
+        """
+        Guarda el almacén en un .npz (sin pickle).
+        """
+        arrays = {"records": self.records, "platforms": np.array(self.platforms, dtype=str),
+                  "platform_ptr": self.platform_ptr, "platform_index": self.platform_index,
+                  "vocab_orig_lang": np.array(self.vocab["orig_lang"], dtype=str)}
+        for field in CATALOG_STORE_CODES:
+            arrays[f"{field}_indptr"], arrays[f"{field}_codes"] = self.codes[field]
+            arrays[f"vocab_{field}"] = np.array(self.vocab[field], dtype=str)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carga un almacén guardado con save.
+        """
+        with np.load(path, allow_pickle=False) as f:
+            codes = {field: (f[f"{field}_indptr"], f[f"{field}_codes"]) for field in CATALOG_STORE_CODES}
+            vocab = {field: [str(n) for n in f[f"vocab_{field}"]]
+                     for field in CATALOG_STORE_CODES + ("orig_lang",)}
+            return cls(f["records"], codes, vocab, [str(n) for n in f["platforms"]],
+                       f["platform_ptr"], f["platform_index"])
+
+    @property
+    def nbytes(self):
+        """
+        Bytes ocupados por los arrays (sin contar los vocabularios).
+        """
+        total = self.records.nbytes + self.platform_ptr.nbytes + self.platform_index.nbytes
+        return total + sum(indptr.nbytes + codes.nbytes for indptr, codes in self.codes.values())
+
+    def rows_of(self, ids):
+        """
+        Filas de una lista de IDs (-1 para los que no están).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.searchsorted(self.records["id"], ids)
+        rows = np.minimum(rows, max(len(self.records) - 1, 0))
+        found = (self.records["id"][rows] == ids) if len(self.records) else np.zeros(len(ids), dtype=bool)
+        return np.where(found, rows, -1)
+
+    def platform_rows(self, name):
+        """
+        Filas (ordenadas) de los títulos disponibles en una plataforma.
+        """
+        p = self.platforms.index(name)
+        return self.platform_index[self.platform_ptr[p]:self.platform_ptr[p + 1]]
+
+    def availability(self, platforms=None):
+        """
+        Matriz dispersa títulos × plataformas con un 1 donde el título está
+        disponible (el bloque de disponibilidad sin ponderar).
+        """
+        platforms = self.platforms if platforms is None else list(platforms)
+        rows = [self.platform_rows(name) if name in self.platforms else np.zeros(0, dtype=np.int32)
+                for name in platforms]
+        cols = np.repeat(np.arange(len(platforms)), [len(r) for r in rows])
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(self), len(platforms)))
+
+    def _field_rows(self, field, names):
+        """
+        Máscara de filas con algún valor de `names` en un campo multivaluado.
+        """
+        wanted = np.isin(np.array(self.vocab[field], dtype=object), list(names))
+        indptr, codes = self.codes[field]
+        hits = np.concatenate([[0], np.cumsum(wanted[codes])])
+        return hits[indptr[1:]] > hits[indptr[:-1]]
+
+    def filter(self, platforms=None, min_popularity=None, min_vote=None, years=None,
+               languages=None, genres=None):
+        """
+        Filas que cumplen todos los filtros indicados (None = sin filtro).
+
+        Parámetros:
+        - platforms: plataformas en las que debe estar disponible (alguna).
+        - min_popularity, min_vote: mínimos de popularidad y voto medio.
+        - years: (desde, hasta), ambos incluidos; excluye los títulos sin año.
+        - languages: idiomas originales admitidos.
+        - genres: géneros admitidos (alguno).
+
+        Devuelve:
+        - numpy.ndarray de filas ordenadas.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if platforms is not None:
+            on_platform = np.zeros(len(self), dtype=bool)
+            for name in platforms:
+                if name in self.platforms:
+                    on_platform[self.platform_rows(name)] = True
+            keep &= on_platform
+        if min_popularity is not None:
+            keep &= self.records["popularity"] >= min_popularity
+        if min_vote is not None:
+            keep &= self.records["vote_avg"] >= min_vote
+        if years is not None:
+            year = self.records["year"]
+            keep &= (year >= years[0]) & (year <= years[1])
+        if languages is not None:
+            lang_ok = np.isin(np.array(self.vocab["orig_lang"], dtype=object), list(languages))
+            lang = self.records["orig_lang"]
+            keep &= (lang >= 0) & np.append(lang_ok, False)[lang]
+        if genres is not None:
+            keep &= self._field_rows("genre", genres)
+        return np.flatnonzero(keep)
+
+    def numeric_block(self, rows=None, weights=None):
+        """
+        Bloques numéricos ponderados de build_feature_vector, en el orden
+        de CATALOG_STORE_NUMERIC (seasons y episodes valen 0 si no hay peso).
+
+        Devuelve:
+        - numpy.ndarray float64 len(rows) × 7.
+        """
+        w = WEIGHTS if weights is None else weights
+        rec = self.records if rows is None else self.records[rows]
+        columns = []
+        for name in CATALOG_STORE_NUMERIC:
+            if name == "collection":
+                values = rec["collection"].astype(np.float64)
+            else:
+                origin, scale = NUMERIC_SCALES[name]
+                values = np.clip((rec[name].astype(np.float64) - origin) / scale, 0.0, 1.0)
+                values = np.nan_to_num(values, nan=0.0)  # títulos sin año
+            columns.append(values * w.get(name, 0.0))
+        return np.column_stack(columns) if len(rec) else np.zeros((0, len(columns)))
+
+    def categorical_block(self, field, vocab, rows=None):
+        """
+        Indicadores (sin ponderar) de un campo sobre un vocabulario (p. ej.
+        all_genres, all_countries, all_companies o all_languages del
+        usuario), como en build_feature_vector: los valores fuera de
+        `vocab` se ignoran.
+
+        Parámetros:
+        - field: 'genre', 'country', 'company' u 'orig_lang'.
+        - vocab: lista de nombres (define las columnas).
+        - rows: filas a extraer (None = todas).
+
+        Devuelve:
+        - scipy.sparse.csr_matrix len(rows) × len(vocab).
+        """
+        column = {n: k for k, n in enumerate(vocab)}
+        lut = np.array([column.get(n, -1) for n in self.vocab[field]] + [-1], dtype=np.int64)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        if field == "orig_lang":
+            cols = lut[self.records["orig_lang"][rows]]  # -1 -> columna centinela
+            row_ids = np.arange(len(rows))
+        else:
+            indptr, codes = self.codes[field]
+            starts, lengths = indptr[rows], np.diff(indptr)[rows]
+            row_ids = np.repeat(np.arange(len(rows)), lengths)
+            # posiciones de los códigos de cada fila, sin recorrerlas en Python
+            first = np.cumsum(lengths) - lengths
+            cols = lut[codes[np.repeat(starts - first, lengths) + np.arange(lengths.sum())]]
+        keep = cols >= 0
+        matrix = sp.csr_matrix((np.ones(int(keep.sum())), (row_ids[keep], cols[keep])),
+                               shape=(len(rows), len(vocab)))
+        matrix.data[:] = 1.0
+        return matrix
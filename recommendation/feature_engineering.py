@@ -4,11 +4,42 @@
 Funciones de ingeniería de características para el sistema de recomendación.
 Incluye similaridad coseno y construcción de vectores de características
 usando metadatos de películas o series.
+
+Los vectores se construyen con la precisión de config.FEATURE_DTYPE
+(float32 por defecto: la mitad de memoria que float64, con diferencias en
+la afinidad del orden de 1e-7; ver benchmark.py).
 """
 
 import numpy as np
-from recommendation.config import WEIGHTS
+from recommendation.config import WEIGHTS, FEATURE_DTYPE, NUMERIC_SCALES
 from recommendation.nlp_utils import clean_overview
+from recommendation.metrics import instrumented, timed
+from recommendation.franchise import collection_vector, collection_dim
+from recommendation.genre_inference import details_genres
+from recommendation.overview_svd import overview_svd, project_overview
+
+_dtype = np.dtype(FEATURE_DTYPE)
+
+def feature_dtype():
+    """
+    Tipo numérico de los vectores de características.
+    """
+    return _dtype
+
+def set_feature_dtype(dtype):
+    """
+    Cambia la precisión de los vectores (p. ej. 'float64' para comparar
+    con la referencia). Forma parte de artifact_version.
+    """
+    global _dtype
+    _dtype = np.dtype(dtype)
+
+def normalize_numeric(name, value):
+    """
+    Normaliza un valor numérico a [0, 1] con NUMERIC_SCALES.
+    """
+    origin, scale = NUMERIC_SCALES[name]
+    return min(max((value - origin) / scale, 0.0), 1.0)
 
 def cosine_similarity(vec_a, vec_b):
     """
@@ -21,13 +52,15 @@ def cosine_similarity(vec_a, vec_b):
     Devuelve:
     - float: valor de similitud coseno en [0, 1], o 0.0 si alguno es nulo.
     """
-    dot = np.dot(vec_a, vec_b)
-    na, nb = np.linalg.norm(vec_a), np.linalg.norm(vec_b)
-    return dot / (na * nb) if na and nb else 0.0
+    with timed("features.cosine"):
+        dot = np.dot(vec_a, vec_b)
+        na, nb = np.linalg.norm(vec_a), np.linalg.norm(vec_b)
+        return dot / (na * nb) if na and nb else 0.0
 
+@instrumented("features.build_vector")
 def build_feature_vector(details,
                          all_genres, all_countries, all_companies, all_languages,
-                         tfidf, PLATFORMS):
+                         tfidf, PLATFORMS, weights=None):
     """
     Construye un vector de características para una película o serie,
     combinando varios indicadores ponderados.
@@ -40,22 +73,34 @@ def build_feature_vector(details,
     - all_languages: lista de idiomas originales posibles.
     - tfidf: objeto TfidfVectorizer para vectorizar el overview.
     - PLATFORMS: dict que mapea nombre de plataforma a lista de IDs disponibles.
+    - weights: pesos por bloque (por defecto WEIGHTS; el catálogo vectorizado
+      usa pesos unitarios y aplica los reales al puntuar).
 
     Devuelve:
-    - numpy.ndarray: vector concatenado con todas las subcaracterísticas.
+    - numpy.ndarray: vector concatenado con todas las subcaracterísticas
+      (de tipo feature_dtype()).
     """
-    w = WEIGHTS
+    w = WEIGHTS if weights is None else weights
 
     # 1) Géneros
+    #    (los de TMDB o, si no trae ninguno, los inferidos; ver genre_inference.py)
     genre_vec = np.zeros(len(all_genres))
-    for g in details.get('genres', []):
-        if g.get('name') in all_genres:
-            genre_vec[all_genres.index(g['name'])] = 1.0
+    for name in details_genres(details):
+        if name in all_genres:
+            genre_vec[all_genres.index(name)] = 1.0
     genre_vec *= w['genre']
 
     # 2) Overview TF-IDF
-    clean_text = clean_overview(details.get('overview', ''))
-    tfidf_vec = tfidf.transform([clean_text]).toarray()[0] * w['overview']
+    #    (o su proyección LSA, si hay una para este vectorizador; ver overview_svd.py)
+    with timed("features.clean_overview"):
+        clean_text = clean_overview(details.get('overview', ''))
+    with timed("features.tfidf_transform"):
+        tfidf_row = tfidf.transform([clean_text])
+        svd = overview_svd(tfidf)
+        if svd is None:
+            tfidf_vec = tfidf_row.astype(_dtype).toarray()[0] * w['overview']
+        else:
+            tfidf_vec = project_overview(svd, tfidf_row)[0].astype(_dtype) * w['overview']
 
     # 3) Disponibilidad en plataformas
     avail_vec = np.zeros(len(PLATFORMS))
@@ -70,8 +115,7 @@ def build_feature_vector(details,
     date = details.get('release_date') or details.get('first_air_date') or ''
     try:
         year = int(date[:4])
-        norm = (year - 1900) / (2025 - 1900)
-        year_vec[0] = min(max(norm, 0.0), 1.0) * w['year']
+        year_vec[0] = normalize_numeric('year', float(year)) * w['year']
     except:
         pass
 
@@ -79,6 +123,11 @@ def build_feature_vector(details,
     belongs = 1.0 if details.get('belongs_to_collection') else 0.0
     belongs_vec = np.array([belongs]) * w['collection']
 
+    # 5b) Franquicia: fila de la película en collection_matrix (ver franchise.py),
+    #     consultada por ID; las series ('name' en lugar de 'title') no tienen
+    franchise_vec = collection_vector(mid) if 'title' in details else np.zeros(collection_dim())
+    franchise_vec *= w['franchise']
+
     # 6) País de origen
     country_vec = np.zeros(len(all_countries))
     for c in details.get('origin_country', []):
@@ -96,15 +145,15 @@ def build_feature_vector(details,
 
     # 8) Popularidad
     pop = details.get('popularity') or 0
-    pop_vec = np.array([min(max(pop / 100.0, 0.0), 1.0)]) * w['popularity']
+    pop_vec = np.array([normalize_numeric('popularity', pop)]) * w['popularity']
 
     # 9) Voto medio
     vote = details.get('vote_average') or 0
-    vote_vec = np.array([min(max(vote / 10.0, 0.0), 1.0)]) * w['vote_avg']
+    vote_vec = np.array([normalize_numeric('vote_avg', vote)]) * w['vote_avg']
 
     # 10) Revenue
     rev = details.get('revenue') or 0
-    rev_vec = np.array([min(max(rev / 1e9, 0.0), 1.0)]) * w['revenue']
+    rev_vec = np.array([normalize_numeric('revenue', rev)]) * w['revenue']
 
     # 11) Idioma original
     lang_vec = np.zeros(len(all_languages))
@@ -115,13 +164,11 @@ def build_feature_vector(details,
 
     # 12) Temporadas (solo series)
     seasons = details.get('number_of_seasons') or 0
-    seasons_norm = min(max(seasons / 10.0, 0.0), 1.0)
-    seasons_vec = np.array([seasons_norm]) * w.get('seasons', 0.0)
+    seasons_vec = np.array([normalize_numeric('seasons', seasons)]) * w.get('seasons', 0.0)
 
     # 13) Episodios (solo series)
     episodes = details.get('number_of_episodes') or 0
-    episodes_norm = min(max(episodes / 100.0, 0.0), 1.0)
-    episodes_vec = np.array([episodes_norm]) * w.get('episodes', 0.0)
+    episodes_vec = np.array([normalize_numeric('episodes', episodes)]) * w.get('episodes', 0.0)
 
     return np.concatenate([
         genre_vec,
@@ -129,6 +176,7 @@ def build_feature_vector(details,
         avail_vec,
         year_vec,
         belongs_vec,
+        franchise_vec,
         country_vec,
         comp_vec,
         pop_vec,
@@ -137,4 +185,4 @@ def build_feature_vector(details,
         lang_vec,
         seasons_vec,
         episodes_vec,
-    ])
+    ], dtype=_dtype)
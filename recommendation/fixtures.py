@@ -0,0 +1,146 @@
+# recommendation/fixtures.py
+
+"""
+Corpus de fixtures de TMDB para trabajar sin red (benchmarks, calibración,
+servidor stub). Guarda y restaura en un fichero JSON-lines comprimido con
+gzip tanto los detalles de películas y series que los clientes tienen en
+caché como las búsquedas por título grabadas durante una sesión.
+
+Formato de cada línea:
+    {"kind": "movie" | "tv", "id": 550, "data": {...}}
+    {"kind": "search/movie" | "search/tv", "query": "matrix", "data": [...]}
+"""
+
+import gzip
+import json
+import os
+import threading
+
+# Búsquedas grabadas: {(kind, consulta normalizada): resultados}
+_search_records = {}
+_recording = False
+_lock = threading.Lock()
+
+
+def _detail_caches() -> dict:
+    """
+    Tipo de registro -> caché en memoria del cliente correspondiente.
+    (Import diferido: los clientes importan este módulo para grabar.)
+    """
+    from recommendation import tmdb_client, series_client
+    return {
+        "movie": tmdb_client._movie_details_cache,
+        "tv": series_client._series_cache,
+    }
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza una consulta de búsqueda para usarla como clave.
+    """
+    return " ".join(str(query).lower().split())
+
+
+def start_recording() -> None:
+    """
+    Activa la grabación de búsquedas por título (los detalles se
+    graban siempre a través de la caché de los clientes).
+    """
+    global _recording
+    _recording = True
+
+
+def stop_recording() -> None:
+    """
+    Desactiva la grabación de búsquedas.
+    """
+    global _recording
+    _recording = False
+
+
+def record_search(kind: str, query: str, results: list) -> None:
+    """
+    Registra el resultado de una búsqueda si la grabación está activa.
+
+    Parámetros:
+    - kind: "movie" o "tv".
+    - query: consulta tal y como la recibió el cliente.
+    - results: lista de resultados devuelta por TMDB.
+    """
+    if not _recording:
+        return
+    with _lock:
+        _search_records[(f"search/{kind}", normalize_query(query))] = results
+
+
+def replay_search(kind: str, query: str):
+    """
+    Devuelve los resultados grabados de una búsqueda, o None si no existen.
+    """
+    return _search_records.get((f"search/{kind}", normalize_query(query)))
+
+
+def save_fixture_corpus(path: str) -> int:
+    """
+    Vuelca las cachés de detalles y las búsquedas grabadas a un corpus.
+
+    Parámetros:
+    - path: ruta del fichero .jsonl.gz a escribir.
+
+    Devuelve:
+    - int: número de registros guardados.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for kind, cache in _detail_caches().items():
+            for item_id, data in list(cache.items()):
+                if data is None:
+                    continue
+                f.write(json.dumps({"kind": kind, "id": item_id, "data": data}) + "\n")
+                count += 1
+        with _lock:
+            searches = list(_search_records.items())
+        for (kind, query), data in searches:
+            f.write(json.dumps({"kind": kind, "query": query, "data": data}) + "\n")
+            count += 1
+    return count
+
+
+def iter_fixture_corpus(path: str):
+    """
+    Recorre los registros de un corpus sin cargarlo entero en memoria.
+
+    Produce:
+    - dict por registro (ver formato en la cabecera del módulo).
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_fixture_corpus(path: str) -> dict:
+    """
+    Carga un corpus de fixtures en las cachés de los clientes, de modo que
+    get_movie_details / get_series_details respondan sin acceder a la red,
+    y deja disponibles sus búsquedas para replay_search.
+
+    Parámetros:
+    - path: ruta del fichero .jsonl.gz.
+
+    Devuelve:
+    - dict: { "movie": set(ids), "tv": set(ids), "search/movie": n, "search/tv": n }.
+    """
+    caches = _detail_caches()
+    loaded = {"movie": set(), "tv": set(), "search/movie": 0, "search/tv": 0}
+    for record in iter_fixture_corpus(path):
+        kind = record.get("kind")
+        if kind in caches:
+            caches[kind][record["id"]] = record["data"]
+            loaded[kind].add(record["id"])
+        elif kind in ("search/movie", "search/tv"):
+            with _lock:
+                _search_records[(kind, normalize_query(record["query"]))] = record["data"]
+            loaded[kind] += 1
+    return loaded
@@ -11,7 +11,6 @@ procesamiento en segundo plano y visualización de resultados.
 
 import tkinter as tk
 from tkinter import ttk
-import threading
 import logging
 from recommendation.data_utils import load_movie_platforms, load_series_platforms, load_artifacts
 from recommendation.config import REFERENCE_MOVIES, REFERENCE_SERIES
@@ -20,8 +19,12 @@ from recommendation.user_interaction_gui import (
     rate_series, add_series_manually, modify_series_rating
 )
 from recommendation.recommendation_engine import (
-    calculate_affinity, calculate_series_affinity, calculate_mix_affinity
+    iter_affinity, iter_series_affinity, iter_mix_affinity
 )
+from recommendation.tasks import submit_task, cancel_task, check_cancelled
+
+# Fracción de la barra de progreso reservada a la carga de plataformas y artefactos
+LOADING_FRACTION = 0.1
 
 # Configurar logging para debug
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -54,13 +57,18 @@ def enable_widgets(window):
         elif isinstance(widget, (tk.Frame, tk.LabelFrame)):
             enable_widgets(widget)
 
-def show_affinity_results(scores, title, window, back_callback):
+def show_affinity_results(scores, title, window, back_callback, errors=None, provisional=False, progress=None):
     """
     Muestra los resultados de afinidad:
     - Encabezado con el título.
     - Si no hay scores, mensaje de error.
     - Top 30 plataformas: la mejor en grande, el resto en grid de 2 columnas.
     - Botón "Back" para volver al menú anterior.
+
+    Parámetros opcionales:
+    - errors: dict {platform: semiamplitud del intervalo de confianza}.
+    - provisional: si True, indica que el ranking aún se está refinando.
+    - progress: fracción del catálogo evaluada (se muestra si es provisional).
     """
     try:
         clear_window(window)
@@ -68,6 +76,18 @@ def show_affinity_results(scores, title, window, back_callback):
         window.configure(bg="#f0f0f0")
         # Título principal
         tk.Label(window, text=title, font=("Arial", 24, "bold"), bg="#f0f0f0").pack(pady=30)
+        if provisional:
+            text = "Resultados provisionales, refinando..."
+            if progress is not None:
+                text += f" ({progress:.0%} del catálogo evaluado)"
+            tk.Label(window, text=text, font=("Arial", 12, "italic"), bg="#f0f0f0").pack()
+
+        def fmt(platform, score):
+            # Añadimos el intervalo de confianza si es conocido y no nulo
+            err = (errors or {}).get(platform, 0.0)
+            if not err:
+                return f"{score:.3f}"
+            return f"{score:.3f} ± {err:.3f}" if err != float("inf") else f"{score:.3f} ± ?"
 
         if not scores:
              # Ningún puntaje disponible
@@ -80,7 +100,7 @@ def show_affinity_results(scores, title, window, back_callback):
             top_platform, top_score = sorted_platforms[0]
             tk.Label(
                 window,
-                text=f"1. {top_platform}: {top_score:.3f}",
+                text=f"1. {top_platform}: {fmt(top_platform, top_score)}",
                 font=("Arial", 28, "bold"),
                 bg="#d1e7ff",
                 fg="#000000",
@@ -101,7 +121,7 @@ def show_affinity_results(scores, title, window, back_callback):
                     col = (idx - 2) % columns
                     tk.Label(
                         grid_frame,
-                        text=f"{idx}. {platform}: {score:.3f}",
+                        text=f"{idx}. {platform}: {fmt(platform, score)}",
                         font=("Arial", 14),
                         bg="#f0f0f0",
                         anchor="w",
@@ -113,15 +133,18 @@ def show_affinity_results(scores, title, window, back_callback):
         logging.error(f"Error en show_affinity_results: {str(e)}")
         tk.Label(window, text=f"Error mostrando resultados: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
 
-def show_loading_screen(window):
+def show_loading_screen(window, message="Calculando puntuación de afinidad...", cancel_callback=None):
     """
     Muestra un overlay con barra de progreso durante operaciones en segundo plano.
 
     Parámetros:
     - window: ventana principal de Tkinter.
+    - message: texto inicial del overlay.
+    - cancel_callback: si se indica, añade un botón "Atras" que lo invoca.
 
     Retorna:
     - loading_frame: Frame semi-transparente mostrado, o None si falla.
+      La barra se actualiza con update_loading_screen.
     """
     try:
         # Deshabilitar widgets durante carga
@@ -135,10 +158,14 @@ def show_loading_screen(window):
         content_frame = tk.Frame(loading_frame, bg="#f0f0f0")
         content_frame.place(relx=0.5, rely=0.5, anchor="center")
 
-        tk.Label(content_frame, text="Calculando puntuación de afinidad...", font=("Arial", 14), bg="#f0f0f0").pack(pady=20)
-        progress = ttk.Progressbar(content_frame, mode="indeterminate", length=200)
+        status_label = tk.Label(content_frame, text=message, font=("Arial", 14), bg="#f0f0f0")
+        status_label.pack(pady=20)
+        progress = ttk.Progressbar(content_frame, mode="determinate", maximum=100, length=200)
         progress.pack(pady=10)
-        progress.start(10)
+        if cancel_callback:
+            ttk.Button(content_frame, text="Atras", command=cancel_callback).pack(pady=10)
+        loading_frame.status_label = status_label
+        loading_frame.progress_bar = progress
 
         window.update()
         return loading_frame
@@ -148,6 +175,18 @@ def show_loading_screen(window):
         tk.Label(window, text=f"Error: Fallo al mostrar la pantalla de carga: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
         return None
 
+def update_loading_screen(loading_frame, fraction, message=None):
+    """
+    Actualiza la barra (fracción en [0, 1]) y, opcionalmente, el texto del overlay.
+    """
+    try:
+        if loading_frame and loading_frame.winfo_exists():
+            loading_frame.progress_bar["value"] = 100 * fraction
+            if message:
+                loading_frame.status_label.configure(text=message)
+    except Exception as e:
+        logging.error(f"Error en update_loading_screen: {str(e)}")
+
 def destroy_loading_screen(loading_frame, window):
     """
     Elimina el overlay de carga y vuelve a habilitar widgets.
@@ -160,6 +199,114 @@ def destroy_loading_screen(loading_frame, window):
         logging.error(f"Error en destroy_loading_screen: {str(e)}")
         enable_widgets(window)
 
+def _affinity_job(token, report, content_type, user_ratings, series_ratings):
+    """
+    Tarea de cálculo de afinidad para el gestor de tareas: carga plataformas
+    y artefactos y consume el generador iter_*_affinity correspondiente,
+    informando del progreso real (fracción del catálogo evaluada).
+
+    Parámetros:
+    - token, report: proporcionados por submit_task.
+    - content_type: "movies", "series" o "mix".
+    - user_ratings / series_ratings: copias de las puntuaciones.
+    """
+    report(0.0, message="Cargando plataformas...")
+    if content_type == "series":
+        platforms = load_series_platforms()
+        check_cancelled(token)
+        tfidf = load_artifacts(content_type="series")
+        ok = platforms and tfidf
+    else:
+        platforms = load_movie_platforms()
+        check_cancelled(token)
+        series_platforms = load_series_platforms() if content_type == "mix" else None
+        check_cancelled(token)
+        tfidf = load_artifacts()
+        ok = platforms and tfidf and (content_type != "mix" or series_platforms)
+    if not ok:
+        raise ValueError("Error al cargar plataformas o tfidf")
+    check_cancelled(token)
+
+    report(LOADING_FRACTION, message="Calculando puntuación de afinidad...")
+    if content_type == "movies":
+        updates = iter_affinity(user_ratings, tfidf, platforms, cancel=token)
+    elif content_type == "series":
+        updates = iter_series_affinity(series_ratings, tfidf, platforms, cancel=token)
+    else:
+        updates = iter_mix_affinity(user_ratings, series_ratings, tfidf,
+                                    platforms, series_platforms, cancel=token)
+    try:
+        for estimates, finished in updates:
+            check_cancelled(token)
+            evaluated = sum(e["n"] for e in estimates.values())
+            total = sum(e["total"] for e in estimates.values()) or 1
+            report(1.0 if finished else evaluated / total, estimates=estimates, finished=finished)
+    finally:
+        updates.close()
+
+def run_affinity_task(content_type, user_ratings, series_ratings, title, window, back_callback):
+    """
+    Lanza el cálculo de afinidad en el gestor de tareas compartido y
+    repinta la ventana con cada actualización: primero la barra de
+    progreso de la carga y después los resultados provisionales.
+
+    Dos peticiones con las mismas puntuaciones mientras la primera sigue
+    en curso comparten el cálculo. "Atras" (en el overlay o en los
+    resultados) cancela la tarea: deja de pedir títulos a TMDB y de pintar.
+
+    Parámetros:
+    - content_type: "movies", "series" o "mix".
+    - user_ratings / series_ratings: puntuaciones de películas y series.
+    - title: título de la pantalla de resultados.
+    - window: ventana principal.
+    - back_callback: callback al volver atrás.
+    """
+    state = {"task": None, "loading": None}
+
+    def cancelled():
+        return state["task"] is None or state["task"]["token"].is_set()
+
+    def back():
+        cancel_task(state["task"])
+        back_callback()
+
+    def on_progress(fraction, info):
+        if cancelled():
+            return
+        estimates = info.get("estimates")
+        if estimates is None:
+            update_loading_screen(state["loading"], fraction, info.get("message"))
+            return
+        destroy_loading_screen(state["loading"], window)
+        state["loading"] = None
+        scores = {p: e["score"] for p, e in estimates.items()}
+        errors = {p: e["error"] for p, e in estimates.items()}
+        show_affinity_results(scores, title, window, back, errors=errors,
+                              provisional=not info["finished"], progress=fraction)
+
+    def on_error(e):
+        if cancelled():
+            return
+        destroy_loading_screen(state["loading"], window)
+        state["loading"] = None
+        tk.Label(window, text=f"Error: Error en el cálculo de afinidad: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
+
+    state["loading"] = show_loading_screen(window, "Cargando plataformas...", cancel_callback=back)
+    if not state["loading"]:
+        return
+
+    user_ratings = dict(user_ratings or {})
+    series_ratings = dict(series_ratings or {})
+    key = ("affinity", content_type,
+           tuple(sorted(user_ratings.items())), tuple(sorted(series_ratings.items())))
+    logging.info(f"Comenzando cálculo de afinidad: {title}")
+    state["task"] = submit_task(
+        key, _affinity_job, content_type, user_ratings, series_ratings,
+        on_progress=on_progress, on_error=on_error,
+        on_done=lambda _: logging.info(f"Cálculo de afinidad terminado: {title}"),
+        dispatch=lambda fn, *args: window.after(0, fn, *args)
+    )
+
 # ======== MOVIES FLOW ========
 
 def quick_setup_movies_gui(window, user_ratings, custom_ref, secondary_callback):
@@ -255,39 +402,17 @@ def secondary_menu_movies(window, user_ratings, custom_ref, main_menu_callback):
 
         tk.Label(window, text="Películas", font=("Arial", 24, "bold"), bg="#f0f0f0").pack(pady=50)
 
-        PLATFORMS = load_movie_platforms()
-        tfidf = load_artifacts()
-
         def calculate():
             if not user_ratings:
                 tk.Label(window, text="Error: No hay películas puntuadas", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
                 return
-            if not PLATFORMS or not tfidf:
-                tk.Label(window, text="Error: Error al cargar plataformas o tfidf", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                return
 
-            loading_frame = show_loading_screen(window)
-            if not loading_frame:
-                return
-            window.update()
-
-            def compute():
-                try:
-                    logging.info("Comenzando cálculo de afinidad")
-                    scores, best = calculate_affinity(user_ratings, tfidf, PLATFORMS)
-                    logging.info(f"Puntuaciones de afinidad: {scores}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        show_affinity_results(scores, "Afinidad de plataformas para películas", window, lambda: secondary_menu_movies(window, user_ratings, custom_ref, main_menu_callback))
-                    ])
-                except Exception as e:
-                    logging.error(f"Error en el cálculo de afinidad: {str(e)}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        tk.Label(window, text=f"Error: Error en el cálculo de afinidad: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                    ])
-
-            threading.Thread(target=compute, daemon=True).start()
+            # Plataformas y artefactos se cargan dentro de la tarea, fuera del hilo de Tk
+            run_affinity_task(
+                "movies", user_ratings, None,
+                "Afinidad de plataformas para películas", window,
+                lambda: secondary_menu_movies(window, user_ratings, custom_ref, main_menu_callback)
+            )
         # Botones de acción
         ttk.Button(window, text="Calcular afinidad", command=calculate).pack(pady=20, padx=400, fill="x")
         ttk.Button(window, text="Modificar puntuaciones", command=lambda: modify_rating(user_ratings, custom_ref, window, lambda: secondary_menu_movies(window, user_ratings, custom_ref, main_menu_callback))).pack(pady=20, padx=400, fill="x")
@@ -402,39 +527,16 @@ def secondary_menu_series(window, series_ratings, custom_ref, main_menu_callback
 
         tk.Label(window, text="Series", font=("Arial", 24, "bold"), bg="#f0f0f0").pack(pady=50)
 
-        PLATFORMS = load_series_platforms()
-        tfidf = load_artifacts(content_type="series")
-
         def calculate():
             if not series_ratings:
                 tk.Label(window, text="Error: No series rated", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
                 return
-            if not PLATFORMS or not tfidf:
-                tk.Label(window, text="Error: Error al cargar plataformas o tfidf", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                return
 
-            loading_frame = show_loading_screen(window)
-            if not loading_frame:
-                return
-            window.update()
-
-            def compute():
-                try:
-                    logging.info("Comanzando el cálculo de affinidad de series")
-                    scores, best = calculate_series_affinity(series_ratings, tfidf, PLATFORMS)
-                    logging.info(f"Puntuación de afinidad de series: {scores}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        show_affinity_results(scores, "Afinidad de plataformas de series", window, lambda: secondary_menu_series(window, series_ratings, custom_ref, main_menu_callback))
-                    ])
-                except Exception as e:
-                    logging.error(f"Error en el cálculo de afinidad de series: {str(e)}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        tk.Label(window, text=f"Error: Error en el cálculo de afinidad de series: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                    ])
-
-            threading.Thread(target=compute, daemon=True).start()
+            run_affinity_task(
+                "series", None, series_ratings,
+                "Afinidad de plataformas de series", window,
+                lambda: secondary_menu_series(window, series_ratings, custom_ref, main_menu_callback)
+            )
 
         ttk.Button(window, text="Calcular afinidad", command=calculate).pack(pady=20, padx=400, fill="x")
         ttk.Button(window, text="Modificar puntuaciones", command=lambda: modify_series_rating(series_ratings, custom_ref, window, lambda: secondary_menu_series(window, series_ratings, custom_ref, main_menu_callback))).pack(pady=20, padx=400, fill="x")
@@ -563,40 +665,16 @@ def secondary_menu_mix(window, user_ratings, series_ratings, custom_ref_movies,
 
         tk.Label(window, text="Ambas", font=("Arial", 24, "bold"), bg="#f0f0f0").pack(pady=50)
 
-        movie_PLATFORMS = load_movie_platforms()
-        series_PLATFORMS = load_series_platforms()
-        tfidf = load_artifacts()
-
         def calculate():
             if not user_ratings or not series_ratings:
                 tk.Label(window, text="Error: Películas o serie no puntuada", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
                 return
-            if not movie_PLATFORMS or not series_PLATFORMS or not tfidf:
-                tk.Label(window, text="Error: Error al cargar plataformas o tfidf", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                return
 
-            loading_frame = show_loading_screen(window)
-            if not loading_frame:
-                return
-            window.update()
-
-            def compute():
-                try:
-                    logging.info("Comenzando cálculo de afinidad de ambas")
-                    scores, best = calculate_mix_affinity(user_ratings, series_ratings, tfidf, movie_PLATFORMS, series_PLATFORMS)
-                    logging.info(f"Puntuación de afinidad de ambas: {scores}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        show_affinity_results(scores, "Afinidad de plataforma de ambas", window, lambda: secondary_menu_mix(window, user_ratings, series_ratings, custom_ref_movies, custom_ref_series, main_menu_callback))
-                    ])
-                except Exception as e:
-                    logging.error(f"Error en el cálculo de afinidad de ambas: {str(e)}")
-                    window.after(0, lambda: [
-                        destroy_loading_screen(loading_frame, window),
-                        tk.Label(window, text=f"Error: Error en el cálculo de afinidad: {str(e)}", font=("Arial", 12), fg="red", bg="#f0f0f0").pack(pady=10)
-                    ])
-
-            threading.Thread(target=compute, daemon=True).start()
+            run_affinity_task(
+                "mix", user_ratings, series_ratings,
+                "Afinidad de plataforma de ambas", window,
+                lambda: secondary_menu_mix(window, user_ratings, series_ratings, custom_ref_movies, custom_ref_series, main_menu_callback)
+            )
 
         def modify():
             clear_window(window)
@@ -0,0 +1,146 @@
+# recommendation/franchise.py
+
+"""
+Índice de colecciones (franquicias) de películas a partir de los
+artefactos de DATA/MOVIES/COLLECTIONS:
+
+- collection_matrix.npz: matriz dispersa películas × colecciones.
+- collection_binarizer.pkl: MultiLabelBinarizer cuyas clases son los IDs
+  de colección (columnas de la matriz).
+- collection_movie_ids.pkl: lista de IDs de película (filas de la matriz).
+
+build_feature_vector añade un bloque de franquicia con la fila de la
+película (consulta por ID, sin llamadas a TMDB), de modo que dos títulos
+de la misma saga se parecen más que dos títulos cualesquiera con
+colección. Con los artefactos vacíos el bloque tiene dimensión 0 y nada
+cambia; build_collection_matrix.py los genera desde el catálogo.
+"""
+
+import hashlib
+import os
+import threading
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.preprocessing import MultiLabelBinarizer
+from recommendation.metrics import timed
+
+COLLECTION_DIR = os.path.join("DATA", "MOVIES", "COLLECTIONS")
+
+_index = None
+_lock = threading.Lock()
+
+
+def _empty_index() -> dict:
+    return {"matrix": sp.csr_matrix((0, 0)), "classes": [], "row_of": {}, "version": "empty"}
+
+
+def load_collection_index(base_dir: str = COLLECTION_DIR, reload: bool = False) -> dict:
+    """
+    Carga (una vez) el índice de colecciones.
+
+    Devuelve:
+    - dict con "matrix" (CSR películas × colecciones), "classes" (IDs de
+      colección), "row_of" ({movie_id: fila}) y "version" (hash del contenido).
+      Si faltan los ficheros o no son coherentes, un índice vacío.
+    """
+    global _index
+    if _index is not None and not reload:
+        return _index  # camino rápido sin lock: build_feature_vector lo consulta por título
+    index = _empty_index()
+    try:
+        matrix = sp.load_npz(os.path.join(base_dir, "collection_matrix.npz")).tocsr()
+        binarizer = joblib.load(os.path.join(base_dir, "collection_binarizer.pkl"))
+        movie_ids = [int(i) for i in joblib.load(os.path.join(base_dir, "collection_movie_ids.pkl"))]
+        classes = [int(c) for c in getattr(binarizer, "classes_", [])]
+    except (OSError, ValueError, EOFError):
+        matrix, classes, movie_ids = None, [], []
+    if matrix is not None and classes and matrix.shape == (len(movie_ids), len(classes)):
+        h = hashlib.sha1()
+        for part in (np.array(classes, dtype=np.int64), np.array(movie_ids, dtype=np.int64),
+                     matrix.indptr, matrix.indices):
+            h.update(np.ascontiguousarray(part).tobytes())
+        index = {
+            "matrix": matrix,
+            "classes": classes,
+            "row_of": {i: r for r, i in enumerate(movie_ids)},
+            "version": h.hexdigest(),
+        }
+    with _lock:
+        _index = index
+    return index
+
+
+def collection_dim() -> int:
+    """
+    Dimensión del bloque de franquicia (número de colecciones).
+    """
+    return len(load_collection_index()["classes"])
+
+
+def collection_vector(movie_id) -> np.ndarray:
+    """
+    Fila de la película en la matriz de colecciones (ceros si no tiene).
+    """
+    index = load_collection_index()
+    vec = np.zeros(len(index["classes"]))
+    row = index["row_of"].get(movie_id)
+    if row is not None:
+        matrix = index["matrix"]
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        vec[matrix.indices[start:end]] = matrix.data[start:end]
+    return vec
+
+
+def collection_rows(movie_ids) -> sp.csr_matrix:
+    """
+    Filas de varias películas como matriz dispersa (len(movie_ids) × colecciones);
+    las que no tienen colección quedan vacías.
+    """
+    index = load_collection_index()
+    rows = [index["row_of"].get(int(i), -1) for i in movie_ids]
+    present = np.array([r >= 0 for r in rows], dtype=bool)
+    selector = sp.csr_matrix(
+        (np.ones(int(present.sum())), (np.flatnonzero(present), np.array(rows)[present])),
+        shape=(len(rows), index["matrix"].shape[0]),
+    )
+    return (selector @ index["matrix"]).tocsr()
+
+
+def build_collection_index(movie_ids, details_fn, max_workers: int = 16) -> tuple:
+    """
+    Construye la matriz de colecciones a partir de los detalles de las
+    películas (belongs_to_collection).
+
+    Parámetros:
+    - movie_ids: IDs de película a recorrer.
+    - details_fn: función ID -> detalles (p. ej. get_movie_details).
+    - max_workers: hilos de descarga.
+
+    Devuelve:
+    - (matriz CSR, MultiLabelBinarizer ajustado, lista de IDs de película),
+      solo con las películas que pertenecen a alguna colección.
+    """
+    def collection_of(movie_id):
+        det = details_fn(movie_id)
+        coll = (det or {}).get('belongs_to_collection') or {}
+        return movie_id, coll.get('id')
+
+    with timed("franchise.build"):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pairs = [(m, c) for m, c in executor.map(collection_of, sorted(set(movie_ids))) if c is not None]
+    binarizer = MultiLabelBinarizer(sparse_output=True)
+    matrix = binarizer.fit_transform([[int(c)] for _, c in pairs]) if pairs else sp.csr_matrix((0, 0))
+    return sp.csr_matrix(matrix, dtype=np.float64), binarizer, [int(m) for m, _ in pairs]
+
+
+def save_collection_index(matrix, binarizer, movie_ids, base_dir: str = COLLECTION_DIR) -> None:
+    """
+    Guarda los tres artefactos y recarga el índice.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    sp.save_npz(os.path.join(base_dir, "collection_matrix.npz"), matrix)
+    joblib.dump(binarizer, os.path.join(base_dir, "collection_binarizer.pkl"))
+    joblib.dump(list(movie_ids), os.path.join(base_dir, "collection_movie_ids.pkl"))
+    load_collection_index(base_dir, reload=True)
@@ -0,0 +1,172 @@
+# recommendation/genre_inference.py
+
+"""
+Géneros inferidos para los títulos que TMDB devuelve sin géneros.
+
+Usa los clasificadores entrenados sobre el TF-IDF de los overviews
+(DATA/OVERVIEW/overview_genre_clf.pkl + genre_binarizer.pkl, y sus
+equivalentes de series en DATA/OVERVIEW/SERIES). La inferencia se hace en
+lote durante la vectorización del catálogo (ver catalog.build_catalog),
+sobre las filas TF-IDF ya calculadas, y el resultado se guarda por ID en
+predicted_genres.npz junto al clasificador. En tiempo de consulta solo se
+consulta esa tabla: build_feature_vector y los perfiles usan
+details_genres, que devuelve los géneros de TMDB o, si faltan, los
+inferidos.
+"""
+
+import hashlib
+import os
+import threading
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from recommendation.metrics import incr, timed
+
+GENRE_DIRS = {
+    "movies": os.path.join("DATA", "OVERVIEW"),
+    "series": os.path.join("DATA", "OVERVIEW", "SERIES"),
+}
+PREDICTIONS_FILE = "predicted_genres.npz"
+
+# Filas por lote al aplicar el clasificador
+GENRE_BATCH_SIZE = 4096
+
+# {content_type: {"genres": {id: [nombres]}, "version": str}}
+_predictions = {}
+# {content_type: (clasificador, clases) o None}
+_models = {}
+_lock = threading.Lock()
+
+
+def load_genre_model(content_type: str):
+    """
+    Carga (una vez) el clasificador y las clases del binarizador.
+
+    Devuelve:
+    - (clasificador, lista de géneros), o None si no hay modelo.
+    """
+    with _lock:
+        if content_type in _models:
+            return _models[content_type]
+    base = GENRE_DIRS[content_type]
+    try:
+        clf = joblib.load(os.path.join(base, "overview_genre_clf.pkl"))
+        classes = [str(c) for c in joblib.load(os.path.join(base, "genre_binarizer.pkl")).classes_]
+        model = (clf, classes)
+    except (OSError, ValueError, EOFError, AttributeError):
+        model = None
+    with _lock:
+        _models[content_type] = model
+    return model
+
+
+def predict_genres(content_type: str, tfidf_rows, batch_size: int = GENRE_BATCH_SIZE) -> list:
+    """
+    Predice los géneros de un lote de filas TF-IDF (sin ponderar).
+
+    Se aplica el clasificador por bloques de batch_size filas; una fila sin
+    ningún género por encima del umbral recibe el de mayor puntuación, de
+    modo que todo título con overview queda con al menos un género.
+
+    Parámetros:
+    - content_type: 'movies' o 'series' (elige el clasificador).
+    - tfidf_rows: matriz (dispersa o densa) n × términos del vectorizador.
+    - batch_size: filas por bloque.
+
+    Devuelve:
+    - list de listas de nombres de género (una por fila); vacía si no hay modelo.
+    """
+    model = load_genre_model(content_type)
+    if model is None:
+        return []
+    clf, classes = model
+    tfidf_rows = sp.csr_matrix(tfidf_rows)
+    predicted = []
+    with timed("genres.predict"):
+        for start in range(0, tfidf_rows.shape[0], batch_size):
+            batch = tfidf_rows[start:start + batch_size]
+            scores = clf.decision_function(batch)
+            labels = scores > 0
+            empty = ~labels.any(axis=1) & (batch.getnnz(axis=1) > 0)
+            labels[empty, scores[empty].argmax(axis=1)] = True
+            predicted.extend([classes[k] for k in np.flatnonzero(row)] for row in labels)
+    incr("genres.predicted", len(predicted))
+    return predicted
+
+
+def _predictions_path(content_type: str) -> str:
+    return os.path.join(GENRE_DIRS[content_type], PREDICTIONS_FILE)
+
+
+def load_predicted_genres(content_type: str, reload: bool = False) -> dict:
+    """
+    Tabla de géneros inferidos de un tipo (cargada una vez).
+
+    Devuelve:
+    - dict con "genres" ({id: [nombres]}) y "version" (hash del contenido,
+      "empty" si no hay tabla).
+    """
+    table = _predictions.get(content_type)
+    if table is not None and not reload:
+        return table  # camino rápido sin lock: se consulta por título
+    table = {"genres": {}, "version": "empty"}
+    path = _predictions_path(content_type)
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as f:
+            ids, classes = f["ids"], [str(c) for c in f["classes"]]
+            labels = sp.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=(len(ids), len(classes)))
+            h = hashlib.sha1()
+            for part in (ids, labels.indptr, labels.indices):
+                h.update(np.ascontiguousarray(part).tobytes())
+            h.update("\0".join(classes).encode("utf-8"))
+        table = {
+            "genres": {int(i): [classes[k] for k in labels.indices[labels.indptr[r]:labels.indptr[r + 1]]]
+                       for r, i in enumerate(ids)},
+            "version": h.hexdigest(),
+        }
+    with _lock:
+        _predictions[content_type] = table
+    return table
+
+
+def save_predicted_genres(content_type: str, genres: dict) -> None:
+    """
+    Guarda la tabla {id: [nombres]} como matriz indicadora dispersa y la recarga.
+    """
+    ids = np.array(sorted(genres), dtype=np.int64)
+    classes = sorted({name for names in genres.values() for name in names})
+    column = {name: k for k, name in enumerate(classes)}
+    rows, cols = [], []
+    for r, i in enumerate(ids):
+        for name in genres[int(i)]:
+            rows.append(r)
+            cols.append(column[name])
+    labels = sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(ids), len(classes)))
+    path = _predictions_path(content_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, ids=ids, classes=np.array(classes, dtype=str),
+                        data=labels.data, indices=labels.indices, indptr=labels.indptr)
+    os.replace(tmp, path)
+    load_predicted_genres(content_type, reload=True)
+
+
+def predictions_version() -> str:
+    """
+    Versión conjunta de las tablas de películas y series (forma parte de
+    artifact_version, ya que cambia los vectores).
+    """
+    return "-".join(load_predicted_genres(t)["version"] for t in sorted(GENRE_DIRS))
+
+
+def details_genres(details: dict) -> list:
+    """
+    Nombres de género de un título: los de TMDB o, si no trae ninguno, los
+    inferidos en la vectorización del catálogo (las películas se
+    distinguen de las series por 'title').
+    """
+    genres = details.get('genres')
+    if genres:
+        return [g.get('name') for g in genres]
+    content_type = "movies" if 'title' in details else "series"
+    return load_predicted_genres(content_type)["genres"].get(details.get('id'), [])
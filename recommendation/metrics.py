@@ -0,0 +1,195 @@
+# recommendation/metrics.py
+
+"""
+Instrumentación de los caminos críticos: contadores, histogramas de
+latencia por etapa y eventos estructurados.
+
+Desactivada por defecto (config.METRICS_ENABLED / variable de entorno
+RECSYS_METRICS=1): en ese estado timed() devuelve un contexto nulo
+compartido e incr() retorna de inmediato, así que el coste es casi nulo.
+Los eventos siempre se emiten por logging (logger "recommendation.events")
+como JSON; el nivel de logging decide si se muestran.
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from recommendation.config import METRICS_ENABLED
+
+# Límites superiores (segundos) de los buckets de latencia, estilo Prometheus
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_enabled = METRICS_ENABLED
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_NULL = contextlib.nullcontext()
+_event_logger = logging.getLogger("recommendation.events")
+
+
+def enable_metrics() -> None:
+    """Activa la recogida de métricas."""
+    global _enabled
+    _enabled = True
+
+
+def disable_metrics() -> None:
+    """Desactiva la recogida de métricas (las ya recogidas se conservan)."""
+    global _enabled
+    _enabled = False
+
+
+def metrics_enabled() -> bool:
+    """Indica si la recogida de métricas está activa."""
+    return _enabled
+
+
+def reset_metrics() -> None:
+    """Borra todos los contadores e histogramas."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def incr(name: str, n: int = 1) -> None:
+    """
+    Incrementa un contador.
+
+    Parámetros:
+    - name: nombre del contador (p. ej. "tmdb.movie_cache_hit").
+    - n: cantidad a sumar.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(stage: str, seconds: float) -> None:
+    """
+    Registra una duración en el histograma de una etapa.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = {"count": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+            _histograms[stage] = hist
+        hist["count"] += 1
+        hist["sum"] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+
+
+class _Timer:
+    """Contexto que mide la duración de una etapa y la registra al salir."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timed(stage: str):
+    """
+    Contexto que cronometra una etapa:
+
+        with timed("features.tfidf_transform"):
+            ...
+
+    Devuelve un contexto nulo compartido si las métricas están desactivadas.
+    """
+    return _Timer(stage) if _enabled else _NULL
+
+
+def instrumented(stage: str):
+    """
+    Decorador que cronometra cada llamada a la función como la etapa `stage`.
+    Con las métricas desactivadas solo añade una comprobación por llamada.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def event(name: str, **fields) -> None:
+    """
+    Emite un evento estructurado (JSON) por el logger "recommendation.events"
+    y cuenta su aparición como "events.<name>".
+
+    Parámetros:
+    - name: nombre del evento (p. ej. "platform_score").
+    - fields: campos adicionales serializables en JSON.
+    """
+    incr(f"events.{name}")
+    if _event_logger.isEnabledFor(logging.INFO):
+        _event_logger.info(json.dumps({"event": name, **fields}, ensure_ascii=False, default=str))
+
+
+def snapshot() -> dict:
+    """
+    Copia de las métricas actuales:
+    {"counters": {...}, "histograms": {stage: {"count", "sum", "buckets": {le: n}}}}
+    con buckets acumulados como en Prometheus.
+    """
+    with _lock:
+        histograms = {}
+        for stage, hist in _histograms.items():
+            cumulative, acc = {}, 0
+            for bound, n in zip(LATENCY_BUCKETS, hist["buckets"]):
+                acc += n
+                cumulative[str(bound)] = acc
+            cumulative["+Inf"] = hist["count"]
+            histograms[stage] = {"count": hist["count"], "sum": hist["sum"], "buckets": cumulative}
+        return {"counters": dict(_counters), "histograms": histograms}
+
+
+def export_json(indent: int = 2) -> str:
+    """Exporta las métricas como JSON."""
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _prom_name(name: str) -> str:
+    return "recsys_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def export_prometheus() -> str:
+    """
+    Exporta las métricas en el formato de texto de Prometheus:
+    un counter por contador y un histogram de segundos por etapa.
+    """
+    snap = snapshot()
+    lines = []
+    for name, value in sorted(snap["counters"].items()):
+        metric = _prom_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for stage, hist in sorted(snap["histograms"].items()):
+        metric = _prom_name(stage) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for le, n in hist["buckets"].items():
+            lines.append(f'{metric}_bucket{{le="{le}"}} {n}')
+        lines.append(f"{metric}_sum {hist['sum']}")
+        lines.append(f"{metric}_count {hist['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+# recommendation/overview_svd.py
+
+"""
+Proyección LSA (TruncatedSVD) opcional del bloque TF-IDF de los overviews.
+
+El bloque de overview de build_feature_vector tiene tantas columnas como
+el vocabulario del vectorizador. Con la proyección, el TF-IDF de cada
+overview se reduce a unos cientos de componentes densas. Las usan tanto
+los perfiles como la vectorización del catálogo, así que los vectores
+son mucho más estrechos y el coseno se calcula sobre menos columnas.
+
+La proyección se ajusta fuera de línea (fit_overview_svd.py) sobre
+overview_tfidf.npz y se guarda en overview_svd.pkl, junto al vectorizador.
+Solo se aplica al vectorizador con el que se ajustó (se comprueba su
+versión), de modo que el flujo mixto, que puntúa las series con el
+vectorizador de películas, usa la de películas. Sin el fichero, o con
+RECSYS_OVERVIEW_SVD=0, el bloque sigue siendo el TF-IDF disperso.
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+from recommendation.config import OVERVIEW_SVD
+from recommendation.metrics import timed
+
+SVD_DIRS = {
+    "movies": os.path.join("DATA", "OVERVIEW"),
+    "series": os.path.join("DATA", "OVERVIEW", "SERIES"),
+}
+SVD_FILE = "overview_svd.pkl"
+
+# Componentes por defecto de la proyección
+SVD_COMPONENTS = 256
+
+# {content_type: {"svd", "projection", "tfidf_version", "version"} o None}
+_models = {}
+# {vectorizador: proyección que le corresponde o None}
+_matches = weakref.WeakKeyDictionary()
+_enabled = OVERVIEW_SVD
+_lock = threading.Lock()
+
+
+def set_overview_svd(enabled: bool) -> None:
+    """
+    Activa o desactiva la proyección (p. ej. para compararla con el
+    TF-IDF disperso en benchmark.py).
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def svd_path(content_type: str) -> str:
+    return os.path.join(SVD_DIRS[content_type], SVD_FILE)
+
+
+def load_overview_svd(content_type: str, reload: bool = False):
+    """
+    Carga (una vez) la proyección guardada de un tipo.
+
+    Devuelve:
+    - dict con "svd" (TruncatedSVD ajustado), "projection" (componentes
+      traspuestas y contiguas, términos × dimensiones), "tfidf_version"
+      (versión del vectorizador con el que se ajustó) y "version" (hash de
+      las componentes); o None si no hay proyección.
+    """
+    with _lock:
+        if content_type in _models and not reload:
+            return _models[content_type]
+    model = None
+    try:
+        payload = joblib.load(svd_path(content_type))
+        components = np.ascontiguousarray(payload["svd"].components_)
+        model = {"svd": payload["svd"], "projection": np.ascontiguousarray(components.T),
+                 "tfidf_version": payload["tfidf_version"],
+                 "version": hashlib.sha1(components.tobytes()).hexdigest()}
+    except (OSError, ValueError, EOFError, KeyError, AttributeError):
+        pass
+    with _lock:
+        _models[content_type] = model
+        _matches.clear()
+    return model
+
+
+def overview_svd(tfidf):
+    """
+    Proyección que corresponde a un vectorizador, o None si no hay o está
+    desactivada. Se resuelve una vez por objeto.
+    """
+    if not _enabled:
+        return None
+    try:
+        return _matches[tfidf]
+    except (KeyError, TypeError):
+        pass
+    from recommendation.result_cache import tfidf_version
+    version = tfidf_version(tfidf)
+    match = None
+    for content_type in SVD_DIRS:
+        model = load_overview_svd(content_type)
+        if model is not None and model["tfidf_version"] == version:
+            match = model
+            break
+    try:
+        _matches[tfidf] = match
+    except TypeError:
+        pass
+    return match
+
+
+def overview_dim(tfidf) -> int:
+    """
+    Dimensión del bloque de overview: componentes de la proyección o
+    términos del vectorizador.
+    """
+    model = overview_svd(tfidf)
+    return model["svd"].n_components if model else len(tfidf.vocabulary_)
+
+
+def project_overview(model: dict, tfidf_rows) -> np.ndarray:
+    """
+    Proyecta filas TF-IDF (dispersas) con un producto disperso × denso,
+    sin la validación por llamada de TruncatedSVD.transform.
+    """
+    return np.asarray(tfidf_rows @ model["projection"])
+
+
+def overview_version(tfidf) -> str:
+    """
+    Versión de la proyección aplicada al vectorizador ("sparse" si no hay);
+    forma parte de artifact_version.
+    """
+    model = overview_svd(tfidf)
+    return model["version"] if model else "sparse"
+
+
+def fit_overview_svd(content_type: str, tfidf, n_components: int = SVD_COMPONENTS,
+                     seed: int = 0) -> dict:
+    """
+    Ajusta la proyección sobre la matriz TF-IDF de los overviews del tipo
+    (overview_tfidf.npz) y la guarda en overview_svd.pkl.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - tfidf: vectorizador con el que se generó la matriz.
+    - n_components: dimensiones de la proyección.
+    - seed: semilla del SVD aleatorizado.
+
+    Devuelve:
+    - dict de load_overview_svd, más "explained_variance" (fracción).
+    """
+    from recommendation.result_cache import tfidf_version
+    matrix = sp.load_npz(os.path.join(SVD_DIRS[content_type], "overview_tfidf.npz")).tocsr()
+    if matrix.shape[1] != len(tfidf.vocabulary_):
+        raise ValueError(f"overview_tfidf.npz tiene {matrix.shape[1]} columnas y el vectorizador "
+                         f"{len(tfidf.vocabulary_)} términos")
+    svd = TruncatedSVD(n_components=min(n_components, matrix.shape[1] - 1), random_state=seed)
+    with timed("overview_svd.fit"):
+        svd.fit(matrix)
+    path = svd_path(content_type)
+    tmp = path + ".tmp"
+    joblib.dump({"svd": svd, "tfidf_version": tfidf_version(tfidf)}, tmp)
+    os.replace(tmp, path)
+    model = dict(load_overview_svd(content_type, reload=True))
+    model["explained_variance"] = float(svd.explained_variance_ratio_.sum())
+    return model
@@ -4,76 +4,127 @@
 Motor de recomendaciones: calcula afinidad entre el perfil del usuario y las plataformas
 (para películas, series o mixto) usando similitud coseno sobre vectores de características.
 """
+import math
+import random
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from recommendation.user_profile import build_user_profile, build_series_profile
 from recommendation.tmdb_client import get_movie_details
 from recommendation.series_client import get_series_details
 from recommendation.feature_engineering import build_feature_vector, cosine_similarity
+from recommendation.metrics import event, instrumented, timed
+from recommendation.result_cache import affinity_key, get_cached_result, store_result
+from recommendation.reference_scores import reference_scores
+from recommendation.catalog import catalog_scores
 
+# Parámetros del cálculo progresivo (iter_*_affinity)
+PROGRESSIVE_FIRST_BATCH = 8   # títulos por plataforma en la primera ronda
+PROGRESSIVE_GROWTH = 2        # factor de crecimiento del lote entre rondas
+CONFIDENCE_Z = 1.96           # cuantil normal para intervalos al 95 %
 
+# Parámetros del modo aproximado (sample_size / target_error)
+APPROX_STRATA = 10            # estratos por cuantiles de ID en cada catálogo
+APPROX_PILOT_SIZE = 30        # muestra piloto para estimar la varianza
+
+@instrumented("engine.calculate_movies")
 def calculate_affinity(user_ratings: dict,
                        tfidf,
-                       PLATFORMS: dict) -> tuple:
+                       PLATFORMS: dict,
+                       sample_size: int = None,
+                       target_error: float = None,
+                       seed: int = 0,
+                       return_errors: bool = False,
+                       use_cache: bool = True,
+                       use_precomputed: bool = True) -> tuple:
     """
     Calcula la afinidad del usuario con cada plataforma de películas.
 
     1. Construye perfil de usuario a partir de sus calificaciones.
     2. Para cada plataforma, obtiene detalles de cada película disponible,
        genera su vector de características y mide similitud coseno con el perfil.
-    3. Imprime score por plataforma y retorna el mejor resultado.
+    3. Emite un evento por plataforma y retorna el mejor resultado.
+
+    Modo aproximado: si se indica sample_size y/o target_error, la media de
+    cada plataforma se estima sobre una muestra estratificada y determinista
+    (ver _platform_mean) en lugar de recorrer todo el catálogo.
 
     Parámetros:
     - user_ratings: dict {movie_id: rating} con valoraciones del usuario.
     - tfidf: TfidfVectorizer para vectorizar overviews.
     - PLATFORMS: dict {platform_name: [movie_id, ...]}.
+    - sample_size: máximo de títulos evaluados por plataforma (None = todos).
+    - target_error: semiamplitud objetivo del intervalo al 95 % (None = sin objetivo).
+    - seed: semilla del muestreo.
+    - return_errors: si True, devuelve también los errores estimados.
+    - use_cache: reutilizar el resultado de una petición idéntica (ver result_cache).
+    - use_precomputed: sin muestreo, puntuar desde el precálculo de los títulos
+      de referencia (ver reference_scores) o la matriz vectorizada del catálogo
+      (ver catalog) si están vigentes; dan el mismo resultado exacto. False
+      fuerza el cálculo título a título.
 
     Devuelve:
     - scores: dict {platform_name: avg_similarity}.
     - best: plataforma con mayor afinidad.
+    - errors (solo si return_errors): dict {platform_name: semiamplitud del intervalo}.
     """
+    key = affinity_key("movies", [user_ratings], [PLATFORMS], tfidf,
+                       (sample_size, target_error, seed)) if use_cache else None
+    cached = _cached_affinity(key, return_errors)
+    if cached is not None:
+        return cached
+    # Configuración rápida: puntuación directa desde el precálculo de referencias
+    if use_precomputed and sample_size is None and target_error is None:
+        quick = reference_scores("movies", user_ratings, tfidf, PLATFORMS)
+        if quick is not None:
+            return _store_affinity(key, quick, _best_platform(quick), dict.fromkeys(quick, 0.0), return_errors)
+
     # 1) Construimos el perfil de usuario
     profile, genres, countries, companies, languages = build_user_profile(
         user_ratings, tfidf, PLATFORMS
     )
-    print("\n=== AFINIDAD CON CADA PLATAFORMA ===")
-    scores = {}
+    if use_precomputed and sample_size is None and target_error is None:
+        exact = catalog_scores("movies", (profile, genres, countries, companies, languages),
+                               tfidf, PLATFORMS)
+        if exact is not None:
+            return _store_affinity(key, exact, _best_platform(exact), dict.fromkeys(exact, 0.0), return_errors)
+    event("affinity_start", content_type="movies", platforms=len(PLATFORMS))
+    scores, errors = {}, {}
     best, best_score = None, -1
+    sim = _movie_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS)
 
     # Función interna que calcula similitud promedio para una plataforma
     def platform_score(platform: str, ids: list) -> tuple:
-        sims = []
-        for mid in ids:
-            det = get_movie_details(mid)
-            if not det:
-                continue  # omitir IDs fallidos
-            vec = build_feature_vector(
-                det, genres, countries, companies, languages,
-                tfidf, PLATFORMS
-            )
-            sims.append(cosine_similarity(profile, vec))
-        # media de similitudes (0 si no hay vídeos)
-        return platform, np.mean(sims) if sims else 0.0
+        with timed("engine.platform_score"):
+            avg, err = _platform_mean(ids, sim, sample_size, target_error, seed, f"{platform}:movie")
+        return platform, avg, err
 
     # 2) Ejecución paralela usando ThreadPoolExecutor
     max_workers = min(32, len(PLATFORMS) or 1)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [executor.submit(platform_score, p, ids) for p, ids in PLATFORMS.items()]
         for fut in as_completed(futures):
-            platform, avg = fut.result()
+            platform, avg, err = fut.result()
             scores[platform] = avg
-            print(f"{platform}: {avg:.3f}")
+            errors[platform] = err
+            event("platform_score", content_type="movies", platform=platform, score=avg, error=err)
             if avg > best_score:
                 best, best_score = platform, avg
 
     # 3) Resultado recomendado
-    print(f"\n✅ Plataforma recomendada: {best}\n")
-    return scores, best
+    event("affinity_result", content_type="movies", best=best, score=best_score)
+    return _store_affinity(key, scores, best, errors, return_errors)
 
 
+@instrumented("engine.calculate_series")
 def calculate_series_affinity(series_ratings: dict,
                                 tfidf,
-                                PLATFORMS: dict) -> tuple:
+                                PLATFORMS: dict,
+                                sample_size: int = None,
+                                target_error: float = None,
+                                seed: int = 0,
+                                return_errors: bool = False,
+                                use_cache: bool = True,
+                                use_precomputed: bool = True) -> tuple:
     """
     Misma lógica que calculate_affinity, pero para series.
 
@@ -81,51 +132,70 @@ def calculate_series_affinity(series_ratings: dict,
     - series_ratings: dict {series_id: rating}.
     - tfidf: TfidfVectorizer para overviews de series.
     - PLATFORMS: dict {platform_name: [series_id, ...]}.
+    - sample_size, target_error, seed, return_errors, use_cache, use_precomputed:
+      ver calculate_affinity.
 
     Devuelve:
     - scores: dict por plataforma.
     - best: plataforma con mayor afinidad.
+    - errors (solo si return_errors): dict por plataforma.
     """
+    key = affinity_key("series", [series_ratings], [PLATFORMS], tfidf,
+                       (sample_size, target_error, seed)) if use_cache else None
+    cached = _cached_affinity(key, return_errors)
+    if cached is not None:
+        return cached
+    if use_precomputed and sample_size is None and target_error is None:
+        quick = reference_scores("series", series_ratings, tfidf, PLATFORMS)
+        if quick is not None:
+            return _store_affinity(key, quick, _best_platform(quick), dict.fromkeys(quick, 0.0), return_errors)
+
     # Construimos los perfil de series
     profile, genres, countries, companies, languages = build_series_profile(
         series_ratings, tfidf, PLATFORMS
     )
-    print("\n=== AFINIDAD SERIES ===")
-    scores = {}
+    if use_precomputed and sample_size is None and target_error is None:
+        exact = catalog_scores("series", (profile, genres, countries, companies, languages),
+                               tfidf, PLATFORMS)
+        if exact is not None:
+            return _store_affinity(key, exact, _best_platform(exact), dict.fromkeys(exact, 0.0), return_errors)
+    event("affinity_start", content_type="series", platforms=len(PLATFORMS))
+    scores, errors = {}, {}
     best, best_score = None, -1
+    sim = _series_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS)
 
     def platform_score(platform: str, ids: list) -> tuple:
-        sims = []
-        for sid in ids:
-            det = get_series_details(sid)
-            if not det:
-                continue
-            vec = build_feature_vector(
-                det, genres, countries, companies, languages,
-                tfidf, PLATFORMS
-            )
-            sims.append(cosine_similarity(profile, vec))
-        return platform, np.mean(sims) if sims else 0.0
+        with timed("engine.platform_score"):
+            avg, err = _platform_mean(ids, sim, sample_size, target_error, seed, f"{platform}:tv")
+        return platform, avg, err
 
     max_workers = min(32, len(PLATFORMS) or 1)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [executor.submit(platform_score, p, ids) for p, ids in PLATFORMS.items()]
         for fut in as_completed(futures):
-            platform, avg = fut.result()
+            platform, avg, err = fut.result()
             scores[platform] = avg
-            print(f"{platform}: {avg:.3f}")
+            errors[platform] = err
+            event("platform_score", content_type="series", platform=platform, score=avg, error=err)
             if avg > best_score:
                 best, best_score = platform, avg
 
-    print(f"\n✅ Plataforma de series recomendada: {best}\n")
-    return scores, best
+    event("affinity_result", content_type="series", best=best, score=best_score)
+    return _store_affinity(key, scores, best, errors, return_errors)
 
 
+@instrumented("engine.calculate_mix")
 def calculate_mix_affinity(user_ratings: dict,
                             series_ratings: dict,
                             tfidf,
                             movie_PLATFORMS: dict,
-                            series_PLATFORMS: dict) -> tuple:
+                            series_PLATFORMS: dict,
+                            sample_size: int = None,
+                            target_error: float = None,
+                            seed: int = 0,
+                            return_errors: bool = False,
+                            use_cache: bool = True,
+                            use_precomputed: bool = True) -> tuple:
     """
     Calcula afinidad mixta considerando ambos contenidos:
     - Películas y series deben pertenecer a la misma plataforma para contarse.
@@ -137,52 +207,489 @@ def calculate_mix_affinity(user_ratings: dict,
     - tfidf: TfidfVectorizer para overviews.
     - movie_PLATFORMS: dict de películas.
     - series_PLATFORMS: dict de series.
+    - sample_size, target_error, seed, return_errors, use_cache, use_precomputed:
+      ver calculate_affinity; el muestreo se aplica por separado a películas y a series.
 
     Devolvemos:
     - scores: dict {platform: mixed_score}.
     - best: plataforma mixta recomendada.
+    - errors (solo si return_errors): dict {platform: semiamplitud combinada}.
     """
+    key = affinity_key("mix", [user_ratings, series_ratings], [movie_PLATFORMS, series_PLATFORMS],
+                       tfidf, (sample_size, target_error, seed)) if use_cache else None
+    cached = _cached_affinity(key, return_errors)
+    if cached is not None:
+        return cached
+    if use_precomputed and sample_size is None and target_error is None:
+        quick = _reference_mix_scores(user_ratings, series_ratings, tfidf,
+                                      movie_PLATFORMS, series_PLATFORMS)
+        if quick is not None:
+            return _store_affinity(key, quick, _best_platform(quick), dict.fromkeys(quick, 0.0), return_errors)
+
     # Perfiles separados
     profile_m, g_m, c_m, co_m, l_m = build_user_profile(user_ratings, tfidf, movie_PLATFORMS)
     profile_s, g_s, c_s, co_s, l_s = build_series_profile(series_ratings, tfidf, series_PLATFORMS)
+    if use_precomputed and sample_size is None and target_error is None:
+        exact = _catalog_mix_scores((profile_m, g_m, c_m, co_m, l_m), (profile_s, g_s, c_s, co_s, l_s),
+                                    tfidf, movie_PLATFORMS, series_PLATFORMS)
+        if exact is not None:
+            return _store_affinity(key, exact, _best_platform(exact), dict.fromkeys(exact, 0.0), return_errors)
+    sim_m = _movie_similarity(profile_m, g_m, c_m, co_m, l_m, tfidf, movie_PLATFORMS)
+    sim_s = _series_similarity(profile_s, g_s, c_s, co_s, l_s, tfidf, series_PLATFORMS)
 
-    print("\n=== AFINIDAD MIXTA (Películas + Series) ===")
-    scores = {}
+    scores, errors = {}, {}
     best, best_score = None, -1
     # Solo plataformas comunes a ambos tipos
     common_platforms = set(movie_PLATFORMS).intersection(series_PLATFORMS)
+    event("affinity_start", content_type="mix", platforms=len(common_platforms))
 
     def mix_score(platform: str) -> tuple:
-        # Afinidad películas
-        sims_m = []
-        for mid in movie_PLATFORMS[platform]:
-            det = get_movie_details(mid)
-            if not det:
-                continue
-            vec = build_feature_vector(det, g_m, c_m, co_m, l_m, tfidf, movie_PLATFORMS)
-            sims_m.append(cosine_similarity(profile_m, vec))
-        # Afinidad series
-        sims_s = []
-        for sid in series_PLATFORMS[platform]:
-            det = get_series_details(sid)
-            if not det:
-                continue
-            vec = build_feature_vector(det, g_s, c_s, co_s, l_s, tfidf, series_PLATFORMS)
-            sims_s.append(cosine_similarity(profile_s, vec))
-        # Media de ambas afinidades (considera 0 si vacío)
-        avg_m = np.mean(sims_m) if sims_m else 0.0
-        avg_s = np.mean(sims_s) if sims_s else 0.0
-        return platform, (avg_m + avg_s) / 2
+        # Afinidad películas y series (0 si vacío)
+        with timed("engine.platform_score"):
+            avg_m, err_m = _platform_mean(movie_PLATFORMS[platform], sim_m,
+                                          sample_size, target_error, seed, f"{platform}:movie")
+            avg_s, err_s = _platform_mean(series_PLATFORMS[platform], sim_s,
+                                          sample_size, target_error, seed, f"{platform}:tv")
+        # Media de ambas afinidades; los errores se combinan en cuadratura
+        return platform, (avg_m + avg_s) / 2, math.sqrt(err_m ** 2 + err_s ** 2) / 2
 
     max_workers = min(32, len(common_platforms) or 1)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [executor.submit(mix_score, p) for p in common_platforms]
         for fut in as_completed(futures):
-            platform, score = fut.result()
+            platform, score, err = fut.result()
             scores[platform] = score
-            print(f"{platform}: {score:.3f}")
+            errors[platform] = err
+            event("platform_score", content_type="mix", platform=platform, score=score, error=err)
             if score > best_score:
                 best, best_score = platform, score
 
-    print(f"\n✅ Plataforma mixta recomendada: {best}\n")
-    return scores, best
+    event("affinity_result", content_type="mix", best=best, score=best_score)
+    return _store_affinity(key, scores, best, errors, return_errors)
+
+
+def _cached_affinity(key, return_errors: bool):
+    """
+    Resultado guardado de calculate_*_affinity con la forma pedida, o None.
+    """
+    if key is None:
+        return None
+    cached = get_cached_result(key)
+    if cached is None:
+        return None
+    scores, best, errors = cached
+    return (scores, best, errors) if return_errors else (scores, best)
+
+
+def _store_affinity(key, scores: dict, best, errors: dict, return_errors: bool) -> tuple:
+    """
+    Guarda el resultado (si hay clave) y lo devuelve con la forma pedida.
+    """
+    if key is not None:
+        store_result(key, [scores, best, errors])
+    return (scores, best, errors) if return_errors else (scores, best)
+
+
+def _best_platform(scores: dict):
+    """
+    Plataforma con mayor puntuación (None si no hay ninguna).
+    """
+    return max(scores, key=scores.get) if scores else None
+
+
+def _reference_mix_scores(user_ratings, series_ratings, tfidf, movie_PLATFORMS, series_PLATFORMS):
+    """
+    Afinidad mixta desde los precálculos de referencia (ver reference_scores),
+    o None si alguno de los dos no es aplicable.
+    """
+    movies = reference_scores("movies", user_ratings, tfidf, movie_PLATFORMS)
+    series = reference_scores("series", series_ratings, tfidf, series_PLATFORMS) if movies is not None else None
+    if series is None:
+        return None
+    common_platforms = set(movie_PLATFORMS).intersection(series_PLATFORMS)
+    return {p: (movies[p] + series[p]) / 2 for p in common_platforms}
+
+
+def _catalog_mix_scores(parts_m, parts_s, tfidf, movie_PLATFORMS, series_PLATFORMS):
+    """
+    Afinidad mixta desde las matrices del catálogo (ver catalog), o None si
+    alguna de las dos no está vigente.
+    """
+    movies = catalog_scores("movies", parts_m, tfidf, movie_PLATFORMS)
+    series = catalog_scores("series", parts_s, tfidf, series_PLATFORMS) if movies is not None else None
+    if series is None:
+        return None
+    common_platforms = set(movie_PLATFORMS).intersection(series_PLATFORMS)
+    return {p: (movies[p] + series[p]) / 2 for p in common_platforms}
+
+
+def _exact_update(scores: dict, totals: dict) -> tuple:
+    """
+    Actualización final de iter_*_affinity a partir de puntuaciones exactas.
+    """
+    estimates = {p: {"score": s, "error": 0.0, "n": totals[p], "total": totals[p]}
+                 for p, s in scores.items()}
+    event("progressive_update", batch=0, finished=True,
+          evaluated=sum(e["n"] for e in estimates.values()))
+    return estimates, True
+
+
+# ======== MODO APROXIMADO ========
+
+def _stratified_order(ids: list, seed: int, key: str) -> list:
+    """
+    Devuelve los IDs en un orden aleatorio estratificado y determinista.
+
+    Los IDs se reparten en APPROX_STRATA estratos por cuantiles de ID (en TMDB
+    el ID crece con la fecha de alta, así que los estratos agrupan épocas) y
+    se intercalan de forma sistemática, de modo que cualquier prefijo del
+    orden es una muestra con asignación proporcional a cada estrato.
+
+    Parámetros:
+    - ids: lista de IDs del catálogo.
+    - seed: semilla global del muestreo.
+    - key: identificador del catálogo (p. ej. "Netflix:movie").
+
+    Devuelve:
+    - list: los mismos IDs reordenados.
+    """
+    rng = random.Random(f"{seed}:{key}")
+    ordered = sorted(ids)
+    n_strata = max(1, min(APPROX_STRATA, len(ordered)))
+    keyed = []
+    for h in range(n_strata):
+        stratum = ordered[h * len(ordered) // n_strata:(h + 1) * len(ordered) // n_strata]
+        rng.shuffle(stratum)
+        offset = rng.random()
+        keyed.extend(((j + offset) / len(stratum), item_id) for j, item_id in enumerate(stratum))
+    keyed.sort(key=lambda x: x[0])
+    return [item_id for _, item_id in keyed]
+
+
+def _platform_mean(ids: list, sim_fn, sample_size: int = None,
+                   target_error: float = None, seed: int = 0, key: str = "") -> tuple:
+    """
+    Media de similitud de un catálogo, exacta o estimada por muestreo.
+
+    - Sin sample_size ni target_error recorre todos los IDs (error 0).
+    - Con sample_size evalúa como máximo esa cantidad de títulos.
+    - Con target_error parte de una muestra piloto y la amplía hasta que la
+      semiamplitud del intervalo al 95 % baja del objetivo (o se alcanza
+      sample_size / el catálogo completo).
+
+    Parámetros:
+    - ids: IDs del catálogo.
+    - sim_fn: función ID -> similitud (None si falla la descarga).
+    - sample_size, target_error, seed: ver calculate_affinity.
+    - key: identificador del catálogo para derivar la semilla.
+
+    Devuelve:
+    - (media, semiamplitud del intervalo de confianza).
+    """
+    if sample_size is None and target_error is None:
+        sims = [s for s in map(sim_fn, ids) if s is not None]
+        return (float(np.mean(sims)) if sims else 0.0), 0.0
+
+    order = _stratified_order(ids, seed, key)
+    population = len(order)
+    cap = population if sample_size is None else min(sample_size, population)
+    n = cap if target_error is None else min(cap, APPROX_PILOT_SIZE)
+    sims, seen = [], 0
+    while True:
+        for item_id in order[seen:n]:
+            sim = sim_fn(item_id)
+            if sim is not None:
+                sims.append(sim)
+        seen = n
+        mean, half = _mean_interval(sims, seen, population)
+        if target_error is None or half <= target_error or seen >= cap:
+            return mean, half
+        # Tamaño necesario según la varianza observada (con corrección finita)
+        sd = np.std(sims, ddof=1) if len(sims) > 1 else 0.0
+        n0 = (CONFIDENCE_Z * sd / target_error) ** 2
+        needed = math.ceil(n0 / (1 + n0 / population))
+        n = min(cap, max(needed, seen + APPROX_PILOT_SIZE))
+
+
+# ======== CÁLCULO PROGRESIVO ========
+
+def _mean_interval(sims: list, seen: int, population: int, z: float = CONFIDENCE_Z) -> tuple:
+    """
+    Estima la media de similitud de una plataforma a partir de una muestra.
+
+    Aplica la corrección de población finita, de modo que el intervalo
+    se anula cuando ya se han recorrido todos los títulos del catálogo.
+
+    Parámetros:
+    - sims: similitudes obtenidas hasta ahora.
+    - seen: IDs ya procesados (incluye los que fallaron al descargarse).
+    - population: número total de IDs de la plataforma.
+    - z: cuantil normal del intervalo de confianza.
+
+    Devuelve:
+    - (media, semiamplitud del intervalo).
+    """
+    if seen >= population:
+        return (float(np.mean(sims)) if sims else 0.0), 0.0
+    if len(sims) < 2:
+        return (float(np.mean(sims)) if sims else 0.0), float("inf")
+    fpc = np.sqrt((population - seen) / (population - 1))
+    half = z * np.std(sims, ddof=1) / np.sqrt(len(sims)) * fpc
+    return float(np.mean(sims)), float(half)
+
+
+def _is_separated(estimates: dict) -> bool:
+    """
+    Indica si la plataforma líder está estadísticamente separada del resto:
+    su cota inferior supera la cota superior de todas las demás.
+    """
+    if len(estimates) < 2:
+        return True
+    ranked = sorted(estimates.items(), key=lambda x: x[1]["score"], reverse=True)
+    top = ranked[0][1]
+    low = top["score"] - top["error"]
+    return all(low > e["score"] + e["error"] for _, e in ranked[1:])
+
+
+def _progressive_affinity(streams: dict, seed=None, early_stop: bool = True, cancel=None):
+    """
+    Motor común de los generadores iter_*_affinity.
+
+    Cada plataforma tiene uno o varios flujos (ids, función de similitud);
+    su puntuación es la media de las medias de sus flujos, igual que en
+    calculate_mix_affinity. En cada ronda se procesan lotes crecientes de
+    títulos elegidos al azar y se emiten estimaciones provisionales.
+
+    Parámetros:
+    - streams: dict {platform: [(ids, sim_fn), ...]}; sim_fn devuelve la
+      similitud de un ID o None si no se pudo obtener.
+    - seed: semilla del orden aleatorio (None = no determinista).
+    - early_stop: si True, termina en cuanto la mejor plataforma queda separada.
+    - cancel: threading.Event opcional; si se activa, se dejan de pedir
+      títulos (también a mitad de ronda) y el generador termina sin emitir más.
+
+    Produce:
+    - (estimates, finished): estimates es {platform: {"score", "error", "n", "total"}}.
+    """
+    rng = random.Random(seed)
+    orders = {p: [rng.sample(list(ids), len(ids)) for ids, _ in flows]
+              for p, flows in streams.items()}
+    sims = {p: [[] for _ in flows] for p, flows in streams.items()}
+    seen = {p: [0 for _ in flows] for p, flows in streams.items()}
+
+    def advance(platform: str, batch: int) -> None:
+        for k, (_, sim_fn) in enumerate(streams[platform]):
+            order = orders[platform][k]
+            start = seen[platform][k]
+            for item_id in order[start:start + batch]:
+                if cancel is not None and cancel.is_set():
+                    return
+                sim = sim_fn(item_id)
+                if sim is not None:
+                    sims[platform][k].append(sim)
+            seen[platform][k] = min(start + batch, len(order))
+
+    def estimate(platform: str) -> dict:
+        means, halves = [], []
+        for k, order in enumerate(orders[platform]):
+            mean, half = _mean_interval(sims[platform][k], seen[platform][k], len(order))
+            means.append(mean)
+            halves.append(half)
+        return {
+            "score": float(np.mean(means)) if means else 0.0,
+            "error": float(np.sqrt(np.sum(np.square(halves))) / len(halves)) if halves else 0.0,
+            "n": sum(seen[platform]),
+            "total": sum(len(o) for o in orders[platform]),
+        }
+
+    batch = PROGRESSIVE_FIRST_BATCH
+    max_workers = min(32, len(streams) or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            pending = [p for p in streams
+                       if any(s < len(o) for s, o in zip(seen[p], orders[p]))]
+            with timed("engine.progressive_round"):
+                futures = [executor.submit(advance, p, batch) for p in pending]
+                for fut in as_completed(futures):
+                    fut.result()
+            if cancel is not None and cancel.is_set():
+                event("progressive_cancelled", batch=batch)
+                return
+            estimates = {p: estimate(p) for p in streams}
+            exhausted = all(e["n"] >= e["total"] for e in estimates.values())
+            finished = exhausted or (early_stop and _is_separated(estimates))
+            event("progressive_update", batch=batch, finished=finished,
+                  evaluated=sum(e["n"] for e in estimates.values()))
+            yield estimates, finished
+            if finished:
+                return
+            batch *= PROGRESSIVE_GROWTH
+
+
+
+def _movie_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS):
+    """
+    Devuelve una función ID -> similitud coseno con el perfil de películas
+    (None si no se pudieron obtener los detalles).
+    """
+    def sim(mid):
+        det = get_movie_details(mid)
+        if not det:
+            return None
+        vec = build_feature_vector(det, genres, countries, companies, languages, tfidf, PLATFORMS)
+        return cosine_similarity(profile, vec)
+    return sim
+
+
+def _series_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS):
+    """
+    Igual que _movie_similarity, pero para series.
+    """
+    def sim(sid):
+        det = get_series_details(sid)
+        if not det:
+            return None
+        vec = build_feature_vector(det, genres, countries, companies, languages, tfidf, PLATFORMS)
+        return cosine_similarity(profile, vec)
+    return sim
+
+
+def _memoized_updates(key, updates, seeded: bool):
+    """
+    Envuelve un generador de actualizaciones progresivas con la caché de
+    resultados: si la petición ya se resolvió, emite directamente la
+    estimación final; si no, guarda la última al terminar. Un cálculo
+    cancelado no se guarda, ni una estimación sin semilla que paró antes de
+    recorrer los catálogos: volver a pedirla daría otra muestra.
+
+    Parámetros:
+    - key: clave de affinity_key, o None para no usar la caché.
+    - updates: función sin argumentos que crea el generador.
+    - seeded: si el muestreo tiene una semilla explícita (resultado reproducible).
+    """
+    cached = get_cached_result(key) if key is not None else None
+    if cached is not None:
+        yield cached, True
+        return
+    for estimates, finished in updates():
+        exact = all(e["n"] >= e["total"] for e in estimates.values())
+        if finished and key is not None and (seeded or exact):
+            store_result(key, estimates)
+        yield estimates, finished
+
+
+def iter_affinity(user_ratings: dict, tfidf, PLATFORMS: dict,
+                  seed=None, early_stop: bool = True, cancel=None, use_cache: bool = True,
+                  use_precomputed: bool = True):
+    """
+    Versión progresiva de calculate_affinity.
+
+    Puntúa cada plataforma sobre muestras aleatorias crecientes de su catálogo
+    y emite tras cada ronda la puntuación provisional con su intervalo de
+    confianza. Si se recorre todo el catálogo, el resultado coincide con
+    calculate_affinity.
+
+    Parámetros:
+    - user_ratings: dict {movie_id: rating}.
+    - tfidf: TfidfVectorizer para overviews.
+    - PLATFORMS: dict {platform_name: [movie_id, ...]}.
+    - seed: semilla del muestreo (None = no determinista).
+    - early_stop: detenerse cuando la mejor plataforma quede separada del resto.
+    - cancel: threading.Event opcional para abandonar el cálculo.
+    - use_cache: si la misma petición ya terminó, emitir su resultado final
+      sin recalcular (ver result_cache). Solo se guardan los resultados
+      exactos y los de una semilla explícita: con seed=None y parada
+      temprana la estimación es aleatoria y no se reutiliza.
+    - use_precomputed: con las valoraciones de la configuración rápida,
+      puntuar desde el precálculo (ver reference_scores); con una matriz del
+      catálogo vigente, emitir directamente el resultado exacto (ver catalog).
+
+    Produce:
+    - (estimates, finished): estimates es {platform: {"score", "error", "n", "total"}}
+      y finished indica si es la última actualización.
+    """
+    def updates():
+        quick = reference_scores("movies", user_ratings, tfidf, PLATFORMS) if use_precomputed else None
+        if quick is not None:
+            yield _exact_update(quick, {p: len(ids) for p, ids in PLATFORMS.items()})
+            return
+        profile, genres, countries, companies, languages = build_user_profile(
+            user_ratings, tfidf, PLATFORMS
+        )
+        exact = catalog_scores("movies", (profile, genres, countries, companies, languages),
+                               tfidf, PLATFORMS) if use_precomputed else None
+        if exact is not None:
+            yield _exact_update(exact, {p: len(ids) for p, ids in PLATFORMS.items()})
+            return
+        sim = _movie_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS)
+        streams = {p: [(ids, sim)] for p, ids in PLATFORMS.items()}
+        yield from _progressive_affinity(streams, seed=seed, early_stop=early_stop, cancel=cancel)
+
+    key = affinity_key("iter_movies", [user_ratings], [PLATFORMS], tfidf,
+                       (seed, early_stop)) if use_cache else None
+    yield from _memoized_updates(key, updates, seed is not None)
+
+
+def iter_series_affinity(series_ratings: dict, tfidf, PLATFORMS: dict,
+                         seed=None, early_stop: bool = True, cancel=None, use_cache: bool = True,
+                         use_precomputed: bool = True):
+    """
+    Versión progresiva de calculate_series_affinity (ver iter_affinity).
+    """
+    def updates():
+        quick = reference_scores("series", series_ratings, tfidf, PLATFORMS) if use_precomputed else None
+        if quick is not None:
+            yield _exact_update(quick, {p: len(ids) for p, ids in PLATFORMS.items()})
+            return
+        profile, genres, countries, companies, languages = build_series_profile(
+            series_ratings, tfidf, PLATFORMS
+        )
+        exact = catalog_scores("series", (profile, genres, countries, companies, languages),
+                               tfidf, PLATFORMS) if use_precomputed else None
+        if exact is not None:
+            yield _exact_update(exact, {p: len(ids) for p, ids in PLATFORMS.items()})
+            return
+        sim = _series_similarity(profile, genres, countries, companies, languages, tfidf, PLATFORMS)
+        streams = {p: [(ids, sim)] for p, ids in PLATFORMS.items()}
+        yield from _progressive_affinity(streams, seed=seed, early_stop=early_stop, cancel=cancel)
+
+    key = affinity_key("iter_series", [series_ratings], [PLATFORMS], tfidf,
+                       (seed, early_stop)) if use_cache else None
+    yield from _memoized_updates(key, updates, seed is not None)
+
+
+def iter_mix_affinity(user_ratings: dict, series_ratings: dict, tfidf,
+                      movie_PLATFORMS: dict, series_PLATFORMS: dict,
+                      seed=None, early_stop: bool = True, cancel=None, use_cache: bool = True,
+                      use_precomputed: bool = True):
+    """
+    Versión progresiva de calculate_mix_affinity (ver iter_affinity).
+    Solo considera plataformas comunes a ambos catálogos.
+    """
+    def updates():
+        quick = _reference_mix_scores(user_ratings, series_ratings, tfidf,
+                                      movie_PLATFORMS, series_PLATFORMS) if use_precomputed else None
+        if quick is not None:
+            yield _exact_update(quick, {p: len(movie_PLATFORMS[p]) + len(series_PLATFORMS[p])
+                                            for p in quick})
+            return
+        profile_m, g_m, c_m, co_m, l_m = build_user_profile(user_ratings, tfidf, movie_PLATFORMS)
+        profile_s, g_s, c_s, co_s, l_s = build_series_profile(series_ratings, tfidf, series_PLATFORMS)
+        exact = _catalog_mix_scores((profile_m, g_m, c_m, co_m, l_m), (profile_s, g_s, c_s, co_s, l_s),
+                                    tfidf, movie_PLATFORMS, series_PLATFORMS) if use_precomputed else None
+        if exact is not None:
+            yield _exact_update(exact, {p: len(movie_PLATFORMS[p]) + len(series_PLATFORMS[p])
+                                        for p in exact})
+            return
+        sim_m = _movie_similarity(profile_m, g_m, c_m, co_m, l_m, tfidf, movie_PLATFORMS)
+        sim_s = _series_similarity(profile_s, g_s, c_s, co_s, l_s, tfidf, series_PLATFORMS)
+        common_platforms = set(movie_PLATFORMS).intersection(series_PLATFORMS)
+        streams = {
+            p: [(movie_PLATFORMS[p], sim_m), (series_PLATFORMS[p], sim_s)]
+            for p in common_platforms
+        }
+        yield from _progressive_affinity(streams, seed=seed, early_stop=early_stop, cancel=cancel)
+
+    key = affinity_key("iter_mix", [user_ratings, series_ratings], [movie_PLATFORMS, series_PLATFORMS],
+                       tfidf, (seed, early_stop)) if use_cache else None
+    yield from _memoized_updates(key, updates, seed is not None)
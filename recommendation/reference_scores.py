@@ -0,0 +1,212 @@
+# recommendation/reference_scores.py
+
+"""
+Contribuciones precalculadas de los títulos de referencia de la
+configuración rápida (REFERENCE_MOVIES / REFERENCE_SERIES).
+
+Con un conjunto fijo de títulos valorados el vocabulario del perfil es
+fijo y solo cambian las notas r. Si v_i son los vectores de referencia y
+v_j los del catálogo, el perfil es P = Σ r_i v_i / Σ r_i y la afinidad
+exacta de la plataforma p (media de cosenos) se descompone en
+
+    score_p = (r · C_p) / sqrt(rᵀ G r)
+
+con C_ip = media_{j ∈ p} (v_i · v_j / ‖v_j‖) y G_ik = v_i · v_k.
+C y G se calculan una vez recorriendo el catálogo; después cualquier
+combinación de notas se puntúa en O(k × plataformas) sin tocar TMDB.
+
+Las matrices dependen del catálogo, de WEIGHTS y del vectorizador TF-IDF:
+se guardan junto a sus versiones (ver result_cache) y se ignoran si no
+coinciden con las actuales. Cada precálculo es un directorio de .npy que
+se abre en modo memmap, compartido entre procesos.
+"""
+
+import glob
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from recommendation.tmdb_client import get_movie_details
+from recommendation.series_client import get_series_details
+from recommendation.user_profile import build_user_profile, build_series_profile
+from recommendation.feature_engineering import build_feature_vector
+from recommendation.result_cache import catalog_version, artifact_version, weights_version
+from recommendation.metrics import incr, timed
+from recommendation.data_utils import load_arrays, save_arrays
+
+REFERENCE_DIR = os.path.join("DATA", "REFERENCE")
+
+# Arrays de un precálculo (un .npy por array)
+_ARRAYS = ("ref_ids", "ids", "platforms", "C", "G", "counts", "versions")
+
+# Precálculos cargados: {ruta: dict o None si no existe}
+_loaded = {}
+_lock = threading.Lock()
+
+
+def reference_path(data: dict, content_type: str, base_dir: str = REFERENCE_DIR) -> str:
+    """
+    Directorio de un precálculo: {tipo}_{nº de referencias}_{versión del vectorizador}.
+    (El flujo mixto puntúa las series con el vectorizador de películas,
+    así que un mismo conjunto puede tener varios precálculos.)
+    """
+    return os.path.join(base_dir, f"{content_type}_{len(data['ref_ids'])}_{data['artifact'][:10]}")
+
+
+def build_reference_contributions(content_type: str, ref_ids: list, tfidf, PLATFORMS: dict,
+                                  max_workers: int = 16) -> dict:
+    """
+    Calcula C y G para un conjunto de títulos de referencia.
+
+    Parámetros:
+    - content_type: 'movies' o 'series' (tipo de los títulos y del catálogo).
+    - ref_ids: IDs de referencia que valora la configuración rápida.
+    - tfidf: vectorizador con el que se puntuará después.
+    - PLATFORMS: catálogo {plataforma: [ids]}.
+    - max_workers: hilos para descargar y vectorizar el catálogo.
+
+    Devuelve:
+    - dict con "ref_ids", "ids" (referencias con detalles), "platforms",
+      "C" (k × plataformas), "G" (k × k), "counts" (títulos con detalles
+      por plataforma) y las versiones "catalog", "weights", "artifact".
+    """
+    series = content_type == "series"
+    details_fn = get_series_details if series else get_movie_details
+    profile_fn = build_series_profile if series else build_user_profile
+
+    # Mismo vocabulario que tendrá el perfil al valorar todas las referencias
+    _, genres, countries, companies, languages = profile_fn(
+        {i: 1.0 for i in ref_ids}, tfidf, PLATFORMS
+    )
+
+    def vector(item_id):
+        det = details_fn(item_id)
+        if not det:
+            return None
+        return build_feature_vector(det, genres, countries, companies, languages, tfidf, PLATFORMS)
+
+    refs, rows = [], []
+    for i in ref_ids:
+        vec = vector(i)
+        if vec is not None:
+            refs.append(int(i))
+            rows.append(vec)
+    V = np.array(rows) if rows else np.zeros((0, 0))
+
+    def contribution(item_id):
+        vec = vector(item_id)
+        if vec is None:
+            return item_id, None
+        norm = np.linalg.norm(vec)
+        return item_id, (V @ vec / norm) if norm and len(refs) else np.zeros(len(refs))
+
+    # Cada título se vectoriza una vez aunque esté en varias plataformas
+    unique = sorted({int(i) for ids in PLATFORMS.values() for i in ids})
+    with timed("reference.build"):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            contributions = dict(executor.map(contribution, unique))
+
+    platforms = list(PLATFORMS)
+    C = np.zeros((len(refs), len(platforms)))
+    counts = np.zeros(len(platforms), dtype=np.int64)
+    for k, p in enumerate(platforms):
+        found = [contributions[int(i)] for i in PLATFORMS[p] if contributions[int(i)] is not None]
+        if found:
+            C[:, k] = np.mean(found, axis=0)
+            counts[k] = len(found)
+
+    return {
+        "ref_ids": [int(i) for i in ref_ids],
+        "ids": refs,
+        "platforms": platforms,
+        "C": C,
+        "G": V @ V.T if len(refs) else np.zeros((0, 0)),
+        "counts": counts,
+        "catalog": catalog_version(PLATFORMS),
+        "weights": weights_version(),
+        "artifact": artifact_version(tfidf),
+    }
+
+
+def save_reference_contributions(data: dict, path: str) -> None:
+    """
+    Guarda un precálculo como directorio de .npy (ver data_utils.save_arrays).
+    """
+    save_arrays(path, {
+        "ref_ids": np.array(data["ref_ids"], dtype=np.int64),
+        "ids": np.array(data["ids"], dtype=np.int64),
+        "platforms": np.array(data["platforms"], dtype=str),
+        "C": data["C"], "G": data["G"], "counts": data["counts"],
+        "versions": np.array([data["catalog"], data["weights"], data["artifact"]], dtype=str),
+    })
+    with _lock:
+        _loaded.pop(path, None)
+
+
+def load_reference_contributions(path: str):
+    """
+    Carga un precálculo guardado (memorizado por ruta); C, G y counts se
+    mapean en memoria en solo lectura.
+
+    Devuelve:
+    - dict como el de build_reference_contributions, o None si no existe.
+    """
+    with _lock:
+        if path in _loaded:
+            return _loaded[path]
+    data = None
+    f = load_arrays(path, _ARRAYS)
+    if f is not None:
+        catalog, weights, artifact = (str(v) for v in f["versions"])
+        data = {
+            "ref_ids": [int(i) for i in f["ref_ids"]],
+            "ids": [int(i) for i in f["ids"]],
+            "platforms": [str(p) for p in f["platforms"]],
+            "C": f["C"], "G": f["G"], "counts": f["counts"],
+            "catalog": catalog, "weights": weights, "artifact": artifact,
+        }
+    with _lock:
+        _loaded[path] = data
+    return data
+
+
+def reference_scores(content_type: str, ratings: dict, tfidf, PLATFORMS: dict,
+                     base_dir: str = REFERENCE_DIR):
+    """
+    Afinidad exacta por plataforma a partir de un precálculo, si es aplicable.
+
+    Solo se usa cuando las valoraciones son exactamente las de un conjunto
+    precalculado y este coincide con el catálogo, los pesos y el
+    vectorizador actuales.
+
+    Parámetros:
+    - content_type: 'movies' o 'series'.
+    - ratings: dict {id: rating}.
+    - tfidf, PLATFORMS: los mismos que recibiría el motor.
+
+    Devuelve:
+    - dict {platform: score}, o None si hay que calcular de la forma normal.
+    """
+    rated = sorted(int(i) for i in ratings)
+    pattern = os.path.join(base_dir, f"{content_type}_{len(rated)}_*")
+    data = None
+    for path in glob.glob(pattern):
+        candidate = load_reference_contributions(path)
+        if candidate is not None and sorted(candidate["ref_ids"]) == rated \
+                and candidate["artifact"] == artifact_version(tfidf):
+            data = candidate
+            break
+    if data is None:
+        return None
+    if data["weights"] != weights_version() or data["catalog"] != catalog_version(PLATFORMS):
+        incr("reference.stale")
+        return None
+
+    incr("reference.hit")
+    ratings = {int(i): float(r) for i, r in ratings.items()}
+    r = np.array([ratings[i] for i in data["ids"]])
+    norm = float(np.sqrt(max(r @ data["G"] @ r, 0.0))) if len(r) else 0.0
+    if not norm:
+        return {p: 0.0 for p in data["platforms"]}
+    totals = r @ data["C"] / norm
+    return {p: float(totals[k]) for k, p in enumerate(data["platforms"])}
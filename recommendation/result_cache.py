@@ -0,0 +1,217 @@
+# recommendation/result_cache.py
+
+"""
+Caché de resultados del motor de afinidad.
+
+La clave es un hash canónico de todo lo que determina el resultado:
+las puntuaciones (ordenadas), la versión del catálogo de plataformas,
+los valores actuales de WEIGHTS, la versión del vectorizador TF-IDF y
+los parámetros del cálculo. Dos peticiones idénticas (muy habitual con la
+configuración rápida de REFERENCE_MOVIES) devuelven el resultado al instante.
+
+En memoria se guardan RESULT_CACHE_SIZE resultados con expulsión LRU.
+Si config.RESULT_CACHE_DIR (variable RECSYS_RESULT_CACHE_DIR) está
+definido, los resultados se persisten además como JSON en ese directorio,
+conservando los RESULT_CACHE_DISK_MAX usados más recientemente.
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from recommendation.config import WEIGHTS, RESULT_CACHE_DIR, OVERVIEW_QUANTIZATION
+from recommendation.metrics import incr
+from recommendation.franchise import load_collection_index
+from recommendation.genre_inference import predictions_version
+from recommendation.feature_engineering import feature_dtype
+from recommendation.overview_svd import overview_version
+
+# Resultados en memoria y en disco
+RESULT_CACHE_SIZE = 128
+RESULT_CACHE_DISK_MAX = 1024
+
+_results = OrderedDict()
+_lock = threading.Lock()
+_cache_dir = RESULT_CACHE_DIR
+# Versión de cada vectorizador ya calculada (se libera con el objeto)
+_artifact_versions = weakref.WeakKeyDictionary()
+
+
+def set_result_cache_dir(path) -> None:
+    """
+    Activa (ruta) o desactiva (None) la persistencia en disco.
+    """
+    global _cache_dir
+    _cache_dir = path
+
+
+def clear_result_cache(disk: bool = False) -> None:
+    """
+    Vacía la caché en memoria y, si disk=True, también la de disco.
+    """
+    with _lock:
+        _results.clear()
+    if disk and _cache_dir:
+        for path in glob.glob(os.path.join(_cache_dir, "*.json")):
+            os.remove(path)
+
+
+def catalog_version(platforms: dict) -> str:
+    """
+    Hash del contenido del catálogo {plataforma: [ids]}, independiente del
+    orden de los IDs. Se calcula siempre sobre los IDs (ordenados con numpy,
+    ~1 ms por 10^4 IDs), así que cualquier cambio, también sustituir un ID
+    por otro en la misma lista, da otra versión.
+    """
+    h = hashlib.sha1()
+    for name in sorted(platforms):
+        ids = platforms[name]
+        if not isinstance(ids, (list, tuple, np.ndarray)):
+            ids = list(ids)
+        h.update(str(name).encode("utf-8"))
+        h.update(b"\0")
+        h.update(np.sort(np.asarray(ids, dtype=np.int64)).tobytes())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def tfidf_version(tfidf) -> str:
+    """
+    Hash del vocabulario y los pesos idf del vectorizador TF-IDF.
+    Se calcula una vez por objeto.
+    """
+    try:
+        return _artifact_versions[tfidf]
+    except (KeyError, TypeError):
+        pass
+    h = hashlib.sha1()
+    vocab = getattr(tfidf, "vocabulary_", None) or {}
+    h.update(json.dumps(sorted((t, int(i)) for t, i in vocab.items())).encode("utf-8"))
+    idf = getattr(tfidf, "idf_", None)
+    if idf is not None:
+        h.update(idf.tobytes())
+    version = h.hexdigest()
+    try:
+        _artifact_versions[tfidf] = version
+    except TypeError:
+        pass  # objeto sin soporte de weakref: se recalcula cada vez
+    return version
+
+
+def artifact_version(tfidf) -> str:
+    """
+    Versión de los artefactos que determinan los vectores: el vectorizador
+    TF-IDF, el índice de colecciones (ver franchise.py), los géneros
+    inferidos (ver genre_inference.py), la proyección LSA del overview
+    (ver overview_svd.py) y la precisión de los vectores.
+    """
+    extra = load_collection_index()["version"] + "|" + predictions_version()
+    extra += f"|{overview_version(tfidf)}|{feature_dtype().name}|{OVERVIEW_QUANTIZATION}"
+    return hashlib.sha1(f"{tfidf_version(tfidf)}|{extra}".encode("ascii")).hexdigest()
+
+
+def weights_version() -> str:
+    """
+    Hash de los valores actuales de WEIGHTS.
+    """
+    payload = json.dumps(sorted((k, float(v)) for k, v in WEIGHTS.items()))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def affinity_key(kind: str, ratings: list, platforms: list, tfidf, params: tuple) -> str:
+    """
+    Clave canónica de un cálculo de afinidad.
+
+    Parámetros:
+    - kind: tipo de cálculo (p. ej. "movies", "iter_mix").
+    - ratings: lista de dicts {id: rating} (películas y/o series).
+    - platforms: lista de catálogos {plataforma: [ids]}.
+    - tfidf: vectorizador usado.
+    - params: resto de parámetros que afectan al resultado.
+
+    Devuelve:
+    - str: hash hexadecimal.
+    """
+    payload = {
+        "kind": kind,
+        "ratings": [sorted([int(k), float(v)] for k, v in r.items()) for r in ratings],
+        "catalogs": [catalog_version(p) for p in platforms],
+        "artifact": artifact_version(tfidf),
+        "weights": weights_version(),
+        "params": repr(params),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(_cache_dir, f"{key}.json")
+
+
+def _remember(key: str, value) -> None:
+    with _lock:
+        _results[key] = value
+        _results.move_to_end(key)
+        while len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+
+
+def get_cached_result(key: str):
+    """
+    Devuelve una copia del resultado guardado para la clave, o None.
+    """
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            incr("result_cache.hit")
+            return copy.deepcopy(_results[key])
+    if _cache_dir:
+        path = _disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+            os.utime(path)  # marca de uso para la expulsión LRU en disco
+        except (OSError, ValueError, KeyError):
+            value = None
+        if value is not None:
+            _remember(key, value)
+            incr("result_cache.disk_hit")
+            return copy.deepcopy(value)
+    incr("result_cache.miss")
+    return None
+
+
+def _prune_disk() -> None:
+    files = glob.glob(os.path.join(_cache_dir, "*.json"))
+    if len(files) <= RESULT_CACHE_DISK_MAX:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - RESULT_CACHE_DISK_MAX]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def store_result(key: str, value) -> None:
+    """
+    Guarda un resultado (serializable en JSON) en memoria y, si la
+    persistencia está activa, en disco.
+    """
+    value = copy.deepcopy(value)
+    _remember(key, value)
+    if not _cache_dir:
+        return
+    try:
+        os.makedirs(_cache_dir, exist_ok=True)
+        tmp = _disk_path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"value": value}, f)
+        os.replace(tmp, _disk_path(key))
+        _prune_disk()
+    except OSError:
+        incr("result_cache.disk_error")
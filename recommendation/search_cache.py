@@ -0,0 +1,60 @@
+# recommendation/search_cache.py
+
+"""
+Caché LRU acotada para las búsquedas por título de los clientes de TMDB.
+
+Las consultas se normalizan (minúsculas, espacios colapsados) y solo se
+reutiliza la respuesta de la misma consulta. No se filtran localmente los
+resultados de un prefijo ("star" -> "star wa"): TMDB también busca en los
+títulos alternativos y traducidos, que no vienen en los resultados, así
+que el filtrado descartaría coincidencias válidas.
+"""
+
+import threading
+from collections import OrderedDict
+from recommendation.fixtures import normalize_query
+
+# Número máximo de consultas guardadas por cliente
+SEARCH_CACHE_SIZE = 256
+
+
+def new_search_cache(max_size: int = SEARCH_CACHE_SIZE) -> dict:
+    """
+    Crea una caché vacía: {"entries": OrderedDict, "lock": Lock, "max_size": int}.
+    Cada entrada es consulta normalizada -> resultados.
+    """
+    return {"entries": OrderedDict(), "lock": threading.Lock(), "max_size": max_size}
+
+
+def cache_lookup(cache: dict, query: str):
+    """
+    Busca una consulta en la caché.
+
+    Parámetros:
+    - cache: caché de new_search_cache.
+    - query: consulta original.
+
+    Devuelve:
+    - list con los resultados, o None si hay que consultar a TMDB.
+    """
+    key = normalize_query(query)
+    with cache["lock"]:
+        entries = cache["entries"]
+        if key not in entries:
+            return None
+        entries.move_to_end(key)
+        return list(entries[key])
+
+
+def cache_store(cache: dict, query: str, results: list) -> None:
+    """
+    Guarda los resultados de una consulta, expulsando la menos usada si
+    se supera el tamaño máximo.
+    """
+    key = normalize_query(query)
+    with cache["lock"]:
+        entries = cache["entries"]
+        entries[key] = list(results)
+        entries.move_to_end(key)
+        while len(entries) > cache["max_size"]:
+            entries.popitem(last=False)
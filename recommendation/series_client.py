@@ -7,7 +7,10 @@ Módulo para obtener detalles y buscar series en TMDB con reintentos y caché en
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from recommendation.config import TMDB_API_KEY
+from recommendation.config import TMDB_API_KEY, TMDB_BASE_URL
+from recommendation.fixtures import record_search, replay_search
+from recommendation.metrics import incr, timed
+from recommendation.search_cache import new_search_cache, cache_lookup, cache_store
 
 # Configuramos una sesión compartida con política de reintentos para llamadas a la API de TMDB
 _series_session = requests.Session()
@@ -25,6 +28,9 @@ _series_session.mount("http://", _series_adapter)
 # Caché en memoria para no repetir peticiones a la misma serie
 _series_cache = {}
 
+# Caché LRU de búsquedas por título (misma consulta normalizada)
+_series_search_cache = new_search_cache()
+
 def get_series_details(series_id: int):
     """
     Obtiene los detalles de una serie por su ID:
@@ -40,10 +46,12 @@ def get_series_details(series_id: int):
     """
     # Devolvemos de la caché si ya se consultó esta serie
     if series_id in _series_cache:
+        incr("tmdb.tv_cache_hit")
         return _series_cache[series_id]
+    incr("tmdb.tv_cache_miss")
 
     # Construimos la URL de la petición
-    url = f"https://api.themoviedb.org/3/tv/{series_id}?language=en-US"
+    url = f"{TMDB_BASE_URL}/tv/{series_id}?language=en-US"
     headers = {
         "accept": "application/json",
         "Authorization": TMDB_API_KEY
@@ -52,21 +60,25 @@ def get_series_details(series_id: int):
 
     try:
         # Realizamos la petición con un timeout razonable
-        resp = _series_session.get(url, headers=headers, timeout=5)
-        resp.raise_for_status()  # Lanza excepción si el status no es 2xx
-        data = resp.json()  # Parseamos la respuesta JSON
+        with timed("tmdb.tv_details"):
+            resp = _series_session.get(url, headers=headers, timeout=5)
+            resp.raise_for_status()  # Lanza excepción si el status no es 2xx
+            data = resp.json()  # Parseamos la respuesta JSON
         # Guardamos en caché para uso futuro
         _series_cache[series_id] = data
         return data
     except requests.RequestException:
         # En caso de error de red o HTTP, devolvemos None
+        incr("tmdb.tv_details_error")
         return None
 
 
 def search_series_by_title(query: str):
     """
     Busca series por título en TMDB:
-    - Realiza una petición de búsqueda y devuelve los resultados.
+    - Responde desde la caché de búsquedas si la misma consulta ya se hizo.
+    - Si hay un corpus de fixtures cargado con esa búsqueda, la reproduce.
+    - Si no, realiza una petición de búsqueda y devuelve los resultados.
 
     Parámetros:
     - query: str, término de búsqueda (título parcial o completo).
@@ -75,18 +87,37 @@ def search_series_by_title(query: str):
     - List[dict] con las series encontradas.
     - Lista vacía si hay error de petición.
     """
-    # Construimos la URL de búsqueda con parámetros de consulta
-    url = f"https://api.themoviedb.org/3/search/tv?query={query}&language=en-US&page=1"
+    cached = cache_lookup(_series_search_cache, query)
+    if cached is not None:
+        incr("tmdb.search_tv_cache_hit")
+        return cached
+    incr("tmdb.search_tv_cache_miss")
+
+    # Búsqueda grabada en un corpus de fixtures cargado (sin red)
+    replayed = replay_search("tv", query)
+    if replayed is not None:
+        incr("tmdb.search_tv_replay")
+        cache_store(_series_search_cache, query, replayed)
+        return replayed
+
+    # requests codifica la consulta (espacios, '&', acentos...) en la URL
+    url = f"{TMDB_BASE_URL}/search/tv"
+    params = {"query": query, "language": "en-US", "page": 1}
     headers = {
         "accept": "application/json",
         "Authorization": TMDB_API_KEY
     }
 
     try:
-        resp = _series_session.get(url, headers=headers, timeout=5)
-        resp.raise_for_status()  # Verificamos código de estado
-        results = resp.json().get("results", [])  # Extraemos la lista de resultados
+        with timed("tmdb.search_tv"):
+            resp = _series_session.get(url, params=params, headers=headers, timeout=5)
+            resp.raise_for_status()  # Verificamos código de estado
+            data = resp.json()
+            results = data.get("results", [])  # Extraemos la lista de resultados
+        cache_store(_series_search_cache, query, results)
+        record_search("tv", query, results)  # Solo graba si hay una grabación activa
         return results
     except requests.RequestException:
         # En caso de fallo devolvemos lista vacía
+        incr("tmdb.search_tv_error")
         return []
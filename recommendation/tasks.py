@@ -0,0 +1,172 @@
+# recommendation/tasks.py
+
+"""
+Gestor de tareas en segundo plano para la GUI.
+
+Todas las operaciones lanzadas desde los flujos (carga de plataformas y
+artefactos, cálculo de afinidad, búsquedas) se ejecutan en un único pool
+de hilos compartido en lugar de crear un hilo por petición:
+- Cada tarea recibe un token de cancelación (threading.Event) que debe
+  consultar entre pasos.
+- Las peticiones con la misma clave mientras la anterior sigue en curso
+  se agrupan: se añaden como oyentes de la tarea existente.
+- submit_task() devuelve un manejador por oyente; cancel_task() solo da
+  de baja a ese oyente y activa el token de la tarea cuando ya no le
+  queda ninguno.
+- La tarea informa de su progreso real con report(fracción, **info).
+
+Las notificaciones se entregan a través de `dispatch` (en Tk,
+lambda fn, *a: window.after(0, fn, *a)) para volver al hilo de la GUI.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from recommendation.metrics import event, incr
+
+# Hilos del pool compartido (los cálculos ya paralelizan internamente)
+TASK_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix="recsys-task")
+_tasks = {}
+_lock = threading.Lock()
+
+
+class TaskCancelled(Exception):
+    """Se lanza dentro de una tarea para abandonarla tras una cancelación."""
+
+
+def check_cancelled(token: threading.Event) -> None:
+    """
+    Lanza TaskCancelled si la tarea asociada al token se ha cancelado.
+    """
+    if token.is_set():
+        raise TaskCancelled()
+
+
+def _direct(fn, *args):
+    fn(*args)
+
+
+def _notify(task: dict, kind: str, *args) -> None:
+    """
+    Entrega una notificación ("progress", "done" o "error") a todos los
+    oyentes de la tarea que no se hayan dado de baja, salvo que la tarea
+    se haya cancelado.
+    """
+    with _lock:
+        if kind == "progress":
+            task["last_progress"] = args
+        listeners = list(task["listeners"])
+    for listener in listeners:
+        callback = listener.get(kind)
+        if callback is None or listener["token"].is_set() or task["token"].is_set():
+            continue
+        try:
+            listener["dispatch"](callback, *args)
+        except Exception as e:
+            # Ventana cerrada u oyente roto: no debe tumbar a los demás
+            logging.debug(f"Notificación '{kind}' de la tarea {task['key']} descartada: {e}")
+
+
+def _run(task: dict, fn, args: tuple) -> None:
+    token = task["token"]
+
+    def report(fraction: float, **info):
+        _notify(task, "progress", max(0.0, min(1.0, float(fraction))), info)
+
+    try:
+        check_cancelled(token)
+        result = fn(token, report, *args)
+        check_cancelled(token)
+    except TaskCancelled:
+        incr("tasks.cancelled")
+        event("task_cancelled", key=str(task["key"]))
+    except Exception as e:
+        incr("tasks.error")
+        logging.error(f"Error en la tarea {task['key']}: {e}")
+        _notify(task, "error", e)
+    else:
+        incr("tasks.done")
+        _notify(task, "done", result)
+    finally:
+        with _lock:
+            if _tasks.get(task["key"]) is task:
+                del _tasks[task["key"]]
+
+
+def submit_task(key, fn, *args, on_progress=None, on_done=None, on_error=None, dispatch=None) -> dict:
+    """
+    Lanza fn(token, report, *args) en el pool compartido.
+
+    Si ya hay una tarea activa con la misma clave, no se lanza otra: los
+    callbacks se añaden a la existente (y reciben su último progreso).
+    Cada llamada obtiene su propio manejador, de modo que cancelar uno no
+    afecta a los demás oyentes de la tarea.
+
+    Parámetros:
+    - key: clave hashable que identifica la petición.
+    - fn: función de la tarea; recibe el token de cancelación y report.
+    - on_progress(fracción, info): progreso en [0, 1] con datos adicionales.
+    - on_done(resultado) / on_error(excepción): finalización.
+    - dispatch: función (callback, *args) que ejecuta el callback en el
+      hilo adecuado. Por defecto se llama directamente desde el pool.
+
+    Devuelve:
+    - dict manejador del oyente (usar con cancel_task); su "token" se
+      activa al cancelarlo.
+    """
+    listener = {"key": key, "token": threading.Event(), "progress": on_progress,
+                "done": on_done, "error": on_error, "dispatch": dispatch or _direct}
+    with _lock:
+        task = _tasks.get(key)
+        if task is not None and not task["token"].is_set():
+            task["listeners"].append(listener)
+            replay = task["last_progress"]
+            incr("tasks.coalesced")
+        else:
+            task = {"key": key, "token": threading.Event(), "listeners": [listener],
+                    "last_progress": None}
+            _tasks[key] = task
+            replay = None
+            task["future"] = _executor.submit(_run, task, fn, args)
+        listener["task"] = task
+    if replay is not None and on_progress is not None:
+        listener["dispatch"](on_progress, *replay)
+    return listener
+
+
+def _stop(task: dict) -> None:
+    """
+    Activa el token de la tarea y la retira de las activas (con _lock).
+    """
+    task["token"].set()
+    if _tasks.get(task["key"]) is task:
+        del _tasks[task["key"]]
+
+
+def cancel_task(handle: dict) -> None:
+    """
+    Da de baja al oyente del manejador: deja de recibir notificaciones.
+    Si era el último oyente, cancela la tarea, que termina en cuanto
+    compruebe su token; si no, sigue en curso para los demás.
+    """
+    if handle is None:
+        return
+    handle["token"].set()
+    task = handle["task"]
+    with _lock:
+        task["listeners"] = [l for l in task["listeners"] if l is not handle]
+        if not task["listeners"]:
+            _stop(task)
+
+
+def cancel_all_tasks() -> None:
+    """
+    Cancela todas las tareas activas (p. ej. al cerrar la aplicación).
+    """
+    with _lock:
+        for task in list(_tasks.values()):
+            for listener in task["listeners"]:
+                listener["token"].set()
+            _stop(task)
@@ -0,0 +1,213 @@
+# recommendation/title_index.py
+
+"""
+Índice local de títulos para buscar películas y series sin llamar a TMDB.
+
+Índice invertido de tokens y prefijos de token sobre los catálogos de
+data_utils, con los documentos numerados por popularidad descendente:
+la intersección de listas devuelve directamente los más populares.
+Las búsquedas responden en milisegundos. Los catálogos solo traen el
+título original, así que "Money Heist" no está en el índice y una consulta
+puede encajar en mitad de un título ajeno ("spirited" -> "Casper: A Spirited
+Beginning"): si ningún resultado es una coincidencia fuerte
+(has_strong_match), se consulta también TMDB (ver user_interaction_gui).
+"""
+
+import heapq
+import threading
+import unicodedata
+from recommendation.data_utils import load_movie_titles, load_series_titles
+from recommendation.metrics import incr, timed
+
+# Longitud máxima de los prefijos indexados (los tokens más largos se
+# filtran después comparando con el título)
+MAX_PREFIX = 15
+
+# Artículos iniciales que se ignoran al decidir si un título empieza por la
+# consulta ("matrix" es coincidencia fuerte de "The Matrix")
+LEADING_ARTICLES = ("the", "a", "an", "el", "la", "los", "las", "le", "les", "il", "der", "die", "das")
+
+# Índices construidos bajo demanda: {"movies": index, "series": index}
+_indexes = {}
+_index_lock = threading.Lock()
+
+
+def normalize_title(text: str) -> str:
+    """
+    Normaliza un título para indexarlo o buscarlo: minúsculas, sin
+    acentos y con cualquier carácter no alfanumérico como separador.
+    """
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def build_title_index(records) -> dict:
+    """
+    Construye el índice a partir de registros (id, título, popularidad) o
+    (id, título, popularidad, año o None).
+
+    Devuelve:
+    - dict con:
+      - "ids", "titles", "normalized", "popularity", "years": listas
+        alineadas, ordenadas por popularidad.
+      - "tokens": {token: set(doc)} para coincidencias de palabra completa.
+      - "prefixes": {prefijo: set(doc)} para la última palabra de la consulta.
+      - "exact": {título normalizado: [doc, ...]}.
+    """
+    ordered = sorted(records, key=lambda r: -r[2])
+    index = {"ids": [], "titles": [], "normalized": [], "popularity": [], "years": [],
+             "tokens": {}, "prefixes": {}, "exact": {}}
+    for doc, (item_id, title, popularity, *year) in enumerate(ordered):
+        norm = normalize_title(title)
+        index["ids"].append(int(item_id))
+        index["titles"].append(title)
+        index["normalized"].append(norm)
+        index["popularity"].append(float(popularity))
+        index["years"].append(int(year[0]) if year and year[0] is not None else None)
+        index["exact"].setdefault(norm, []).append(doc)
+        for token in set(norm.split()):
+            index["tokens"].setdefault(token, set()).add(doc)
+            for k in range(1, min(len(token), MAX_PREFIX) + 1):
+                index["prefixes"].setdefault(token[:k], set()).add(doc)
+    return index
+
+
+def search_title_index(index: dict, query: str, limit: int = 10) -> list:
+    """
+    Busca en el índice. Todas las palabras de la consulta deben aparecer;
+    la última puede estar incompleta (búsqueda por prefijo).
+
+    Orden: título idéntico a la consulta, títulos que empiezan por ella y,
+    después, popularidad descendente.
+
+    Parámetros:
+    - index: índice de build_title_index.
+    - query: texto introducido por el usuario.
+    - limit: número máximo de resultados.
+
+    Devuelve:
+    - list: [(id, título, popularidad, año o None), ...]
+    """
+    norm = normalize_title(query)
+    tokens = norm.split()
+    if not tokens:
+        return []
+
+    postings = [index["tokens"].get(t, set()) for t in tokens[:-1]]
+    last = tokens[-1]
+    postings.append(index["prefixes"].get(last[:MAX_PREFIX], set()))
+    postings.sort(key=len)
+    docs = set(postings[0])
+    for other in postings[1:]:
+        docs &= other
+        if not docs:
+            return []
+    if len(last) > MAX_PREFIX:
+        docs = {d for d in docs
+                if any(w.startswith(last) for w in index["normalized"][d].split())}
+
+    exact = [d for d in index["exact"].get(norm, []) if d in docs]
+    starts = heapq.nsmallest(limit, (d for d in docs if index["normalized"][d].startswith(norm)))
+    rest = heapq.nsmallest(limit * 2, docs)
+    ranked, seen = [], set()
+    for d in exact + starts + rest:
+        if d not in seen:
+            seen.add(d)
+            ranked.append(d)
+        if len(ranked) >= limit:
+            break
+    return [(index["ids"][d], index["titles"][d], index["popularity"][d], index["years"][d])
+            for d in ranked]
+
+
+def has_strong_match(results: list, query: str) -> bool:
+    """
+    Indica si algún resultado es una coincidencia fuerte de la consulta:
+    su título normalizado, con o sin artículo inicial, empieza por ella.
+    Una palabra que solo aparece en mitad del título no lo es.
+
+    Parámetros:
+    - results: resultados con "title" (películas) o "name" (series).
+    - query: texto introducido por el usuario.
+    """
+    norm = normalize_title(query)
+    if not norm:
+        return False
+    for r in results:
+        title = normalize_title(r.get("title") or r.get("name") or "")
+        words = title.split(" ", 1)
+        if title.startswith(norm) or (
+                len(words) == 2 and words[0] in LEADING_ARTICLES and words[1].startswith(norm)):
+            return True
+    return False
+
+
+def get_title_index(content_type: str = "movies") -> dict:
+    """
+    Devuelve el índice de 'movies' o 'series', construyéndolo la primera vez.
+    """
+    with _index_lock:
+        if content_type not in _indexes:
+            with timed(f"title_index.build_{content_type}"):
+                records = load_series_titles() if content_type == "series" else load_movie_titles()
+                _indexes[content_type] = build_title_index(records)
+        return _indexes[content_type]
+
+
+def title_index_ready(content_type: str = "movies") -> bool:
+    """
+    Indica si el índice ya está construido (buscar en él no bloqueará).
+    """
+    return content_type in _indexes
+
+
+def warm_title_indexes() -> threading.Thread:
+    """
+    Construye ambos índices en un hilo en segundo plano para que la primera
+    búsqueda del usuario no espere a la carga de los catálogos.
+    """
+    def build():
+        for content_type in ("movies", "series"):
+            try:
+                get_title_index(content_type)
+            except Exception:
+                pass  # la búsqueda recurrirá a TMDB
+    thread = threading.Thread(target=build, daemon=True)
+    thread.start()
+    return thread
+
+
+def _result(title_key: str, date_key: str, item_id, title, popularity, year) -> dict:
+    result = {"id": item_id, title_key: title, "popularity": popularity}
+    if year is not None:
+        result[date_key] = str(year)  # solo el año: es lo que guarda el índice
+    return result
+
+
+def search_local_movies(query: str, limit: int = 10) -> list:
+    """
+    Busca películas en el índice local.
+
+    Devuelve:
+    - List[dict] con la forma de los resultados de TMDB ("id", "title",
+      "popularity" y, si se conoce el año, "release_date").
+    """
+    with timed("title_index.search"):
+        hits = search_title_index(get_title_index("movies"), query, limit)
+    incr("title_index.hit" if hits else "title_index.miss")
+    return [_result("title", "release_date", *hit) for hit in hits]
+
+
+def search_local_series(query: str, limit: int = 10) -> list:
+    """
+    Busca series en el índice local.
+
+    Devuelve:
+    - List[dict] con la forma de los resultados de TMDB ("id", "name",
+      "popularity" y, si se conoce el año, "first_air_date").
+    """
+    with timed("title_index.search"):
+        hits = search_title_index(get_title_index("series"), query, limit)
+    incr("title_index.hit" if hits else "title_index.miss")
+    return [_result("name", "first_air_date", *hit) for hit in hits]
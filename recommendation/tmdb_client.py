@@ -8,7 +8,10 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from .config import TMDB_API_KEY
-from recommendation.config import TMDB_API_KEY
+from recommendation.config import TMDB_API_KEY, TMDB_BASE_URL
+from recommendation.fixtures import record_search, replay_search
+from recommendation.metrics import incr, timed
+from recommendation.search_cache import new_search_cache, cache_lookup, cache_store
 
 # Configuramos una sesión compartida con política de reintentos para llamadas a la API de TMDB
 _movie_session = requests.Session()
@@ -25,6 +28,9 @@ _movie_session.mount("http://", _movie_adapter)
 # Caché en memoria para los detalles de las películas
 _movie_details_cache = {}
 
+# Caché LRU de búsquedas por título (misma consulta normalizada)
+_movie_search_cache = new_search_cache()
+
 
 def get_movie_details(movie_id: int):
     """
@@ -40,28 +46,34 @@ def get_movie_details(movie_id: int):
     - None en caso de error o timeout.
     """
     if movie_id in _movie_details_cache:
+        incr("tmdb.movie_cache_hit")
         return _movie_details_cache[movie_id]
+    incr("tmdb.movie_cache_miss")
 
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?language=en-US"
+    url = f"{TMDB_BASE_URL}/movie/{movie_id}?language=en-US"
     headers = {
         "accept": "application/json",
         "Authorization": TMDB_API_KEY
     }
 
     try:
-        resp = _movie_session.get(url, headers=headers, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
+        with timed("tmdb.movie_details"):
+            resp = _movie_session.get(url, headers=headers, timeout=5)
+            resp.raise_for_status()
+            data = resp.json()
         _movie_details_cache[movie_id] = data
         return data
     except requests.RequestException:
+        incr("tmdb.movie_details_error")
         return None
 
 
 def search_movie_by_title(query: str):
     """
     Busca películas por título en TMDB:
-    - Usa la sesión con reintentos y timeout.
+    - Responde desde la caché de búsquedas si la misma consulta ya se hizo.
+    - Si hay un corpus de fixtures cargado con esa búsqueda, la reproduce.
+    - Usa la sesión con reintentos y timeout; la consulta se codifica en la URL.
 
     Parámetros:
     - query: str, término de búsqueda.
@@ -70,15 +82,35 @@ def search_movie_by_title(query: str):
     - List[dict] con las películas encontradas.
     - Lista vacía en caso de error.
     """
-    url = f"https://api.themoviedb.org/3/search/movie?query={query}&language=en-US&page=1"
+    cached = cache_lookup(_movie_search_cache, query)
+    if cached is not None:
+        incr("tmdb.search_movie_cache_hit")
+        return cached
+    incr("tmdb.search_movie_cache_miss")
+
+    # Búsqueda grabada en un corpus de fixtures cargado (sin red)
+    replayed = replay_search("movie", query)
+    if replayed is not None:
+        incr("tmdb.search_movie_replay")
+        cache_store(_movie_search_cache, query, replayed)
+        return replayed
+
+    url = f"{TMDB_BASE_URL}/search/movie"
+    params = {"query": query, "language": "en-US", "page": 1}
     headers = {
         "accept": "application/json",
         "Authorization": TMDB_API_KEY
     }
 
     try:
-        resp = _movie_session.get(url, headers=headers, timeout=5)
-        resp.raise_for_status()
-        return resp.json().get("results", [])
+        with timed("tmdb.search_movie"):
+            resp = _movie_session.get(url, params=params, headers=headers, timeout=5)
+            resp.raise_for_status()
+            data = resp.json()
+            results = data.get("results", [])
+        cache_store(_movie_search_cache, query, results)
+        record_search("movie", query, results)
+        return results
     except requests.RequestException:
+        incr("tmdb.search_movie_error")
         return []
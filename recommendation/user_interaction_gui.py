@@ -5,8 +5,112 @@ from tkinter import ttk, messagebox
 import tkinter as tk
 from recommendation.tmdb_client import search_movie_by_title
 from recommendation.series_client import search_series_by_title
+from recommendation.title_index import search_local_movies, search_local_series, has_strong_match
+from recommendation.tasks import submit_task, cancel_task, check_cancelled
 from recommendation.config import REFERENCE_MOVIES, REFERENCE_SERIES
 
+# Espera tras la última tecla antes de lanzar la búsqueda incremental (ms)
+SEARCH_DEBOUNCE_MS = 250
+# Longitud mínima de la consulta para buscar mientras se escribe
+SEARCH_MIN_CHARS = 2
+
+# ---------------- Búsqueda incremental de títulos ----------------
+
+def _bind_title_search(window, entry, name_var, results_listbox, local_search, remote_search,
+                       format_result, empty_message):
+    """
+    Conecta a un diálogo la búsqueda de títulos mientras se escribe.
+
+    Cada pulsación reprograma la búsqueda (debounce con window.after).
+    Cada búsqueda es una tarea del pool compartido (ver tasks.py) y lanzar
+    una nueva cancela la anterior: sus resultados se descartan y, si aún
+    no había llegado a TMDB, ya no lo consulta. Los resultados vuelven al
+    hilo de Tk mediante window.after.
+
+    El índice local responde primero. Si ninguno de sus resultados es una
+    coincidencia fuerte (has_strong_match), se consulta también TMDB y sus
+    resultados van delante de los locales.
+
+    Parámetros:
+    - window, entry, name_var, results_listbox: widgets del diálogo.
+    - local_search / remote_search: funciones query -> List[dict].
+    - format_result: dict -> texto a mostrar en la lista.
+    - empty_message: error si se pulsa "Buscar" con el campo vacío.
+
+    Devuelve:
+    - función search() para el botón "Buscar" y la tecla Enter.
+    """
+    state = {"after_id": None, "task": None}
+    results_listbox.results = []
+
+    def show_results(task, results, explicit):
+        if task is not state["task"] or not window.winfo_exists():
+            return  # superada por una búsqueda posterior
+        results_listbox.delete(0, tk.END)
+        results_listbox.results = results[:10]
+        if not results:
+            if explicit:
+                messagebox.showerror("Error", "No se han encontrado resultados", parent=window)
+            else:
+                results_listbox.insert(tk.END, "Sin resultados")
+            return
+        for idx, r in enumerate(results[:10], 1):
+            results_listbox.insert(tk.END, f"{idx}. {format_result(r)}")
+        results_listbox.selection_set(0)
+        if explicit:
+            results_listbox.focus_set()
+
+    def job(token, report, query):
+        try:
+            results = local_search(query)
+        except Exception:
+            results = []  # índice no disponible
+        if not has_strong_match(results, query):
+            check_cancelled(token)
+            remote = remote_search(query)
+            seen = {r.get("id") for r in remote}
+            results = remote + [r for r in results if r.get("id") not in seen]
+        return results
+
+    def start(explicit):
+        state["after_id"] = None
+        query = name_var.get().strip()
+        if not query and explicit:
+            messagebox.showerror("Error", empty_message, parent=window)
+            return
+        if len(query) < SEARCH_MIN_CHARS and not explicit:
+            return
+        cancel_task(state["task"])
+        results_listbox.delete(0, tk.END)
+        results_listbox.insert(tk.END, "Buscando...")
+        results_listbox.results = []
+        task = submit_task(
+            ("search", local_search.__name__, query), job, query,
+            on_done=lambda results: show_results(task, results, explicit),
+            dispatch=lambda fn, *args: window.after(0, fn, *args)
+        )
+        state["task"] = task
+
+    def cancel_pending():
+        if state["after_id"] is not None:
+            window.after_cancel(state["after_id"])
+            state["after_id"] = None
+
+    def on_key(event):
+        if event.keysym in ("Return", "KP_Enter", "Tab", "Up", "Down", "Left", "Right",
+                            "Shift_L", "Shift_R", "Control_L", "Control_R"):
+            return
+        cancel_pending()
+        state["after_id"] = window.after(SEARCH_DEBOUNCE_MS, start, False)
+
+    def search():
+        cancel_pending()
+        start(True)
+
+    entry.bind("<KeyRelease>", on_key)
+    entry.bind("<Destroy>", lambda event: cancel_task(state["task"]), add="+")
+    return search
+
 # ---------------- Funciones de interacción de películas ----------------
 
 def rate_movie(movie_id: int, title: str, user_ratings: dict, parent, callback):
@@ -77,26 +181,10 @@ def add_movie_manually(user_ratings: dict, REFERENCE_MOVIES_CUSTOM: dict, parent
     results_listbox = tk.Listbox(results_frame, font=("Arial", 12), height=10, selectmode=tk.SINGLE, exportselection=False)
     results_listbox.pack(pady=10, padx=10, fill="both", expand=True)
 
-    def search():
-        """
-        Realiza la búsqueda en TMDB y muestra resultados en la lista.
-        """
-        results_listbox.delete(0, tk.END)
-        title = name_var.get().strip()
-        if not title:
-            messagebox.showerror("Error", "Por favor introduce el nombre de la película", parent=window)
-            return
-        results = search_movie_by_title(title)
-        if not results:
-            messagebox.showerror("Error", "No se han encontrado resultados", parent=window)
-            return
-        for idx, m in enumerate(results[:10], 1):
-            results_listbox.insert(tk.END, f"{idx}. {m.get('title', 'Unknown')} ({m.get('release_date', '¿?')})")
-        results_listbox.results = results
-        results_listbox.focus_set()
-        if results:
-            results_listbox.selection_set(0)
-        print("Buscar resultados:", results)
+    search = _bind_title_search(
+        window, entry, name_var, results_listbox, search_local_movies, search_movie_by_title,
+        lambda m: f"{m.get('title', 'Unknown')} ({m.get('release_date', '¿?')})",
+        "Por favor introduce el nombre de la película")
 
     def select(event=None):
         try:
@@ -228,23 +316,10 @@ def add_series_manually(series_ratings: dict, REFERENCE_SERIES_CUSTOM: dict, par
     results_listbox = tk.Listbox(results_frame, font=("Arial", 12), height=10, selectmode=tk.SINGLE, exportselection=False)
     results_listbox.pack(pady=10, padx=10, fill="both", expand=True)
 
-    def search():
-        results_listbox.delete(0, tk.END)
-        title = name_var.get().strip()
-        if not title:
-            messagebox.showerror("Error", "Por favor, introduce el nombre de la serie", parent=window)
-            return
-        results = search_series_by_title(title)
-        if not results:
-            messagebox.showerror("Error", "No se han encontrado resultados", parent=window)
-            return
-        for idx, s in enumerate(results[:10], 1):
-            results_listbox.insert(tk.END, f"{idx}. {s.get('name', 'Unknown')} ({s.get('first_air_date', '¿?')})")
-        results_listbox.results = results
-        results_listbox.focus_set()
-        if results:
-            results_listbox.selection_set(0)
-        print("Buscando resultados:", results)
+    search = _bind_title_search(
+        window, entry, name_var, results_listbox, search_local_series, search_series_by_title,
+        lambda r: f"{r.get('name', 'Unknown')} ({r.get('first_air_date', '¿?')})",
+        "Por favor, introduce el nombre de la serie")
 
     def select(event=None):
         try:
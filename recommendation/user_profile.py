@@ -3,12 +3,18 @@
 import numpy as np
 from recommendation.tmdb_client import get_movie_details
 from recommendation.series_client import get_series_details
-from recommendation.feature_engineering import build_feature_vector
-
-def build_user_profile(user_ratings, tfidf, PLATFORMS):
+from recommendation.feature_engineering import build_feature_vector, feature_dtype
+from recommendation.franchise import collection_dim
+from recommendation.genre_inference import details_genres
+from recommendation.overview_svd import overview_dim
+from recommendation.metrics import instrumented
+
+@instrumented("profile.build_movies")
+def build_user_profile(user_ratings, tfidf, PLATFORMS, weights=None):
     """
-    Construye el perfil de usuario para PELÍCULAS,
-    sin usar collection_matrix.
+    Construye el perfil de usuario para PELÍCULAS
+    (la franquicia sale de collection_matrix, ver franchise.py).
+    weights: pesos por bloque (por defecto WEIGHTS).
     """
     all_genres, all_countries, all_companies, all_languages = set(), set(), set(), set()
     cache = {}
@@ -17,7 +23,7 @@ def build_user_profile(user_ratings, tfidf, PLATFORMS):
         det = get_movie_details(mid)
         if not det: continue
         cache[mid] = det
-        for g in det.get('genres', []): all_genres.add(g.get('name'))
+        for name in details_genres(det): all_genres.add(name)
         for c in det.get('origin_country', []): all_countries.add(c)
         for pc in det.get('production_companies', []):
             if pc.get('name'): all_companies.add(pc['name'])
@@ -29,10 +35,11 @@ def build_user_profile(user_ratings, tfidf, PLATFORMS):
 
     dim = (
         len(all_genres)
-        + tfidf.get_feature_names_out().shape[0]
+        + overview_dim(tfidf)   # TF-IDF o proyección LSA
         + len(PLATFORMS)
         + 1   # año
         + 1   # belongs_to_collection
+        + collection_dim()   # franquicia
         + len(all_countries)
         + len(all_companies)
         + 1   # popularidad
@@ -43,7 +50,7 @@ def build_user_profile(user_ratings, tfidf, PLATFORMS):
         + 1   # episodios
     )
 
-    profile = np.zeros(dim)
+    profile = np.zeros(dim, dtype=feature_dtype())
     weight_sum = 0.0
 
     for mid, rating in user_ratings.items():
@@ -51,7 +58,7 @@ def build_user_profile(user_ratings, tfidf, PLATFORMS):
         if not det: continue
         vec = build_feature_vector(
             det, all_genres, all_countries, all_companies, all_languages,
-            tfidf, PLATFORMS
+            tfidf, PLATFORMS, weights
         )
         profile += rating * vec
         weight_sum += rating
@@ -61,7 +68,8 @@ def build_user_profile(user_ratings, tfidf, PLATFORMS):
 
     return profile, all_genres, all_countries, all_companies, all_languages
 
-def build_series_profile(series_ratings, tfidf, PLATFORMS):
+@instrumented("profile.build_series")
+def build_series_profile(series_ratings, tfidf, PLATFORMS, weights=None):
     """
     Igual que build_user_profile, pero para SERIES.
     """
@@ -72,7 +80,7 @@ def build_series_profile(series_ratings, tfidf, PLATFORMS):
         det = get_series_details(sid)
         if not det: continue
         cache[sid] = det
-        for g in det.get('genres', []): all_genres.add(g.get('name'))
+        for name in details_genres(det): all_genres.add(name)
         for c in det.get('origin_country', []): all_countries.add(c)
         for pc in det.get('production_companies', []):
             if pc.get('name'): all_companies.add(pc['name'])
@@ -84,10 +92,11 @@ def build_series_profile(series_ratings, tfidf, PLATFORMS):
 
     dim = (
         len(all_genres)
-        + tfidf.get_feature_names_out().shape[0]
+        + overview_dim(tfidf)   # TF-IDF o proyección LSA
         + len(PLATFORMS)
         + 1   # año
         + 1   # belongs_to_collection
+        + collection_dim()   # franquicia
         + len(all_countries)
         + len(all_companies)
         + 1   # popularidad
@@ -98,7 +107,7 @@ def build_series_profile(series_ratings, tfidf, PLATFORMS):
         + 1   # episodios
     )
 
-    profile = np.zeros(dim)
+    profile = np.zeros(dim, dtype=feature_dtype())
     weight_sum = 0.0
 
     for sid, rating in series_ratings.items():
@@ -106,7 +115,7 @@ def build_series_profile(series_ratings, tfidf, PLATFORMS):
         if not det: continue
         vec = build_feature_vector(
             det, all_genres, all_countries, all_companies, all_languages,
-            tfidf, PLATFORMS
+            tfidf, PLATFORMS, weights
         )
         profile += rating * vec
         weight_sum += rating
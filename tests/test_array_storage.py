@@ -0,0 +1,70 @@
+# tests/test_array_storage.py
+
+"""
+Generaciones de data_utils.save_arrays: publicar con CURRENT (sin enlaces
+simbólicos) y volver a cargar con load_arrays.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from recommendation.data_utils import (
+    CURRENT_FILE, current_generation, load_arrays, remove_arrays, save_arrays
+)
+
+
+@pytest.fixture(autouse=True)
+def no_symlinks(monkeypatch):
+    """Como en Windows sin permisos: crear un enlace simbólico falla."""
+    def refuse(*args, **kwargs):
+        raise OSError("symbolic link privilege not held")
+    monkeypatch.setattr(os, "symlink", refuse)
+
+
+def generations(directory):
+    return sorted(name for name in os.listdir(directory) if name != CURRENT_FILE)
+
+
+def test_publish_and_reload(tmp_path):
+    path = str(tmp_path / "arrays")
+    save_arrays(path, {"a": np.arange(5), "b": np.ones(3)}, meta={"version": 1})
+    loaded = load_arrays(path, ("a", "b"), mmap=True)
+    np.testing.assert_array_equal(loaded["a"], np.arange(5))
+    assert loaded["meta"] == {"version": 1}
+    assert not os.path.islink(path)
+    with open(os.path.join(path, CURRENT_FILE), encoding="ascii") as f:
+        assert os.path.join(path, f.read()) == current_generation(path)
+
+    first = current_generation(path)
+    save_arrays(path, {"a": np.arange(7), "b": np.zeros(3)}, meta={"version": 2})
+    loaded = load_arrays(path, ("a", "b"), mmap=False)
+    np.testing.assert_array_equal(loaded["a"], np.arange(7))
+    assert loaded["meta"] == {"version": 2}
+    # Se conserva la anterior para los lectores en curso; las más antiguas se borran
+    assert generations(path) == sorted([os.path.basename(first), os.path.basename(current_generation(path))])
+    save_arrays(path, {"a": np.arange(9), "b": np.zeros(3)})
+    assert len(generations(path)) == 2
+    assert first not in [os.path.join(path, g) for g in generations(path)]
+    assert "meta" not in load_arrays(path, ("a", "b"))
+
+
+def test_optional_and_missing(tmp_path):
+    path = str(tmp_path / "arrays")
+    assert load_arrays(path, ("a",)) is None
+    save_arrays(path, {"a": np.arange(3)})
+    assert set(load_arrays(path, ("a",), optional=("q",))) == {"a"}
+    assert load_arrays(path, ("a", "q")) is None
+    remove_arrays(path)
+    assert not os.path.exists(path)
+
+
+def test_previous_format_is_read_and_replaced(tmp_path):
+    path = tmp_path / "arrays"
+    path.mkdir()
+    np.save(path / "a.npy", np.arange(4))  # directorio plano, sin CURRENT
+    np.testing.assert_array_equal(load_arrays(str(path), ("a",))["a"], np.arange(4))
+    save_arrays(str(path), {"a": np.arange(6)})
+    assert not (path / "a.npy").exists()
+    np.testing.assert_array_equal(load_arrays(str(path), ("a",))["a"], np.arange(6))
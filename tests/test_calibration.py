@@ -0,0 +1,93 @@
+# tests/test_calibration.py
+
+"""
+Calibración secuencial (calibrate_weights): intervalo de Wilson, parada
+de _simulate_task en cuanto todos los candidatos alcanzan target_width
+(nunca antes de SEQUENTIAL_MIN_USERS) y exactitud estratificada por
+proveedor. Los términos por bloque se sustituyen por un resultado fijo
+para no depender de los artefactos.
+"""
+
+import numpy as np
+import pytest
+
+import calibrate_weights
+from calibrate_weights import (SEQUENTIAL_MIN_USERS, _simulate_task, provider_samples,
+                               stratified_accuracy, wilson_interval)
+
+PLATFORMS = {"Alpha": list(range(100, 160)), "Beta": list(range(200, 240))}
+TASK = {"task": 0, "provider": "Alpha", "start": 0, "stop": 60}
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(8, 10, z=1.96)
+    assert low == pytest.approx(0.4902, abs=1e-4)
+    assert high == pytest.approx(0.9433, abs=1e-4)
+
+    low, high = wilson_interval([0, 10, 5], 10)
+    assert low[0] == 0.0 and high[1] == 1.0
+    assert high[0] > 0 and low[1] < 1  # no se anula con 0 o todos los aciertos
+    assert high[2] - 0.5 == pytest.approx(0.5 - low[2])
+
+    widths = [np.subtract(*wilson_interval(n // 2, n)[::-1]) for n in (10, 40, 160)]
+    assert widths[0] > widths[1] > widths[2]
+    assert wilson_interval([3, 4], 0) == (pytest.approx([0, 0]), pytest.approx([1, 1]))
+
+
+@pytest.fixture
+def always(monkeypatch):
+    """Cada usuario elige `winner` con todos los candidatos."""
+    state = {"winner": "Alpha"}
+    monkeypatch.setattr(calibrate_weights, "user_block_terms", lambda *args: None)
+    monkeypatch.setattr(calibrate_weights, "best_platforms",
+                        lambda terms, P, candidates: dict.fromkeys(candidates, state["winner"]))
+    return state
+
+
+def simulate(users, target_width):
+    candidates = {"genre": {"genre": 1.0}, "overview": {"overview": 1.0}}
+    return _simulate_task(TASK, users, PLATFORMS, None, candidates, target_width=target_width)
+
+
+def test_sequential_stop(always):
+    users = [{}] * 60
+    # Sin objetivo se simulan todos
+    record = simulate(users, None)
+    assert record["total"] == 60 and not record["stopped_early"]
+    assert record["correct"] == {"genre": 60, "overview": 60}
+
+    # Objetivo holgado: para en cuanto se permite, nunca antes del mínimo
+    record = simulate(users, 1.5)
+    assert record["total"] == SEQUENTIAL_MIN_USERS and record["stopped_early"]
+
+    # Para en el primer n cuyo intervalo es más estrecho que el objetivo
+    record = simulate(users, 0.1)
+    first = next(n for n in range(SEQUENTIAL_MIN_USERS, 60)
+                 if np.subtract(*wilson_interval(n, n)[::-1]) < 0.1)
+    assert record["total"] == first and record["stopped_early"]
+
+    # Objetivo inalcanzable con 60 usuarios: no hay parada anticipada
+    always["winner"] = "Beta"
+    record = simulate(users, 1e-3)
+    assert record["total"] == 60 and not record["stopped_early"]
+    assert record["correct"] == {"genre": 0, "overview": 0}
+
+
+def test_stratified_accuracy_weights_planned_users():
+    # Alpha paró pronto (10 usuarios, 9 aciertos); Beta simuló 100 (20 aciertos)
+    accuracy, low, high = stratified_accuracy([[9], [20]], [10, 100], planned=[50, 50])
+    assert accuracy[0] == pytest.approx(0.5 * 0.9 + 0.5 * 0.2)
+    assert low[0] < accuracy[0] < high[0]
+    pooled = 29 / 110
+    assert abs(accuracy[0] - pooled) > 0.2  # no se ponderan por los usuarios simulados
+
+
+def test_provider_samples_are_seeded():
+    first = provider_samples(PLATFORMS, ["Alpha", "Beta"], 20, seed=5)
+    assert first == provider_samples(PLATFORMS, ["Alpha", "Beta"], 20, seed=5)
+    assert first != provider_samples(PLATFORMS, ["Alpha", "Beta"], 20, seed=6)
+    # El proveedor no depende de qué otros se muestreen
+    assert provider_samples(PLATFORMS, ["Beta"], 20, seed=5)["Beta"] == first["Beta"]
+    for ratings in first["Alpha"]:
+        liked = [i for i, r in ratings.items() if r == 5.0]
+        assert len(liked) == 10 and all(i in PLATFORMS["Alpha"] for i in liked)
@@ -0,0 +1,114 @@
+# tests/test_catalog_store.py
+
+"""
+data_utils.CatalogStore frente a build_feature_vector: los bloques
+numéricos y categóricos del almacén, y las filas que vectorize_shard
+construye con él, deben coincidir con el vector de cada título.
+"""
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from benchmark import synthetic_details
+from recommendation import catalog, tmdb_client
+from recommendation.catalog import BLOCKS, GLOBAL, UNIT_WEIGHTS, block_layout
+from recommendation.config import WEIGHTS
+from recommendation.data_utils import CATALOG_STORE_NUMERIC, CatalogStore
+from recommendation.feature_engineering import build_feature_vector, feature_dtype, set_feature_dtype
+from recommendation.franchise import collection_dim
+from recommendation.nlp_utils import clean_overview
+
+IDS = list(range(2000, 2030))
+PLATFORMS = {"Alpha": IDS[:20], "Beta": IDS[10:]}
+
+
+@pytest.fixture
+def float64():
+    original = feature_dtype()
+    set_feature_dtype("float64")
+    yield
+    set_feature_dtype(original)
+
+
+@pytest.fixture(scope="module")
+def details():
+    items = {i: synthetic_details(i) for i in IDS}
+    items[IDS[0]]["release_date"] = ""          # sin año
+    items[IDS[1]]["genres"] = []                # sin géneros en TMDB
+    items[IDS[2]]["genres"] = [{"name": "Drama"}, {"name": "Drama"}]
+    return items
+
+
+@pytest.fixture(scope="module")
+def tfidf(details):
+    return TfidfVectorizer().fit([clean_overview(d["overview"]) for d in details.values()])
+
+
+def vocabularies(store):
+    return {"genre": store.vocab["genre"], "country": store.vocab["country"],
+            "company": store.vocab["company"], "orig_lang": store.vocab["orig_lang"],
+            "availability": [], "franchise": ["c"] * collection_dim()}
+
+
+def reference(det, vocab, tfidf, weights):
+    return build_feature_vector(det, vocab["genre"], vocab["country"], vocab["company"],
+                                vocab["orig_lang"], tfidf, {}, weights)
+
+
+def test_blocks_match_feature_vector(details, tfidf, float64):
+    store = CatalogStore.from_items(details.items(), PLATFORMS)
+    vocab = vocabularies(store)
+    layout, _ = block_layout(vocab, len(tfidf.vocabulary_))
+    numeric = store.numeric_block()
+    for r, item_id in enumerate(store.records["id"]):
+        vec = reference(details[int(item_id)], vocab, tfidf, WEIGHTS)
+        for k, block in enumerate(CATALOG_STORE_NUMERIC):
+            b0, _ = layout[block]
+            assert numeric[r, k] == vec[b0]
+        for block in ("genre", "country", "company", "orig_lang"):
+            b0, b1 = layout[block]
+            row = store.categorical_block(block, vocab[block], [r]).toarray()[0]
+            np.testing.assert_array_equal(row * WEIGHTS[block], vec[b0:b1])
+
+
+def test_vectorize_shard_matches_feature_vector(details, tfidf, float64, monkeypatch):
+    monkeypatch.setitem(catalog._worker, "content_type", "movies")
+    monkeypatch.setitem(catalog._worker, "tfidf", tfidf)
+    monkeypatch.setattr(tmdb_client, "_movie_details_cache", dict(details))
+    chunk = catalog.vectorize_shard(IDS + [999999999])
+    assert chunk["ids"] == IDS
+    assert chunk["missing"] == [999999999]
+    assert chunk["no_genre"] == [IDS[1]]
+    assert chunk["years"] == {i: int(details[i]["release_date"][:4]) for i in IDS[1:]}
+
+    n_terms = len(tfidf.vocabulary_)
+    shard_layout, _ = block_layout(chunk["vocab"], n_terms)
+    ref_vocab = dict(chunk["vocab"], franchise=["c"] * collection_dim())
+    ref_layout, _ = block_layout(ref_vocab, n_terms)
+    matrix = chunk["matrix"].toarray()
+    for r, item_id in enumerate(chunk["ids"]):
+        vec = reference(details[item_id], ref_vocab, tfidf, UNIT_WEIGHTS)
+        for block in BLOCKS:
+            if block in GLOBAL:
+                continue
+            s0, s1 = shard_layout[block]
+            b0, b1 = ref_layout[block]
+            np.testing.assert_array_equal(matrix[r, s0:s1], vec[b0:b1])
+
+
+def test_filter_and_round_trip(details, tmp_path):
+    store = CatalogStore.from_items(details.items(), PLATFORMS)
+    rows = store.filter(platforms=["Beta"], min_vote=5.0, years=(1950, 2020))
+    expected = [r for r, i in enumerate(store.records["id"])
+                if int(i) in PLATFORMS["Beta"] and details[int(i)]["vote_average"] >= 5.0
+                and details[int(i)]["release_date"]
+                and 1950 <= int(details[int(i)]["release_date"][:4]) <= 2020]
+    assert rows.tolist() == expected
+
+    path = str(tmp_path / "store.npz")
+    store.save(path)
+    loaded = CatalogStore.load(path)
+    assert loaded.records.tobytes() == store.records.tobytes()
+    assert loaded.vocab == store.vocab
+    assert loaded.filter(platforms=["Beta"], min_vote=5.0, years=(1950, 2020)).tolist() == expected
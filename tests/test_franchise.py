@@ -0,0 +1,98 @@
+# tests/test_franchise.py
+
+"""
+Bloque de franquicia con un índice de colecciones no vacío: filas de
+franchise.py y su peso propio ("franchise") en build_feature_vector y en
+el catálogo vectorizado.
+"""
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from benchmark import synthetic_details
+from recommendation import franchise
+from recommendation.catalog import BLOCKS, UNIT_WEIGHTS, block_layout, block_weights
+from recommendation.config import WEIGHTS
+from recommendation.feature_engineering import build_feature_vector, feature_dtype, set_feature_dtype
+from recommendation.nlp_utils import clean_overview
+
+# Películas 1-2 en la saga 10, 3 en la 20 y 4 sin colección
+COLLECTIONS = {1: 10, 2: 10, 3: 20, 4: None}
+
+
+@pytest.fixture
+def details():
+    items = {}
+    for movie_id, collection in COLLECTIONS.items():
+        det = synthetic_details(movie_id)
+        det["belongs_to_collection"] = {"id": collection} if collection else None
+        items[movie_id] = det
+    return items
+
+
+@pytest.fixture
+def index(details, tmp_path, monkeypatch):
+    monkeypatch.setattr(franchise, "_index", None)  # se restaura al terminar
+    matrix, binarizer, movie_ids = franchise.build_collection_index(details, details.get, max_workers=2)
+    franchise.save_collection_index(matrix, binarizer, movie_ids, str(tmp_path))
+    return franchise.load_collection_index()
+
+
+@pytest.fixture
+def float64():
+    original = feature_dtype()
+    set_feature_dtype("float64")
+    yield
+    set_feature_dtype(original)
+
+
+def test_collection_index_rows(index):
+    assert index["matrix"].shape == (3, 2)
+    assert index["classes"] == [10, 20]
+    assert franchise.collection_dim() == 2
+    np.testing.assert_array_equal(franchise.collection_vector(1), [1.0, 0.0])
+    np.testing.assert_array_equal(franchise.collection_vector(3), [0.0, 1.0])
+    np.testing.assert_array_equal(franchise.collection_vector(4), [0.0, 0.0])
+    rows = franchise.collection_rows([4, 2, 3, 99]).toarray()
+    np.testing.assert_array_equal(rows, [[0, 0], [1, 0], [0, 1], [0, 0]])
+
+
+def test_franchise_block_uses_its_own_weight(index, details, float64):
+    tfidf = TfidfVectorizer().fit([clean_overview(d["overview"]) for d in details.values()])
+    vocab = {"genre": ["Action", "Drama"], "country": ["US"], "company": [], "orig_lang": ["en"],
+             "availability": [], "franchise": index["classes"]}
+    layout, dim = block_layout(vocab, len(tfidf.vocabulary_))
+    f0, f1 = layout["franchise"]
+    c0, _ = layout["collection"]
+
+    def vector(movie_id, weights):
+        vec = build_feature_vector(details[movie_id], vocab["genre"], vocab["country"], vocab["company"],
+                                   vocab["orig_lang"], tfidf, {}, weights)
+        assert vec.shape == (dim,)
+        return vec
+
+    weights = dict(WEIGHTS, franchise=0.5, collection=0.25)
+    np.testing.assert_array_equal(vector(1, weights)[f0:f1], [0.5, 0.0])
+    np.testing.assert_array_equal(vector(3, weights)[f0:f1], [0.0, 0.5])
+    np.testing.assert_array_equal(vector(4, weights)[f0:f1], [0.0, 0.0])
+    assert vector(1, weights)[c0] == 0.25
+
+    # Sin peso de franquicia el bloque se anula y el resto no cambia
+    without = dict(weights, franchise=0.0)
+    a, b = vector(1, weights), vector(1, without)
+    np.testing.assert_array_equal(b[f0:f1], [0.0, 0.0])
+    np.testing.assert_array_equal(np.delete(a, np.arange(f0, f1)), np.delete(b, np.arange(f0, f1)))
+
+    # Misma saga: más parecidas con el bloque de franquicia que sin él
+    def cosine(x, y):
+        return x @ y / (np.linalg.norm(x) * np.linalg.norm(y))
+    assert cosine(vector(1, weights), vector(2, weights)) > cosine(vector(1, without), vector(2, without))
+
+
+def test_block_weights_include_franchise():
+    assert "franchise" in WEIGHTS
+    assert UNIT_WEIGHTS["franchise"] == 1.0
+    weights = block_weights(dict(WEIGHTS, franchise=0.3, collection=0.1))
+    assert weights[BLOCKS.index("franchise")] == 0.3
+    assert weights[BLOCKS.index("collection")] == 0.1
@@ -0,0 +1,98 @@
+# tests/test_precision.py
+
+"""
+Precisión de la puntuación con el catálogo vectorizado.
+
+Se construyen catálogos pequeños con detalles sintéticos
+(benchmark.synthetic_details) en float64, float32 y float32 con el bloque
+TF-IDF cuantizado en int8, por el mismo camino que en producción
+(build_catalog -> save_catalog -> catalog_scores), y se comparan con
+calculate_affinity en float64 sin catálogo.
+"""
+
+import os
+
+import pytest
+
+from benchmark import PRECISION_TOLERANCE, synthetic_details
+from recommendation import catalog, tmdb_client
+from recommendation.catalog import build_catalog, catalog_scores, load_catalog
+from recommendation.data_utils import load_artifacts
+from recommendation.feature_engineering import feature_dtype, set_feature_dtype
+from recommendation.fixtures import save_fixture_corpus
+from recommendation.recommendation_engine import calculate_affinity
+from recommendation.user_profile import build_user_profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLATFORMS = {
+    "Alpha": list(range(1000, 1040)),
+    "Beta": list(range(1030, 1070)),
+    "Gamma": list(range(1060, 1100)),
+}
+RATINGS = {1001: 5.0, 1004: 4.0, 1035: 5.0, 1062: 2.0, 1090: 1.0}
+
+# Modo: (precisión de los vectores, cuantización del catálogo)
+MODES = {"float64": ("float64", "none"), "float32": ("float32", "none"), "int8": ("float32", "int8")}
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    """
+    Detalles sintéticos en la caché del cliente y en un corpus de fixtures
+    para los procesos de build_catalog.
+    """
+    if not os.path.exists(os.path.join(ROOT, "DATA", "OVERVIEW", "tfidf_vectorizer.pkl")):
+        pytest.skip("faltan los artefactos de DATA/OVERVIEW")
+    ids = {int(i) for members in PLATFORMS.values() for i in members} | set(RATINGS)
+    tmdb_client._movie_details_cache.update({i: synthetic_details(i) for i in ids})
+    path = str(tmp_path_factory.mktemp("fixtures") / "corpus.jsonl.gz")
+    save_fixture_corpus(path)
+    return path
+
+
+@pytest.fixture
+def tfidf(monkeypatch, corpus):
+    monkeypatch.chdir(ROOT)
+    original = feature_dtype()
+    yield load_artifacts()
+    set_feature_dtype(original)
+
+
+def reference_scores(tfidf):
+    set_feature_dtype("float64")
+    scores, _ = calculate_affinity(RATINGS, tfidf, PLATFORMS, use_cache=False,
+                                   use_precomputed=False)
+    return scores
+
+
+def mode_scores(mode, tfidf, base_dir, corpus, monkeypatch):
+    dtype, quantization = MODES[mode]
+    set_feature_dtype(dtype)
+    monkeypatch.setattr(catalog, "OVERVIEW_QUANTIZATION", quantization)
+    path, _ = build_catalog("movies", PLATFORMS, tfidf, base_dir=str(base_dir), workers=2,
+                            fixtures=corpus)
+    built = load_catalog(path)
+    assert built["quantization"] == quantization
+    assert ("overview_q" in built) == (quantization == "int8")
+    parts = build_user_profile(RATINGS, tfidf, PLATFORMS)
+    return catalog_scores("movies", parts, tfidf, PLATFORMS, base_dir=str(base_dir))
+
+
+def max_error(scores, reference):
+    assert scores is not None
+    assert set(scores) == set(reference)
+    return max(abs(scores[p] - reference[p]) for p in reference)
+
+
+def test_float64_catalog_matches_engine(tfidf, tmp_path, corpus, monkeypatch):
+    reference = reference_scores(tfidf)
+    scores = mode_scores("float64", tfidf, tmp_path, corpus, monkeypatch)
+    assert max_error(scores, reference) <= 1e-9
+
+
+@pytest.mark.parametrize("mode", sorted(PRECISION_TOLERANCE))
+def test_reduced_precision_within_tolerance(mode, tfidf, tmp_path, corpus, monkeypatch):
+    reference = reference_scores(tfidf)
+    scores = mode_scores(mode, tfidf, tmp_path, corpus, monkeypatch)
+    assert max_error(scores, reference) <= PRECISION_TOLERANCE[mode]
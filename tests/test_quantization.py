@@ -0,0 +1,62 @@
+# tests/test_quantization.py
+
+"""
+Cuantización int8 por fila del bloque TF-IDF del catálogo
+(catalog.quantize_rows / dequantize_rows): error de ida y vuelta acotado
+por media escala de la fila.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+from recommendation.catalog import dequantize_rows, quantize_rows
+
+
+def random_rows(seed=0, shape=(40, 300), density=0.05):
+    matrix = sp.random(*shape, density=density, format="csr", random_state=seed)
+    matrix.data = matrix.data * np.random.default_rng(seed).choice([-3.0, 1.0, 0.01], matrix.nnz)
+    return matrix
+
+
+def test_round_trip_error_bound():
+    matrix = random_rows()
+    q, scale = quantize_rows(matrix)
+    assert q.dtype == np.int8 and scale.dtype == np.float32
+    assert q.shape == matrix.shape and scale.shape == (matrix.shape[0],)
+
+    dense = matrix.toarray()
+    restored = dequantize_rows(q, scale, np.float64).toarray()
+    peak = np.abs(dense).max(axis=1)
+    np.testing.assert_allclose(scale, peak / 127, rtol=1e-6)
+    # Redondeo a entero: como mucho media escala por valor (más el redondeo de la escala a float32)
+    bound = scale.astype(np.float64)[:, None] * 0.5 + peak[:, None] * 1e-6
+    assert np.all(np.abs(restored - dense) <= bound)
+    # El mayor valor de cada fila se conserva como ±127
+    for r in range(matrix.shape[0]):
+        row = q.getrow(r).toarray().ravel()
+        if peak[r] > 0:
+            assert np.abs(row).max() == 127
+
+
+def test_dot_products_within_tolerance():
+    matrix = random_rows(seed=1)
+    q, scale = quantize_rows(matrix)
+    profile = np.random.default_rng(2).random(matrix.shape[1])
+    exact = matrix @ profile
+    approx = scale * (q @ profile)
+    # |Σ e_j p_j| <= (escala / 2) · Σ |p_j| sobre las columnas no nulas de la fila
+    support = (matrix != 0).astype(np.float64) @ np.abs(profile)
+    assert np.all(np.abs(approx - exact) <= scale.astype(np.float64) * 0.5 * support * (1 + 1e-5))
+
+
+def test_empty_rows_and_matrix():
+    matrix = sp.csr_matrix(np.array([[0.0, 0.0, 0.0], [0.0, -2.0, 1.0]]))
+    q, scale = quantize_rows(matrix)
+    assert scale[0] == 0 and q.getrow(0).nnz == 0
+    np.testing.assert_array_equal(q.toarray(), [[0, 0, 0], [0, -127, 64]])
+    np.testing.assert_allclose(dequantize_rows(q, scale, np.float64).toarray(),
+                               [[0, 0, 0], [0, -2.0, 64 * 2 / 127]], atol=1e-6)
+
+    q, scale = quantize_rows(sp.csr_matrix((3, 5)))
+    assert q.nnz == 0 and not scale.any()
+    assert dequantize_rows(q, scale).shape == (3, 5)
@@ -0,0 +1,50 @@
+# tests/test_result_cache.py
+
+"""
+Caché de resultados del motor: versión del catálogo por contenido y qué
+resultados del cálculo progresivo se guardan.
+"""
+
+import uuid
+
+from recommendation.recommendation_engine import _memoized_updates
+from recommendation.result_cache import catalog_version, get_cached_result
+
+
+def test_catalog_version_follows_contents():
+    platforms = {"Alpha": [1, 2, 3], "Beta": [4, 5]}
+    version = catalog_version(platforms)
+    assert catalog_version({"Beta": [5, 4], "Alpha": (3, 1, 2)}) == version
+    platforms["Alpha"][1] = 7  # mismo objeto y misma longitud
+    assert catalog_version(platforms) != version
+    platforms["Alpha"][1] = 2
+    assert catalog_version(platforms) == version
+    assert catalog_version({"Alpha": {1, 2, 3}, "Beta": [4, 5]}) == version
+
+
+def estimates(n, total):
+    return {"Alpha": {"score": 0.5, "error": 0.0 if n >= total else 0.1, "n": n, "total": total}}
+
+
+def run(key, seeded, updates):
+    return list(_memoized_updates(key, lambda: iter(updates), seeded))
+
+
+def test_unseeded_early_stop_is_not_stored():
+    key = uuid.uuid4().hex
+    run(key, False, [(estimates(8, 100), False), (estimates(16, 100), True)])
+    assert get_cached_result(key) is None
+
+
+def test_exact_or_seeded_results_are_stored():
+    exact, seeded = uuid.uuid4().hex, uuid.uuid4().hex
+    run(exact, False, [(estimates(8, 100), False), (estimates(100, 100), True)])
+    assert get_cached_result(exact) == estimates(100, 100)
+    run(seeded, True, [(estimates(16, 100), True)])
+    assert run(seeded, True, []) == [(estimates(16, 100), True)]
+
+
+def test_cancelled_run_is_not_stored():
+    key = uuid.uuid4().hex
+    run(key, True, [(estimates(8, 100), False)])
+    assert get_cached_result(key) is None
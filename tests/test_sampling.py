@@ -0,0 +1,63 @@
+# tests/test_sampling.py
+
+"""
+Muestreo estratificado del modo aproximado (recommendation_engine): con
+una semilla fija el orden y la estimación son reproducibles, y cualquier
+prefijo del orden reparte la muestra en proporción a cada estrato.
+"""
+
+import numpy as np
+import pytest
+
+from recommendation.recommendation_engine import APPROX_STRATA, _platform_mean, _stratified_order
+
+IDS = list(range(5000, 5997, 3))  # 333 IDs
+
+
+def strata_of(ids):
+    ordered = sorted(ids)
+    return [ordered[h * len(ordered) // APPROX_STRATA:(h + 1) * len(ordered) // APPROX_STRATA]
+            for h in range(APPROX_STRATA)]
+
+
+def test_order_is_seeded_permutation():
+    order = _stratified_order(IDS, seed=7, key="Alpha:movie")
+    assert sorted(order) == sorted(IDS)
+    assert order == _stratified_order(list(reversed(IDS)), seed=7, key="Alpha:movie")
+    assert order != _stratified_order(IDS, seed=8, key="Alpha:movie")
+    assert order != _stratified_order(IDS, seed=7, key="Beta:movie")
+
+
+def test_prefixes_are_proportional():
+    order = _stratified_order(IDS, seed=3, key="Alpha:movie")
+    strata = [set(s) for s in strata_of(IDS)]
+    for m in (10, 37, 100, 250):
+        prefix = order[:m]
+        for stratum in strata:
+            expected = m * len(stratum) / len(IDS)
+            assert abs(sum(i in stratum for i in prefix) - expected) <= 2
+
+
+def test_platform_mean_reproducible_with_seed():
+    # Similitud creciente con el ID: los estratos importan para la media
+    def sim(item_id):
+        return (item_id - IDS[0]) / (IDS[-1] - IDS[0])
+    calls = []
+
+    def counted(item_id):
+        calls.append(item_id)
+        return sim(item_id)
+
+    exact = float(np.mean([sim(i) for i in IDS]))
+    first = _platform_mean(IDS, counted, sample_size=50, seed=11, key="Alpha:movie")
+    assert len(calls) == 50
+    assert first == _platform_mean(IDS, sim, sample_size=50, seed=11, key="Alpha:movie")
+    mean, half = first
+    assert abs(mean - exact) <= half
+    assert abs(mean - exact) < 0.02  # asignación proporcional: casi sin error de estrato
+
+    mean, half = _platform_mean(IDS, sim, target_error=0.01, seed=11, key="Alpha:movie")
+    assert half <= 0.01 and abs(mean - exact) <= 0.01
+    # Muestra del catálogo completo: la media exacta, sin error
+    mean, half = _platform_mean(IDS, sim, sample_size=len(IDS), seed=11, key="Alpha:movie")
+    assert half == 0.0 and mean == pytest.approx(exact)
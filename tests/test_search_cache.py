@@ -0,0 +1,62 @@
+# tests/test_search_cache.py
+
+"""
+Caché de búsquedas de tmdb_client: solo se reutiliza la misma consulta.
+Una consulta más larga vuelve a TMDB aunque su prefijo esté en caché,
+porque TMDB también encuentra títulos alternativos que el resultado no trae.
+"""
+
+import pytest
+
+from recommendation import tmdb_client
+from recommendation.search_cache import cache_lookup, cache_store, new_search_cache
+
+
+class FakeResponse:
+    def __init__(self, results):
+        self.results = results
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"results": self.results, "total_results": len(self.results)}
+
+
+@pytest.fixture
+def tmdb(monkeypatch):
+    # "La casa de papel" se encuentra por su título en inglés, que no viene en el resultado
+    responses = {
+        "money": [{"id": 1, "title": "Money Monster", "original_title": "Money Monster"}],
+        "money heist": [{"id": 2, "title": "La casa de papel", "original_title": "La casa de papel"}],
+    }
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        calls.append(params["query"])
+        return FakeResponse(responses.get(" ".join(params["query"].lower().split()), []))
+
+    monkeypatch.setattr(tmdb_client, "_movie_search_cache", new_search_cache())
+    monkeypatch.setattr(tmdb_client._movie_session, "get", get)
+    return calls
+
+
+def test_prefix_does_not_hide_alternative_titles(tmdb):
+    assert [r["id"] for r in tmdb_client.search_movie_by_title("money")] == [1]
+    assert [r["id"] for r in tmdb_client.search_movie_by_title("Money  Heist")] == [2]
+    assert tmdb == ["money", "Money  Heist"]
+
+    # La misma consulta (normalizada) sale de la caché
+    assert [r["id"] for r in tmdb_client.search_movie_by_title("money heist")] == [2]
+    assert tmdb == ["money", "Money  Heist"]
+
+
+def test_lru_eviction():
+    cache = new_search_cache(max_size=2)
+    cache_store(cache, "a", [{"id": 1}])
+    cache_store(cache, "b", [{"id": 2}])
+    assert cache_lookup(cache, " A ") == [{"id": 1}]
+    cache_store(cache, "c", [{"id": 3}])
+    assert cache_lookup(cache, "b") is None
+    assert cache_lookup(cache, "a") == [{"id": 1}]
+    assert cache_lookup(cache, "ab") is None
@@ -0,0 +1,70 @@
+# tests/test_tasks.py
+
+"""
+Peticiones agrupadas en recommendation.tasks: cancelar el manejador de un
+oyente no debe detener la tarea para los demás.
+"""
+
+import threading
+
+from recommendation.tasks import cancel_task, check_cancelled, submit_task
+
+TIMEOUT = 5
+
+
+def test_cancel_one_coalesced_listener():
+    release = threading.Event()
+    done, errors = [], []
+    first_done = threading.Event()
+
+    def job(token, report, value):
+        report(0.5)
+        assert release.wait(TIMEOUT)
+        check_cancelled(token)
+        return value * 2
+
+    key = ("test", "coalesced")
+    first = submit_task(key, job, 21, on_done=lambda r: (done.append(("first", r)), first_done.set()),
+                        on_error=errors.append)
+    second = submit_task(key, job, 21, on_done=lambda r: done.append(("second", r)),
+                         on_error=errors.append)
+    assert first is not second
+    assert first["task"] is second["task"]
+
+    cancel_task(second)
+    assert second["token"].is_set()
+    assert not first["token"].is_set()
+    assert not first["task"]["token"].is_set()
+
+    release.set()
+    assert first_done.wait(TIMEOUT)
+    first["task"]["future"].result(TIMEOUT)
+    assert done == [("first", 42)]
+    assert errors == []
+
+
+def test_cancel_last_listener_stops_task():
+    started, release = threading.Event(), threading.Event()
+    outcome = []
+
+    def job(token, report):
+        started.set()
+        assert release.wait(TIMEOUT)
+        check_cancelled(token)
+        return "fin"
+
+    key = ("test", "last")
+    first = submit_task(key, job, on_done=outcome.append, on_error=outcome.append)
+    second = submit_task(key, job, on_done=outcome.append, on_error=outcome.append)
+    assert started.wait(TIMEOUT)
+    cancel_task(first)
+    cancel_task(second)
+    assert first["task"]["token"].is_set()
+
+    # Una petición nueva con la misma clave ya no se agrupa con la cancelada
+    third = submit_task(key, lambda token, report: "nueva")
+    assert third["task"] is not first["task"]
+    release.set()
+    first["task"]["future"].result(TIMEOUT)
+    assert third["task"]["future"].result(TIMEOUT) is None
+    assert outcome == []
@@ -0,0 +1,53 @@
+# tests/test_title_index.py
+
+"""
+Índice local de títulos: el año de estreno viaja desde la tabla de años
+(o la columna release_date del Excel) hasta los resultados de búsqueda,
+con la forma de los de TMDB.
+"""
+
+import pandas as pd
+import pytest
+
+from recommendation import title_index
+from recommendation.data_utils import load_movie_titles, load_release_years, save_release_years
+from recommendation.title_index import build_title_index, search_local_movies, search_local_series
+
+
+@pytest.fixture
+def indexes(monkeypatch):
+    movies = build_title_index([(1, "The Matrix", 80.0, 1999), (2, "The Matrix Reloaded", 60.0, None)])
+    series = build_title_index([(3, "Dark", 50.0, 2017), (4, "Dark Matter", 20.0)])
+    monkeypatch.setattr(title_index, "_indexes", {"movies": movies, "series": series})
+
+
+def test_search_results_carry_year(indexes):
+    assert search_local_movies("matrix") == [
+        {"id": 1, "title": "The Matrix", "popularity": 80.0, "release_date": "1999"},
+        {"id": 2, "title": "The Matrix Reloaded", "popularity": 60.0},
+    ]
+    assert search_local_series("dark") == [
+        {"id": 3, "name": "Dark", "popularity": 50.0, "first_air_date": "2017"},
+        {"id": 4, "name": "Dark Matter", "popularity": 20.0},
+    ]
+
+
+def test_release_years_table(tmp_path):
+    assert load_release_years("movies", str(tmp_path)) == {}
+    save_release_years("movies", {10: 1999, 11: 2003}, str(tmp_path))
+    save_release_years("movies", {11: 2004, 12: 1985}, str(tmp_path))
+    assert load_release_years("movies", str(tmp_path)) == {10: 1999, 11: 2004, 12: 1985}
+    assert load_release_years("series", str(tmp_path)) == {}
+
+
+def test_movie_titles_with_years(tmp_path):
+    sheet = tmp_path / "movies.xlsx"
+    pd.DataFrame({"id": [10, 11, 12], "original_title": ["Uno", "Dos", None],
+                  "popularity": [1.0, None, 3.0], "adult": False}).to_excel(sheet, index=False)
+    save_release_years("movies", {10: 1999}, str(tmp_path))
+    assert load_movie_titles(str(sheet), str(tmp_path)) == [(10, "Uno", 1.0, 1999), (11, "Dos", 0.0, None)]
+
+    # Una columna release_date en el Excel tiene prioridad sobre la tabla
+    pd.DataFrame({"id": [10, 11], "original_title": ["Uno", "Dos"], "popularity": [1.0, 2.0],
+                  "release_date": ["2001-05-04", None]}).to_excel(sheet, index=False)
+    assert load_movie_titles(str(sheet), str(tmp_path)) == [(10, "Uno", 1.0, 2001), (11, "Dos", 2.0, None)]
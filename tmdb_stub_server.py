@@ -0,0 +1,163 @@
+# tmdb_stub_server.py
+
+"""
+Servidor HTTP local que imita la API de TMDB a partir de un corpus de
+fixtures (ver recommendation/fixtures.py), con latencia configurable e
+inyección de errores 429/5xx. Permite probar la concurrencia y los
+reintentos de los clientes sin red ni clave de API:
+
+    python tmdb_stub_server.py --fixtures DATA/FIXTURES/tmdb_fixtures.jsonl.gz \\
+        --port 8765 --latency 0.05 --error_rate 0.1
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 python benchmark.py --record
+
+Rutas servidas: /3/movie/{id}, /3/tv/{id}, /3/search/movie, /3/search/tv
+y /__stats (contadores de peticiones y errores inyectados).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from recommendation.fixtures import iter_fixture_corpus, normalize_query
+
+_DETAIL_RE = re.compile(r"^/3/(movie|tv)/(\d+)$")
+_SEARCH_RE = re.compile(r"^/3/search/(movie|tv)$")
+
+
+def load_store(path):
+    """
+    Indexa un corpus de fixtures para servirlo.
+
+    Devuelve:
+    - dict: {("movie"|"tv", id): data, ("search/movie"|"search/tv", consulta): data}
+    """
+    store = {}
+    for record in iter_fixture_corpus(path):
+        kind = record.get("kind")
+        if kind in ("movie", "tv"):
+            store[(kind, int(record["id"]))] = record["data"]
+        elif kind in ("search/movie", "search/tv"):
+            store[(kind, normalize_query(record["query"]))] = record["data"]
+    return store
+
+
+def make_server(store, host="127.0.0.1", port=8765, latency=0.0, jitter=0.0,
+                error_rate=0.0, error_codes=(429, 500, 502, 503, 504),
+                retry_after=0, seed=0):
+    """
+    Crea (sin arrancar) el servidor stub.
+
+    Parámetros:
+    - store: dict devuelto por load_store.
+    - host, port: dirección de escucha (port=0 elige uno libre).
+    - latency: segundos de espera por petición.
+    - jitter: variación uniforme ± jitter sobre la latencia.
+    - error_rate: probabilidad de responder con un error inyectado.
+    - error_codes: códigos entre los que se elige el error.
+    - retry_after: valor de la cabecera Retry-After en los 429.
+    - seed: semilla de latencias y errores (reproducibles).
+
+    Devuelve:
+    - ThreadingHTTPServer con el atributo `stats` (dict de contadores).
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {"requests": 0, "served": 0, "not_found": 0, "injected": {}}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # sin ruido en consola
+
+        def _send(self, code, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json;charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                with lock:
+                    self._send(200, stats)
+                return
+
+            with lock:
+                stats["requests"] += 1
+                delay = max(0.0, latency + rng.uniform(-jitter, jitter))
+                code = rng.choice(error_codes) if rng.random() < error_rate else None
+                if code:
+                    stats["injected"][str(code)] = stats["injected"].get(str(code), 0) + 1
+            if delay:
+                time.sleep(delay)
+            if code:
+                headers = {"Retry-After": str(retry_after)} if code == 429 else None
+                self._send(code, {"success": False, "status_code": code,
+                                  "status_message": "Injected error"}, headers)
+                return
+
+            detail = _DETAIL_RE.match(url.path)
+            search = _SEARCH_RE.match(url.path)
+            if detail:
+                data = store.get((detail.group(1), int(detail.group(2))))
+            elif search:
+                query = parse_qs(url.query).get("query", [""])[0]
+                results = store.get((f"search/{search.group(1)}", normalize_query(query)), [])
+                data = {"page": 1, "results": results,
+                        "total_pages": 1, "total_results": len(results)}
+            else:
+                data = None
+
+            with lock:
+                stats["served" if data is not None else "not_found"] += 1
+            if data is None:
+                self._send(404, {"success": False, "status_code": 34,
+                                 "status_message": "The resource you requested could not be found."})
+            else:
+                self._send(200, data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor stub de la API de TMDB')
+    parser.add_argument('--fixtures', default='DATA/FIXTURES/tmdb_fixtures.jsonl.gz',
+                        help='Corpus de fixtures (.jsonl.gz)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latencia por petición en segundos')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Variación uniforme de la latencia (± segundos)')
+    parser.add_argument('--error_rate', type=float, default=0.0,
+                        help='Probabilidad de inyectar un error')
+    parser.add_argument('--error_codes', type=int, nargs='+', default=[429, 500, 502, 503, 504],
+                        help='Códigos HTTP de los errores inyectados')
+    parser.add_argument('--retry_after', type=int, default=0,
+                        help='Cabecera Retry-After (segundos) en los 429')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Semilla de latencias y errores')
+    args = parser.parse_args()
+
+    store = load_store(args.fixtures)
+    server = make_server(store, args.host, args.port, args.latency, args.jitter,
+                         args.error_rate, tuple(args.error_codes), args.retry_after, args.seed)
+    host, port = server.server_address[:2]
+    print(f"Stub de TMDB con {len(store)} fixtures en http://{host}:{port}/3")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,109 @@
+# update_catalog.py
+
+"""
+Actualización incremental del catálogo a partir de los exports diarios de
+IDs de TMDB (DATA/ORIGINAL FILES/{prefijo}_MM_DD_YYYY.json.gz).
+
+Compara el export nuevo con el anterior en streaming y, en lugar de
+reconstruir todo:
+- quita del índice de plataformas los títulos eliminados de TMDB
+  (el índice parcheado se guarda en DATA/CATALOG/ y lo usan los flujos),
+- vuelve a descargar y vectorizar solo los títulos cambiados (y los que
+  aparezcan en el índice sin estar en la matriz),
+- parchea las matrices del catálogo (ver vectorize_catalog.py).
+
+Por defecto compara los dos exports más recientes de cada tipo; --old y
+--new (nombres dentro de --export_dir o rutas) exigen un solo --type:
+
+    python update_catalog.py --type series
+    python update_catalog.py --type movies --old movie_ids_03_18_2025.json.gz --new movie_ids_03_19_2025.json.gz
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 python update_catalog.py --type series
+"""
+
+import argparse
+import os
+
+from recommendation.catalog import CATALOG_DIR, update_catalog
+from recommendation.data_utils import (
+    EXPORT_DIR, dated_exports, diff_id_exports, save_platform_index,
+    load_movie_platforms, load_series_platforms, load_artifacts
+)
+
+# Matrices a parchear por tipo: content_type de cada vectorizador
+# (las series también se puntúan con el de películas en el flujo mixto)
+CATALOG_VECTORIZERS = {"movies": ["movies"], "series": ["series", "movies"]}
+
+
+def run(content_type, old_path=None, new_path=None, export_dir=EXPORT_DIR,
+        output_dir=CATALOG_DIR, popularity_delta=None, workers=None, shard_size=500,
+        fixtures=None):
+    """
+    Aplica el diff de dos exports al índice de plataformas y a las matrices.
+    old_path / new_path sin directorio se buscan en export_dir. El índice
+    se lee de output_dir (si ya se parcheó ahí) y se guarda en output_dir.
+
+    Devuelve:
+    - dict con el diff, o None si no hay dos exports que comparar.
+    """
+    old_path, new_path = (os.path.join(export_dir, p) if p and not os.path.dirname(p) else p
+                          for p in (old_path, new_path))
+    if old_path is None or new_path is None:
+        exports = dated_exports(content_type, export_dir)
+        if len(exports) < 2:
+            print(f"{content_type}: hacen falta dos exports en {export_dir} (encontrados: {len(exports)})")
+            return None
+        old_path, new_path = old_path or exports[-2], new_path or exports[-1]
+
+    diff = diff_id_exports(old_path, new_path, popularity_delta)
+    print(f"{content_type}: {len(diff['changed'])} cambiados, "
+          f"{len(diff['removed'])} eliminados ({old_path} -> {new_path})")
+
+    load = load_series_platforms if content_type == "series" else load_movie_platforms
+    platforms = load(index_dir=output_dir)
+    patched = platforms
+    for tfidf_type in CATALOG_VECTORIZERS[content_type]:
+        tfidf = load_artifacts(content_type=tfidf_type)
+        patched, path, stats = update_catalog(content_type, diff, platforms, tfidf, tfidf_type,
+                                              base_dir=output_dir, workers=workers,
+                                              shard_size=shard_size, fixtures=fixtures)
+        print(f"{path}: {stats['vectorized']} vectorizados ({stats['changed']} cambiados), "
+              f"{stats['reused']} reutilizados, {stats['removed']} eliminados, "
+              f"{stats['seconds']:.1f}s")
+        for pid, s in sorted(stats["workers"].items()):
+            print(f"  proceso {pid}: {s['rows']} filas, {s['rows_per_second']:.1f} filas/s")
+    if patched != platforms:
+        save_platform_index(patched, content_type, output_dir)
+        print(f"{content_type}: índice de plataformas parcheado "
+              f"({sum(len(v) for v in platforms.values()) - sum(len(v) for v in patched.values())} entradas menos)")
+    return diff
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualización incremental del catálogo')
+    parser.add_argument('--type', choices=['movies', 'series', 'all'], default='all',
+                        help='Catálogos a actualizar')
+    parser.add_argument('--old', default=None,
+                        help='Export anterior, nombre en --export_dir o ruta (por defecto, el penúltimo '
+                             'por fecha); requiere --type movies o series')
+    parser.add_argument('--new', default=None,
+                        help='Export nuevo (por defecto, el más reciente); requiere --type movies o series')
+    parser.add_argument('--export_dir', default=EXPORT_DIR,
+                        help='Directorio de los exports diarios')
+    parser.add_argument('--output_dir', default=CATALOG_DIR,
+                        help='Directorio de las matrices y del índice parcheado')
+    parser.add_argument('--popularity_delta', type=float, default=None,
+                        help='Cambio de popularidad a partir del cual se revectoriza un título')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos del pool (por defecto, uno por CPU)')
+    parser.add_argument('--shard_size', type=int, default=500,
+                        help='Títulos por fragmento')
+    parser.add_argument('--fixtures', default=None,
+                        help='Corpus de fixtures para trabajar sin red')
+    args = parser.parse_args()
+    if (args.old or args.new) and args.type == 'all':
+        parser.error('--old/--new son exports de un solo tipo: indica --type movies o --type series')
+
+    types = ['movies', 'series'] if args.type == 'all' else [args.type]
+    for content_type in types:
+        run(content_type, args.old, args.new, args.export_dir, args.output_dir,
+            args.popularity_delta, args.workers, args.shard_size, args.fixtures)
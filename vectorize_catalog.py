@@ -0,0 +1,99 @@
+# vectorize_catalog.py
+
+"""
+Vectoriza el catálogo de plataformas en paralelo y guarda la matriz que
+usa el motor para puntuar sin recorrer TMDB (ver recommendation/catalog.py).
+
+Genera las matrices que usan los flujos:
+- movies: películas con el vectorizador de películas.
+- series: series con el vectorizador de series.
+- mix: series con el vectorizador de películas (el flujo mixto puntúa
+  las series con él; las películas reutilizan la matriz de movies).
+
+Los títulos que TMDB devuelve sin géneros reciben los que predice el
+clasificador de overviews (ver recommendation/genre_inference.py).
+
+Por defecto es incremental: solo vectoriza títulos nuevos, los indicados
+con --changed y los que no tenían detalles la vez anterior. Al cambiar
+los artefactos se reconstruye entera automáticamente; las filas no están
+ponderadas, así que cambiar WEIGHTS no obliga a reconstruirla.
+
+    python vectorize_catalog.py --type all --workers 8
+    python vectorize_catalog.py --type movies --changed 550 603
+    python vectorize_catalog.py --fixtures DATA/FIXTURES/tmdb_fixtures.jsonl.gz --full
+"""
+
+import argparse
+
+from recommendation.catalog import CATALOG_DIR, build_catalog
+from recommendation.data_utils import load_movie_platforms, load_series_platforms, load_artifacts
+
+
+def catalog_sets(types):
+    """
+    Matrices a construir: [(tipo, content_type del vectorizador)].
+    """
+    sets = []
+    if "movies" in types or "mix" in types:
+        sets.append(("movies", "movies"))
+    if "series" in types:
+        sets.append(("series", "series"))
+    if "mix" in types:
+        sets.append(("series", "movies"))
+    return sets
+
+
+def run(types, output_dir=CATALOG_DIR, workers=None, shard_size=500,
+        incremental=True, changed_ids=(), fixtures=None):
+    """
+    Construye (o actualiza) las matrices pedidas e imprime el rendimiento
+    de cada proceso.
+
+    Devuelve:
+    - list de (ruta, estadísticas).
+    """
+    # Índice parcheado por update_catalog.py con el mismo --output_dir, si lo hay
+    platforms = {"movies": load_movie_platforms(index_dir=output_dir),
+                 "series": load_series_platforms(index_dir=output_dir)}
+    results = []
+    for content_type, tfidf_type in catalog_sets(types):
+        tfidf = load_artifacts(content_type=tfidf_type)
+
+        def progress(done, total, chunk):
+            print(f"  fragmento {done}/{total}: {chunk['rows']} filas en {chunk['seconds']:.1f}s "
+                  f"(pid {chunk['worker']})")
+
+        path, stats = build_catalog(content_type, platforms[content_type], tfidf, tfidf_type,
+                                    base_dir=output_dir, workers=workers, shard_size=shard_size,
+                                    incremental=incremental, changed_ids=changed_ids,
+                                    fixtures=fixtures, progress=progress)
+        print(f"{path}: {stats['vectorized']} vectorizados, {stats['reused']} reutilizados, "
+              f"{stats['removed']} eliminados, {stats['missing']} sin detalles, "
+              f"{stats['genres_inferred']} con géneros inferidos, {stats['seconds']:.1f}s")
+        for pid, s in sorted(stats["workers"].items()):
+            print(f"  proceso {pid}: {s['rows']} filas, {s['rows_per_second']:.1f} filas/s")
+        results.append((path, stats))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vectorización paralela del catálogo')
+    parser.add_argument('--type', choices=['movies', 'series', 'mix', 'all'], default='all',
+                        help='Matrices a construir')
+    parser.add_argument('--output_dir', default=CATALOG_DIR,
+                        help='Directorio de salida')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos del pool (por defecto, uno por CPU)')
+    parser.add_argument('--shard_size', type=int, default=500,
+                        help='Títulos por fragmento')
+    parser.add_argument('--changed', type=int, nargs='*', default=[],
+                        help='IDs a volver a vectorizar aunque ya estén en la matriz')
+    parser.add_argument('--full', action='store_true',
+                        help='Reconstruir la matriz entera en lugar de actualizarla')
+    parser.add_argument('--fixtures', default=None,
+                        help='Corpus de fixtures para trabajar sin red')
+    args = parser.parse_args()
+
+    types = ['movies', 'series', 'mix'] if args.type == 'all' else [args.type]
+    run(types, args.output_dir, args.workers, args.shard_size,
+        incremental=not args.full, changed_ids=args.changed, fixtures=args.fixtures)